@@ -22,16 +22,50 @@ Usage:
  # - Install pandoc system-wide (recommended)
  # - Or: pip install docx2pdf
  $ python generate_phase5_docs.py
+
+Dependencies are probed only when the step that needs them runs; the
+installation instructions are printed when a required one is missing.
 """
+import argparse
+import hashlib
+import os
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+from finz_cli import add_profile_arguments, has, run_cli  # noqa: E402
+from finz_stages import StageRecorder  # noqa: E402
+
 # Constants for placeholder image generation
 PLACEHOLDER_IMG_WIDTH = 1200
 PLACEHOLDER_IMG_HEIGHT = 800
 PLACEHOLDER_BG_COLOR = (240, 240, 240)
 PLACEHOLDER_TEXT_COLOR = (80, 80, 80)
 PLACEHOLDER_TEXT_POSITION = (20, 20)
+# Placeholders only carry two flat colours plus font antialiasing, so a small
+# palette keeps them lossless-looking at a fraction of the RGB size.
+PLACEHOLDER_PALETTE_COLORS = 16
+PLACEHOLDER_MAX_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+# Rendered placeholders are cached by content hash and copied into place.
+FICLONE = 0x40049409  # Linux ioctl for reflink copies
+PLACEHOLDER_CACHE_DIR = Path(
+    os.getenv("PLACEHOLDER_CACHE_DIR", Path.home() / ".cache" / "finanzas-docs" / "placeholders")
+)
+
+PHASE5_SCREENSHOTS = [
+    "phase5_todos_above_fold.png",
+    "phase5_budget_pill_en_meta.png",
+    "phase5_budget_pill_en_riesgo.png",
+    "phase5_budget_pill_sobre_presupuesto.png",
+    "phase5_collapsed_sections.png",
+    "phase5_expanded_portfolio_summary.png",
+    "phase5_full_page_scroll.png",
+    "phase5_single_above_fold.png",
+    "phase5_single_full_layout.png",
+    "phase5_before_after_todos.png",
+]
 
 # The full markdown content (expanded version)
 MD_CONTENT = r"""
@@ -399,42 +433,95 @@ def write_file(path: Path, content: str):
     path.write_text(content, encoding="utf-8")
     print(f"✅ Wrote {path}")
 
-def create_screenshot_placeholders(base_dir: Path):
-    """Create placeholder PNG files for all required screenshots."""
+def _placeholder_cache_key(text: str, width: int, height: int) -> str:
+    """Content hash for a placeholder: text, dimensions and styling."""
+    spec = "|".join(
+        str(part)
+        for part in (
+            text,
+            width,
+            height,
+            PLACEHOLDER_BG_COLOR,
+            PLACEHOLDER_TEXT_COLOR,
+            PLACEHOLDER_TEXT_POSITION,
+            PLACEHOLDER_PALETTE_COLORS,
+        )
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+def _clone_or_copy(src: Path, dst: Path):
+    """Copy src to dst as a reflink where the filesystem supports it (btrfs, XFS, APFS), else a plain copy.
+
+    Outputs must never share an inode with the cache: an in-place edit of one
+    docs file would otherwise rewrite the cache object and every other output.
+    """
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
+
+def _render_placeholder(template, text: str, cache_path: Path):
+    """Draw text on a copy of the pre-rendered template and save an optimised PNG."""
+    from PIL import Image, ImageDraw
+
+    img = template.copy()
+    ImageDraw.Draw(img).text(PLACEHOLDER_TEXT_POSITION, text, fill=PLACEHOLDER_TEXT_COLOR)
+    # Fast octree is ~3x quicker than the default median cut for flat images
+    img = img.quantize(colors=PLACEHOLDER_PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a unique temp name first so concurrent runs never see a partial file
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    img.save(tmp_path, "PNG", optimize=True, compress_level=9)
+    os.replace(tmp_path, cache_path)
+
+def create_screenshot_placeholders(base_dir: Path, filenames=None, cache_dir: Path = PLACEHOLDER_CACHE_DIR):
+    """Create placeholder PNG files for all required screenshots.
+
+    The background is rendered once and copied per image, files are written
+    in parallel, and every rendered PNG is stored in a content-addressed cache
+    so identical placeholders are copied (reflinked where supported) instead of
+    regenerated.
+    """
     base_dir.mkdir(parents=True, exist_ok=True)
-    filenames = [
-        "phase5_todos_above_fold.png",
-        "phase5_budget_pill_en_meta.png",
-        "phase5_budget_pill_en_riesgo.png",
-        "phase5_budget_pill_sobre_presupuesto.png",
-        "phase5_collapsed_sections.png",
-        "phase5_expanded_portfolio_summary.png",
-        "phase5_full_page_scroll.png",
-        "phase5_single_above_fold.png",
-        "phase5_single_full_layout.png",
-        "phase5_before_after_todos.png",
-    ]
-    for fn in filenames:
+    filenames = PHASE5_SCREENSHOTS if filenames is None else filenames
+    pending = [fn for fn in filenames if not (base_dir / fn).exists()]
+    if not pending:
+        return
+
+    try:
+        from PIL import Image
+    except ImportError:
+        # Fallback: create empty files if PIL is not available
+        for fn in pending:
+            (base_dir / fn).write_bytes(b"")
+            print(f"⚠️  Created empty placeholder {fn} (Pillow not installed)")
+        return
+
+    template = Image.new("RGB", (PLACEHOLDER_IMG_WIDTH, PLACEHOLDER_IMG_HEIGHT), color=PLACEHOLDER_BG_COLOR)
+
+    def _create(fn: str):
         p = base_dir / fn
-        if not p.exists():
-            # Create a placeholder PNG with text
-            try:
-                from PIL import Image, ImageDraw, ImageFont
-                img = Image.new("RGB", (PLACEHOLDER_IMG_WIDTH, PLACEHOLDER_IMG_HEIGHT), color=PLACEHOLDER_BG_COLOR)
-                d = ImageDraw.Draw(img)
-                text = f"Placeholder: {fn}"
-                # Use default font
-                d.text(PLACEHOLDER_TEXT_POSITION, text, fill=PLACEHOLDER_TEXT_COLOR)
-                img.save(p, "PNG")
-                print(f"✅ Created placeholder {fn}")
-            except ImportError:
-                # Fallback: create empty file if PIL is not available
-                p.write_bytes(b"")
-                print(f"⚠️  Created empty placeholder {fn} (Pillow not installed)")
-            except Exception as e:
-                # Fallback: create empty file on any error
-                p.write_bytes(b"")
-                print(f"⚠️  Created empty placeholder {fn} (Error: {e})")
+        text = f"Placeholder: {fn}"
+        try:
+            key = _placeholder_cache_key(text, PLACEHOLDER_IMG_WIDTH, PLACEHOLDER_IMG_HEIGHT)
+            cache_path = cache_dir / key[:2] / f"{key}.png"
+            cached = cache_path.exists()
+            if not cached:
+                _render_placeholder(template, text, cache_path)
+            _clone_or_copy(cache_path, p)
+            print(f"✅ {'Copied cached' if cached else 'Created'} placeholder {fn}")
+        except Exception as e:
+            # Fallback: create empty file on any error
+            p.write_bytes(b"")
+            print(f"⚠️  Created empty placeholder {fn} (Error: {e})")
+
+    with ThreadPoolExecutor(max_workers=PLACEHOLDER_MAX_WORKERS) as pool:
+        list(pool.map(_create, pending))
 
 def write_screenshots_readme(base_dir: Path):
     """Create README.md in screenshots directory with guidelines."""
@@ -523,10 +610,9 @@ def create_docx(md_text: str, out_path: Path):
 def convert_docx_to_pdf(docx_path: Path, pdf_path: Path):
     """Convert DOCX to PDF using pandoc or docx2pdf."""
     import subprocess
-    import shutil
     
     # Try pandoc first (preferred)
-    if shutil.which("pandoc"):
+    if has("pandoc"):
         cmd = ["pandoc", str(docx_path), "-o", str(pdf_path)]
         try:
             subprocess.check_call(cmd, stderr=subprocess.PIPE)
@@ -598,35 +684,63 @@ def print_summary(files_created, repo_root):
     print("  git push --set-upstream origin feature/phase5-docs")
     print("\n" + "="*70 + "\n")
 
-def main():
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Generate the Phase 5 visual guide (MD, DOCX, PDF) and screenshot placeholders "
+        "in the current directory.",
+    )
+    parser.add_argument(
+        "--stage-report",
+        type=Path,
+        help="Write per-stage wall/CPU time, peak RSS and output sizes to this JSON file",
+    )
+    add_profile_arguments(parser)
+    return parser
+
+def main(argv=None):
     """Main execution function."""
+    args = _build_parser().parse_args(argv)
+    recorder = StageRecorder("generate_phase5_docs")
+    try:
+        _generate(recorder)
+    finally:
+        recorder.print_summary()
+        if args.stage_report:
+            print(f"⏱️  Stage report: {recorder.write_report(args.stage_report)}")
+
+def _generate(recorder: StageRecorder):
     print("\n" + "="*70)
     print("🎯 Phase 5 Documentation Generator")
     print("="*70 + "\n")
     
-    print_dependency_instructions()
-    
     repo_root = Path.cwd()
     files_created = []
     
     # 1. Create/overwrite PHASE5_VISUAL_GUIDE.md
     print("📝 Creating PHASE5_VISUAL_GUIDE.md...")
     md_path = repo_root / "PHASE5_VISUAL_GUIDE.md"
-    write_file(md_path, MD_CONTENT)
+    with recorder.stage("markdown", document=md_path.name, outputs=[md_path]):
+        write_file(md_path, MD_CONTENT)
     files_created.append(md_path)
     
     # 2. Create screenshots directory and placeholders
     print("\n📸 Creating screenshots directory and placeholders...")
     screenshots_dir = repo_root / "docs" / "phase5" / "screenshots"
-    create_screenshot_placeholders(screenshots_dir)
-    write_screenshots_readme(screenshots_dir)
+    with recorder.stage("placeholders", outputs=[screenshots_dir]):
+        create_screenshot_placeholders(screenshots_dir)
+        write_screenshots_readme(screenshots_dir)
     files_created.append(screenshots_dir)
     
     # 3. Create DOCX
     print("\n📄 Creating PHASE5_VISUAL_GUIDE.docx...")
     docx_path = repo_root / "PHASE5_VISUAL_GUIDE.docx"
+    if not has("docx"):
+        print("❌ python-docx not installed.")
+        print_dependency_instructions()
+        sys.exit(1)
     try:
-        create_docx(MD_CONTENT, docx_path)
+        with recorder.stage("docx_build", document=docx_path.name, outputs=[docx_path]):
+            create_docx(MD_CONTENT, docx_path)
         files_created.append(docx_path)
     except Exception as e:
         print(f"❌ Failed to create DOCX: {e}")
@@ -636,7 +750,9 @@ def main():
     # 4. Create PDF
     print("\n📑 Creating PHASE5_VISUAL_GUIDE.pdf...")
     pdf_path = repo_root / "PHASE5_VISUAL_GUIDE.pdf"
-    pdf_success = convert_docx_to_pdf(docx_path, pdf_path)
+    with recorder.stage("pdf_convert", document=pdf_path.name, outputs=[pdf_path]) as stage:
+        pdf_success = convert_docx_to_pdf(docx_path, pdf_path)
+        stage["converted"] = bool(pdf_success)
     if pdf_success and pdf_path.exists():
         files_created.append(pdf_path)
     else:
@@ -650,4 +766,4 @@ def main():
     print_summary(files_created, repo_root)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(run_cli(main))
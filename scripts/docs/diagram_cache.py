@@ -0,0 +1,163 @@
+"""
+Content-addressed PlantUML render cache for the Finanzas docs.
+
+Every ``.puml`` under docs/finanzas/diagrams is hashed (source bytes, output
+format and CACHE_VERSION). Renders are stored as ``objects/<hh>/<hash>.svg`` in
+the cache directory, so only diagrams whose hash has no object yet are rendered:
+in one batched PlantUML invocation, or split across ``--jobs`` parallel ones.
+
+After the stage, ``resources/diagrams/<stem>.svg`` are hard links to the current
+objects. render_pdfs.py puts ``resources`` first on pandoc's ``--resource-path``,
+so ``diagrams/<stem>.svg`` references in the markdown resolve to fresh renders
+and fall back to the committed SVGs when PlantUML is not available.
+
+The renderer command defaults to ``plantuml`` and can be overridden with
+PLANTUML_CMD (e.g. ``java -jar /opt/plantuml.jar``).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+from finz_cli import has, run_cli  # noqa: E402
+
+DOC_ROOT = REPO_ROOT / "docs" / "finanzas"
+DIAGRAMS = DOC_ROOT / "diagrams"
+DEFAULT_CACHE_DIR = DOC_ROOT / ".diagram-cache"
+
+# Bump to invalidate every cached render (e.g. after a renderer upgrade).
+CACHE_VERSION = "1"
+
+
+@dataclass
+class PrerenderResult:
+    resource_root: Path
+    rendered: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+
+def source_digest(source: Path, fmt: str = "svg") -> str:
+    h = hashlib.sha256()
+    h.update(f"{CACHE_VERSION}|{fmt}|".encode("utf-8"))
+    h.update(source.read_bytes())
+    return h.hexdigest()
+
+
+def _object_path(cache_dir: Path, digest: str, fmt: str) -> Path:
+    return cache_dir / "objects" / digest[:2] / f"{digest}.{fmt}"
+
+
+def _plantuml_cmd() -> Optional[List[str]]:
+    override = os.getenv("PLANTUML_CMD", "").strip()
+    if override:
+        return shlex.split(override)
+    if has("plantuml"):
+        return ["plantuml"]
+    return None
+
+
+def _render_batch(cmd: Sequence[str], batch: Sequence[Tuple[Path, str]], cache_dir: Path, fmt: str) -> None:
+    """Render a batch of (source, digest) pairs with a single renderer process."""
+    with tempfile.TemporaryDirectory(prefix="puml-") as tmp:
+        workdir = Path(tmp)
+        outdir = workdir / "out"
+        outdir.mkdir()
+        # Sources are staged under their digest so outputs map back to cache keys
+        staged = []
+        for source, digest in batch:
+            dst = workdir / f"{digest}.puml"
+            shutil.copyfile(source, dst)
+            staged.append(str(dst))
+
+        print("::", " ".join([*cmd, f"-t{fmt}", "-o", str(outdir), f"<{len(staged)} diagrams>"]))
+        subprocess.check_call([*cmd, f"-t{fmt}", "-o", str(outdir), *staged])
+
+        for source, digest in batch:
+            produced = outdir / f"{digest}.{fmt}"
+            if not produced.exists():
+                raise RuntimeError(f"PlantUML did not produce output for {source.name}")
+            target = _object_path(cache_dir, digest, fmt)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(produced, target)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def prerender(
+    diagrams_dir: Path = DIAGRAMS,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    fmt: str = "svg",
+    jobs: int = 1,
+) -> PrerenderResult:
+    """Render changed diagrams into the cache and expose current renders for pandoc."""
+    resource_root = cache_dir / "resources"
+    result = PrerenderResult(resource_root=resource_root)
+
+    sources = sorted(diagrams_dir.glob("*.puml"))
+    digests = {source: source_digest(source, fmt) for source in sources}
+    pending = [(s, d) for s, d in digests.items() if not _object_path(cache_dir, d, fmt).exists()]
+    pending_sources = {s for s, _ in pending}
+    result.reused = [s.name for s in sources if s not in pending_sources]
+
+    if pending:
+        cmd = _plantuml_cmd()
+        if cmd is None:
+            result.skipped = [s.name for s, _ in pending]
+            print(f"⚠️  PlantUML not available; using committed renders for {len(pending)} changed diagram(s)")
+        else:
+            jobs = max(1, min(jobs, len(pending)))
+            batches = [pending[i::jobs] for i in range(jobs)]
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                list(pool.map(lambda batch: _render_batch(cmd, batch, cache_dir, fmt), batches))
+            result.rendered = [s.name for s, _ in pending]
+
+    # Rebuild the resource view from scratch; links are cheap and this drops
+    # entries for deleted or renamed sources.
+    view = resource_root / diagrams_dir.name
+    if view.exists():
+        shutil.rmtree(view)
+    view.mkdir(parents=True)
+    for source, digest in digests.items():
+        obj = _object_path(cache_dir, digest, fmt)
+        if obj.exists():
+            _link_or_copy(obj, view / f"{source.stem}.{fmt}")
+
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render changed PlantUML diagrams into the docs cache.")
+    parser.add_argument("--diagrams", type=Path, default=DIAGRAMS, help="Directory with .puml sources")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Render cache directory")
+    parser.add_argument("--format", default="svg", choices=["svg", "png"], help="Output format")
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel renderer processes (default: one batch)")
+    args = parser.parse_args(argv)
+
+    result = prerender(args.diagrams, args.cache_dir, args.format, args.jobs)
+    print(
+        f"Diagrams: {len(result.rendered)} rendered, {len(result.reused)} cached, "
+        f"{len(result.skipped)} skipped -> {result.resource_root}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
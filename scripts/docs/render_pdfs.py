@@ -1,8 +1,16 @@
+import argparse
 import subprocess
+import sys
 from pathlib import Path
 
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+from diagram_cache import DEFAULT_CACHE_DIR, prerender  # noqa: E402
+from finz_cli import add_profile_arguments, require, run_cli  # noqa: E402
+from finz_stages import StageRecorder  # noqa: E402
 
-DOC_ROOT = Path(__file__).resolve().parent.parent.parent / "docs" / "finanzas"
+
+DOC_ROOT = REPO_ROOT / "docs" / "finanzas"
 DIAGRAMS = DOC_ROOT / "diagrams"
 OUT_DIR = DOC_ROOT / "generated-pdf"
 
@@ -26,30 +34,66 @@ def run(*cmd: str, cwd: Path | None = None) -> None:
     subprocess.check_call(cmd, cwd=str(cwd) if cwd else None)
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render the Finanzas docs to PDF and build the binder.")
+    parser.add_argument("--diagram-cache", type=Path, default=DEFAULT_CACHE_DIR, help="PlantUML render cache")
+    parser.add_argument("--diagram-jobs", type=int, default=1, help="Parallel PlantUML processes")
+    parser.add_argument(
+        "--stage-report",
+        type=Path,
+        default=OUT_DIR / "stage-report.json",
+        help="Per-stage timing/RSS/output-size JSON report (default: generated-pdf/stage-report.json)",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    require("pandoc")
+    require("pdfunite")
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
+    recorder = StageRecorder("render_pdfs")
+    try:
+        _render(recorder, args)
+    finally:
+        recorder.print_summary()
+        print(f":: stage report: {recorder.write_report(args.stage_report)}")
+    return 0
+
+
+def _render(recorder: StageRecorder, args: argparse.Namespace) -> None:
+    # Pre-render changed diagrams; unchanged ones are served from the cache
+    with recorder.stage("diagrams", outputs=[args.diagram_cache / "resources"]) as stage:
+        diagrams = prerender(DIAGRAMS, args.diagram_cache, jobs=args.diagram_jobs)
+        stage.update(rendered=len(diagrams.rendered), cached=len(diagrams.reused), skipped=len(diagrams.skipped))
+    print(
+        f":: diagrams: {len(diagrams.rendered)} rendered, {len(diagrams.reused)} cached, "
+        f"{len(diagrams.skipped)} skipped"
+    )
+
     # Generate individual PDFs
     for md in DOCS_ORDER:
         src = DOC_ROOT / md
         dst = OUT_DIR / f"{src.stem}.pdf"
-        run(
-            "pandoc",
-            str(src.relative_to(DOC_ROOT)),
-            "--from=gfm",
-            "--to=pdf",
-            "--pdf-engine=wkhtmltopdf",
-            f"--resource-path=.:{DIAGRAMS}",
-            "-o",
-            str(dst),
-            cwd=DOC_ROOT,
-        )
+        with recorder.stage("pandoc", document=md, outputs=[dst]) as stage:
+            stage["input_bytes"] = src.stat().st_size
+            run(
+                "pandoc",
+                str(src.relative_to(DOC_ROOT)),
+                "--from=gfm",
+                "--to=pdf",
+                "--pdf-engine=wkhtmltopdf",
+                f"--resource-path={diagrams.resource_root}:.:{DIAGRAMS}",
+                "-o",
+                str(dst),
+                cwd=DOC_ROOT,
+            )
 
     # Build binder
     binder = OUT_DIR / "FinanzasDocsBinder.pdf"
     pdfs_in_order = [OUT_DIR / f"{Path(md).stem}.pdf" for md in DOCS_ORDER]
-    run("pdfunite", *(str(p) for p in pdfs_in_order), str(binder))
+    with recorder.stage("pdfunite", document=binder.name, outputs=[binder]):
+        run("pdfunite", *(str(p) for p in pdfs_in_order), str(binder))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(run_cli(main))
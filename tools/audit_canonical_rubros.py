@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Streaming canonical-rubro auditor for finz_prefacturas and finz_allocations.
+
+Python counterpart of the nightly "Non-Canonical Rubros" audit:
+- the taxonomy is loaded once into a frozen lookup (canonical IDs plus a
+  normalised index of legacy aliases, see finz_taxonomy),
+- each table is streamed through a segmented parallel scan, projecting only
+  the key and rubro attributes,
+- with --snapshot DIR the tables are read from a local finz_snapshot instead,
+- non-canonical usage is aggregated per project in bounded memory: at most
+  --max-values-per-project distinct codes are tracked per project, the rest
+  are folded into an ``(other)`` bucket.
+
+The rubro code of an item is the first string attribute of RUBRO_FIELDS, in
+the same order as the nightly audit's jq filter (``rubroId // rubro_canonical
+// linea_codigo // rubro``), so both audits classify an item the same way;
+keep the two in sync. Values are reported as ``legacy`` (resolvable to a
+canonical ID) or ``unknown``.
+
+Usage:
+  python tools/audit_canonical_rubros.py --report audit.json --fail-on-noncanonical
+
+Environment:
+- TABLE_PREFACTURAS (default finz_prefacturas), TABLE_ALLOCATIONS (default finz_allocations)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from finz_cli import run_cli
+from finz_dynamo import dynamo_client, parallel_scan, table_name
+from finz_snapshot import SnapshotReader
+from finz_taxonomy import (
+    CANONICAL,
+    DEFAULT_ALIASES_PATH,
+    DEFAULT_TAXONOMY_PATH,
+    LEGACY,
+    UNKNOWN,
+    TaxonomyLookup,
+    load_taxonomy,
+)
+
+# Same precedence as the jq filter of .github/workflows/nightly-audit-rubros.yml
+RUBRO_FIELDS = ("rubroId", "rubro_canonical", "linea_codigo", "rubro")
+OTHER_BUCKET = "(other)"
+
+
+def project_of(item: Dict[str, Any]) -> str:
+    pk = str(item.get("pk") or "")
+    if pk.startswith("PROJECT#"):
+        return pk[len("PROJECT#"):]
+    return str(item.get("project_id") or item.get("projectId") or "UNKNOWN")
+
+
+def rubro_of(item: Dict[str, Any]) -> Optional[str]:
+    """First string attribute of RUBRO_FIELDS, like ``.rubroId.S // ...`` in jq.
+
+    jq's ``//`` only skips null and false, so an empty string is returned (and
+    reported as unknown) rather than falling through to the next field.
+    """
+    for name in RUBRO_FIELDS:
+        value = item.get(name)
+        if isinstance(value, str):
+            return value
+    return None
+
+
+class UsageAggregator:
+    """Per-project non-canonical usage counts with a cap on distinct codes per project."""
+
+    def __init__(self, lookup: TaxonomyLookup, max_values_per_project: int = 50, sample_keys: int = 5):
+        self.lookup = lookup
+        self.max_values = max_values_per_project
+        self.sample_keys = sample_keys
+        self.scanned: Counter = Counter()
+        self.with_rubro: Counter = Counter()
+        self.status_totals: Counter = Counter()
+        self.usage: Dict[str, Counter] = defaultdict(Counter)  # project -> (table, status, value) -> count
+        self.resolved: Dict[str, Optional[str]] = {}
+        self.samples: Dict[str, List[str]] = defaultdict(list)
+
+    def add(self, table: str, items: Iterable[Dict[str, Any]]) -> None:
+        for item in items:
+            self.scanned[table] += 1
+            value = rubro_of(item)
+            if value is None:
+                continue
+            self.with_rubro[table] += 1
+            status, canonical = self.lookup.classify(value)
+            self.status_totals[status] += 1
+            if status == CANONICAL:
+                continue
+            counts = self.usage[project_of(item)]
+            key = (table, status, value)
+            if key not in counts and len(counts) >= self.max_values:
+                key = (table, status, OTHER_BUCKET)
+            counts[key] += 1
+            if key[2] != OTHER_BUCKET:
+                self.resolved[value] = canonical
+                samples = self.samples[value]
+                if len(samples) < self.sample_keys:
+                    samples.append(f"{item.get('pk')} / {item.get('sk')}")
+
+    @property
+    def non_canonical(self) -> int:
+        return sum(n for status, n in self.status_totals.items() if status != CANONICAL)
+
+    def report(self) -> Dict[str, Any]:
+        projects = []
+        for project, counts in sorted(self.usage.items(), key=lambda kv: -sum(kv[1].values())):
+            projects.append(
+                {
+                    "project_id": project,
+                    "total": sum(counts.values()),
+                    "values": [
+                        {
+                            "table": table,
+                            "status": status,
+                            "value": value,
+                            "canonical": self.resolved.get(value),
+                            "count": n,
+                        }
+                        for (table, status, value), n in counts.most_common()
+                    ],
+                }
+            )
+        return {
+            "status": "pass" if not self.non_canonical else "fail",
+            "scanned": dict(self.scanned),
+            "itemsWithRubro": dict(self.with_rubro),
+            "totals": dict(self.status_totals),
+            "nonCanonical": self.non_canonical,
+            "projects": projects,
+            "samples": {value: keys for value, keys in self.samples.items()},
+        }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Audit prefacturas/allocations for non-canonical rubro codes.")
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        default=[table_name("prefacturas"), table_name("allocations")],
+        help="Tables to audit",
+    )
+    parser.add_argument("--taxonomy", type=Path, default=DEFAULT_TAXONOMY_PATH, help="Canonical taxonomy JSON")
+    parser.add_argument("--aliases", type=Path, default=DEFAULT_ALIASES_PATH, help="TS file with LEGACY_RUBRO_ID_MAP")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--snapshot", type=Path, help="Read tables from a local finz_snapshot directory")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments per table (default 8)")
+    parser.add_argument("--max-values-per-project", type=int, default=50, help="Distinct codes tracked per project")
+    parser.add_argument("--report", type=Path, help="Write the JSON report here")
+    parser.add_argument("--fail-on-noncanonical", action="store_true", help="Exit 1 when non-canonical usage exists")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+
+    lookup = load_taxonomy(args.taxonomy, args.aliases)
+    print(f"✓ Loaded {len(lookup.canonical)} canonical rubros and {len(lookup.aliases)} alias keys")
+
+    aggregator = UsageAggregator(lookup, max_values_per_project=args.max_values_per_project)
+    fields = ("pk", "sk", "project_id", *RUBRO_FIELDS)
+    if args.snapshot:
+        reader = SnapshotReader(args.snapshot)
+
+        def _pages(table):
+            return reader.scan(table, columns=fields)
+    else:
+        client = dynamo_client(endpoint_url=args.endpoint_url)
+        projection = {
+            "ProjectionExpression": ", ".join(f"#f{i}" for i in range(len(fields))),
+            "ExpressionAttributeNames": {f"#f{i}": name for i, name in enumerate(fields)},
+        }
+
+        def _pages(table):
+            return parallel_scan(client, table, segments=args.segments, **projection)
+
+    for table in args.tables:
+        source = f"snapshot {args.snapshot}" if args.snapshot else f"{args.segments} segments"
+        print(f"🔍 Scanning {table} ({source})...")
+        for page in _pages(table):
+            aggregator.add(table, page)
+        print(f"   {aggregator.scanned[table]} items, {aggregator.with_rubro[table]} with rubro fields")
+
+    report = aggregator.report()
+    print(f"\nCanonical: {report['totals'].get(CANONICAL, 0)}  "
+          f"legacy: {report['totals'].get(LEGACY, 0)}  unknown: {report['totals'].get(UNKNOWN, 0)}")
+    for project in report["projects"][:20]:
+        print(f"  ❌ {project['project_id']}: {project['total']} non-canonical references")
+    if len(report["projects"]) > 20:
+        print(f"  ... {len(report['projects']) - 20} more projects")
+
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nReport written to: {args.report}")
+
+    if report["status"] == "pass":
+        print("✅ PASS: All rubros are canonical")
+        return 0
+    print(f"❌ FAIL: Found {report['nonCanonical']} non-canonical rubro references")
+    return 1 if args.fail_on_noncanonical else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Time-window rollups over finz_audit_log without full-table scans.
+
+Answers "changes per project per day last quarter" style questions:
+- project partitions come from finz_projects (key-projected scan of the
+  ``PROJECT#{id}`` / ``METADATA`` items) or from --project,
+- each partition is read with ``sk BETWEEN`` range queries over the requested
+  days, concurrently across partitions (--workers); both audit key layouts are
+  queried by default (``ENTITY#PROJECT#``/``TS#`` as written by the handlers,
+  ``PROJECT#``/``AUDIT#`` as in the data model docs, see finz_audit),
+- pages are folded into per-(project, day) counts by hour, actor and action as
+  they arrive; no audit item is kept in memory,
+- closed days (ended more than --grace-hours ago) are cached in a local SQLite
+  file, so a re-run only queries the days it has not seen yet plus today.
+
+Audit entries of projects deleted from finz_projects are only rolled up when
+passed with --project. With --snapshot DIR the rollup reads the audit_log of
+a local finz_snapshot instead (no queries, no cache).
+
+Usage:
+  python tools/audit_rollup.py --days 90 --report audit-rollup.json
+  python tools/audit_rollup.py --start 2026-07-01 --end 2026-09-30 --project P-123 P-456
+  python tools/audit_rollup.py --snapshot snapshots/latest --days 30
+
+Environment:
+- FINZ_AUDIT_CACHE (default ~/.cache/finanzas-audit/rollup.sqlite)
+- TABLE_PROJECTS, TABLE_AUDIT_LOG (finz_* defaults)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from finz_audit import ACTOR_ATTRIBUTES, AUDIT_KEY_LAYOUTS, actor_of, audit_key_of
+from finz_cli import run_cli
+from finz_client import audit_partition
+from finz_dynamo import deserialize_item, dynamo_client, parallel_scan, serialize_item, table_name
+from finz_snapshot import SnapshotReader
+
+DEFAULT_CACHE_PATH = Path(
+    os.getenv("FINZ_AUDIT_CACHE", str(Path.home() / ".cache" / "finanzas-audit" / "rollup.sqlite"))
+)
+AUDIT_ATTRIBUTES = ("pk", "sk", "timestamp", "action", "resource_type", "resource_id", *ACTOR_ATTRIBUTES)
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    layout TEXT NOT NULL,
+    project TEXT NOT NULL,
+    day TEXT NOT NULL,
+    counts TEXT NOT NULL,
+    PRIMARY KEY (layout, project, day)
+);
+"""
+
+
+@dataclass
+class DayCounts:
+    """Audit entries of one project partition on one UTC day."""
+
+    total: int = 0
+    hours: Counter = field(default_factory=Counter)  # "00".."23" -> entries
+    actors: Counter = field(default_factory=Counter)
+    actions: Counter = field(default_factory=Counter)
+
+    def add(self, item: Dict[str, Any], timestamp: _dt.datetime) -> None:
+        self.total += 1
+        self.hours[f"{timestamp.hour:02d}"] += 1
+        self.actors[actor_of(item)] += 1
+        self.actions[str(item.get("action") or "unknown")] += 1
+
+    def to_json(self) -> str:
+        return json.dumps({"total": self.total, "hours": self.hours, "actors": self.actors, "actions": self.actions})
+
+    @classmethod
+    def from_json(cls, text: str) -> "DayCounts":
+        data = json.loads(text)
+        return cls(data["total"], Counter(data["hours"]), Counter(data["actors"]), Counter(data["actions"]))
+
+
+class RollupCache:
+    """Closed (layout, project, day) windows; an empty window is cached too."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(CACHE_SCHEMA)
+
+    def load(self, layout: str, first_day: str, last_day: str) -> Dict[Tuple[str, str], DayCounts]:
+        rows = self.conn.execute(
+            "SELECT project, day, counts FROM windows WHERE layout = ? AND day BETWEEN ? AND ?",
+            (layout, first_day, last_day),
+        )
+        return {(project, day): DayCounts.from_json(counts) for project, day, counts in rows}
+
+    def store(self, layout: str, project_id: str, windows: Dict[str, DayCounts]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO windows (layout, project, day, counts) VALUES (?, ?, ?, ?)",
+                [(layout, project_id, day, counts.to_json()) for day, counts in windows.items()],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+@dataclass
+class Rollup:
+    by_day: Counter = field(default_factory=Counter)
+    by_hour: Counter = field(default_factory=Counter)  # "YYYY-MM-DDTHH"
+    by_actor: Counter = field(default_factory=Counter)
+    by_action: Counter = field(default_factory=Counter)
+    by_project_day: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def add(self, project_id: str, day: str, counts: DayCounts) -> None:
+        if not counts.total:
+            return
+        self.by_day[day] += counts.total
+        for hour, n in counts.hours.items():
+            self.by_hour[f"{day}T{hour}"] += n
+        self.by_actor.update(counts.actors)
+        self.by_action.update(counts.actions)
+        self.by_project_day[project_id][day] += counts.total
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_day.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "byDay": dict(sorted(self.by_day.items())),
+            "byHour": dict(sorted(self.by_hour.items())),
+            "byActor": dict(self.by_actor.most_common()),
+            "byAction": dict(self.by_action.most_common()),
+            "byProjectDay": {pid: dict(sorted(days.items())) for pid, days in sorted(self.by_project_day.items())},
+        }
+
+
+def day_range(first: _dt.date, last: _dt.date) -> List[str]:
+    return [(first + _dt.timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+
+def contiguous_runs(days: Sequence[str]) -> List[Tuple[str, str]]:
+    """Sorted ISO days grouped into (first, last) runs so each run is one range query."""
+    runs: List[Tuple[str, str]] = []
+    previous = None
+    for day in sorted(days):
+        current = _dt.date.fromisoformat(day)
+        if runs and previous is not None and current - previous == _dt.timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+        previous = current
+    return runs
+
+
+def is_closed(day: str, now: _dt.datetime, grace: _dt.timedelta) -> bool:
+    end = _dt.datetime.combine(_dt.date.fromisoformat(day), _dt.time(), _dt.timezone.utc) + _dt.timedelta(days=1)
+    return end + grace <= now
+
+
+def discover_projects(client, segments: int) -> List[str]:
+    names = {"#pk": "pk", "#sk": "sk"}
+    pages = parallel_scan(
+        client,
+        table_name("projects"),
+        segments=segments,
+        ProjectionExpression="#pk, #sk",
+        FilterExpression="begins_with(#pk, :p) AND #sk = :m",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=serialize_item({":p": "PROJECT#", ":m": "METADATA"}),
+    )
+    return sorted({str(item["pk"])[len("PROJECT#"):] for page in pages for item in page})
+
+
+def query_partition(
+    client, table: str, layout: str, project_id: str, runs: Sequence[Tuple[str, str]]
+) -> Tuple[Dict[str, DayCounts], Dict[str, float]]:
+    """Range-query the given day runs of one partition; every requested day gets an entry."""
+    sk_prefix = AUDIT_KEY_LAYOUTS[layout][1]
+    names = {f"#a{i}": name for i, name in enumerate(AUDIT_ATTRIBUTES)}
+    windows: Dict[str, DayCounts] = {}
+    stats = {"queries": 0, "items": 0, "capacity": 0.0}
+    for first, last in runs:
+        for day in day_range(_dt.date.fromisoformat(first), _dt.date.fromisoformat(last)):
+            windows[day] = DayCounts()
+        kwargs: Dict[str, Any] = {
+            "TableName": table,
+            "KeyConditionExpression": "#pk = :pk AND #sk BETWEEN :lo AND :hi",
+            "ProjectionExpression": ", ".join(names),
+            # "~" sorts after every character of an ISO timestamp and its "#..." suffixes
+            "ExpressionAttributeNames": {**names, "#pk": "pk", "#sk": "sk"},
+            "ExpressionAttributeValues": serialize_item(
+                {":pk": audit_partition(project_id, layout), ":lo": f"{sk_prefix}{first}", ":hi": f"{sk_prefix}{last}~"}
+            ),
+            "ReturnConsumedCapacity": "TOTAL",
+        }
+        while True:
+            resp = client.query(**kwargs)
+            stats["queries"] += 1
+            stats["capacity"] += float(resp.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+            for raw in resp.get("Items", []):
+                item = deserialize_item(raw)
+                _, timestamp = audit_key_of(item)
+                day = timestamp.date().isoformat() if timestamp else None
+                if day in windows:
+                    windows[day].add(item, timestamp)
+                    stats["items"] += 1
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    return windows, stats
+
+
+def rollup_snapshot(reader: SnapshotReader, days: Sequence[str], projects: Optional[Iterable[str]]) -> Rollup:
+    wanted_days = set(days)
+    wanted_projects = set(projects) if projects else None
+    windows: Dict[Tuple[str, str], DayCounts] = defaultdict(DayCounts)
+    for page in reader.scan("audit_log", columns=list(AUDIT_ATTRIBUTES)):
+        for item in page:
+            project_id, timestamp = audit_key_of(item)
+            if not project_id or timestamp is None:
+                continue
+            day = timestamp.date().isoformat()
+            if day not in wanted_days or (wanted_projects is not None and project_id not in wanted_projects):
+                continue
+            windows[(project_id, day)].add(item, timestamp)
+    rollup = Rollup()
+    for (project_id, day), counts in windows.items():
+        rollup.add(project_id, day, counts)
+    return rollup
+
+
+def _print_summary(rollup: Rollup, days: Sequence[str], top: int) -> None:
+    print(f"\n📈 {rollup.total} audit entries across {len(rollup.by_project_day)} projects, {days[0]} → {days[-1]}")
+    if not rollup.total:
+        return
+    print("\nBusiest days:")
+    for day, n in rollup.by_day.most_common(top):
+        print(f"  {day}  {n}")
+    print("\nTop actors:")
+    for actor, n in rollup.by_actor.most_common(top):
+        print(f"  {n:8d}  {actor}")
+    busiest = sorted(rollup.by_project_day.items(), key=lambda kv: -sum(kv[1].values()))[:top]
+    print("\nMost changed projects:")
+    for project_id, per_day in busiest:
+        print(f"  {sum(per_day.values()):8d}  {project_id}  ({len(per_day)} active days)")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Roll up finz_audit_log by day, hour and actor with range queries.")
+    parser.add_argument("--start", help="First UTC day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last UTC day, inclusive (YYYY-MM-DD, default today)")
+    parser.add_argument("--days", type=int, default=90, help="Days back from --end when --start is omitted (default 90)")
+    parser.add_argument("--project", nargs="+", help="Project IDs to roll up (default: every project in finz_projects)")
+    parser.add_argument("--layout", choices=(*AUDIT_KEY_LAYOUTS, "both"), default="both",
+                        help="Audit key layout to query (default: both)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_PATH, help="Closed-window cache (SQLite)")
+    parser.add_argument("--no-cache", action="store_true", help="Query every day and do not update the cache")
+    parser.add_argument("--grace-hours", type=float, default=2.0,
+                        help="Hours after midnight UTC before a day is closed and cacheable (default 2)")
+    parser.add_argument("--snapshot", type=Path, help="Read a local finz_snapshot instead of DynamoDB")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments for project discovery (default 8)")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent partition queries (default 16)")
+    parser.add_argument("--top", type=int, default=10, help="Rows per summary section (default 10)")
+    parser.add_argument("--report", type=Path, help="Write the JSON rollup here")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    now = _dt.datetime.now(_dt.timezone.utc)
+    try:
+        last = _dt.date.fromisoformat(args.end) if args.end else now.date()
+        first = _dt.date.fromisoformat(args.start) if args.start else last - _dt.timedelta(days=args.days - 1)
+    except ValueError as exc:
+        parser.error(f"Invalid date: {exc}")
+    last = min(last, now.date())
+    if first > last:
+        parser.error(f"--start {first} is after --end {last}")
+    days = day_range(first, last)
+
+    if args.snapshot:
+        print(f"🔍 Reading audit_log from snapshot {args.snapshot}")
+        rollup = rollup_snapshot(SnapshotReader(args.snapshot), days, args.project)
+        stats: Counter = Counter()
+    else:
+        client = dynamo_client(endpoint_url=args.endpoint_url)
+        if args.project:
+            projects = sorted(set(args.project))
+        else:
+            print(f"🔍 Discovering project partitions in {table_name('projects')}")
+            projects = discover_projects(client, args.segments)
+        layouts = list(AUDIT_KEY_LAYOUTS) if args.layout == "both" else [args.layout]
+        closed = [day for day in days if is_closed(day, now, _dt.timedelta(hours=args.grace_hours))]
+        cache = None if args.no_cache else RollupCache(args.cache)
+        rollup, stats = Rollup(), Counter()
+
+        jobs = []
+        for layout in layouts:
+            cached = cache.load(layout, days[0], days[-1]) if cache else {}
+            for project_id in projects:
+                missing = []
+                for day in days:
+                    hit = cached.get((project_id, day))
+                    if hit is None:
+                        missing.append(day)
+                    else:
+                        rollup.add(project_id, day, hit)
+                        stats["cached windows"] += 1
+                if missing:
+                    jobs.append((layout, project_id, contiguous_runs(missing)))
+        print(f"   {len(projects)} projects × {len(days)} days × {len(layouts)} layouts; "
+              f"{stats['cached windows']} windows cached, {len(jobs)} partitions to query")
+
+        closed_days = set(closed)
+        audit_table = table_name("audit_log")
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(query_partition, client, audit_table, layout, project_id, runs): (layout, project_id)
+                for layout, project_id, runs in jobs
+            }
+            for future in as_completed(futures):
+                layout, project_id = futures[future]
+                windows, query_stats = future.result()
+                stats.update(query_stats)
+                for day, counts in windows.items():
+                    rollup.add(project_id, day, counts)
+                if cache:
+                    cache.store(layout, project_id, {d: c for d, c in windows.items() if d in closed_days})
+        if cache:
+            cache.close()
+        print(f"   {stats['queries']} queries, {stats['items']} items, {stats['capacity']:.1f} RCU consumed")
+
+    _print_summary(rollup, days, args.top)
+    if args.report:
+        report = {
+            "start": days[0],
+            "end": days[-1],
+            "generatedAt": now.isoformat(),
+            "stats": dict(stats),
+            **rollup.as_dict(),
+        }
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nReport written to: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
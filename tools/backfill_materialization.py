@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Parallel backfill engine for baseline materialization (rubros + allocations).
+
+Python counterpart of services/finanzas-api/scripts/backfill-baseline-materialization.ts,
+which evaluates every baseline serially. This engine:
+- finds accepted baselines (``BASELINE#{id}`` / ``METADATA`` with status
+  accepted, or referenced by an accepted project) in one parallel scan,
+- measures what is already materialised with parallel, key-projected scans of
+  finz_rubros (``RUBRO#{baselineId}#...``) and finz_allocations
+  (``ALLOCATION#{baselineId}#{YYYY-MM}#...``), and selects only baselines
+  missing rubros or allocations (with --force-rewrite-zeros, also baselines
+  whose allocations are all zero),
+- repairs them across --workers threads through the admin materialization
+  endpoint (POST /admin/backfill), which runs the same materializers.ts
+  logic as the API, throttled by a token-bucket --rate limit. The endpoint
+  takes one baseline per request, so requests reuse a keep-alive session per
+  thread rather than being batched.
+
+Repair writes use deterministic ``RUBRO#``/``ALLOCATION#`` keys, and existing
+non-zero allocations are never overwritten, so a run is safe to repeat.
+Because discovery only selects incomplete baselines, a re-run picks up where
+an interrupted one stopped.
+
+Without --confirm the run is a dry-run: the selected baselines are reported
+with what is already materialised, and no API call is made.
+
+Usage:
+  python tools/backfill_materialization.py --report backfill-diff.json
+  python tools/backfill_materialization.py --confirm --workers 16 --rate 10
+  python tools/backfill_materialization.py --snapshot snapshots/latest
+
+Environment:
+- API base URL / bearer token: same variables as validate_project_pk_sk_uniqueness
+- CONFIRM=yes (same as --confirm); CONFIRM_PROD=yes is required when
+  NODE_ENV=production or STAGE_NAME=prod
+- TABLE_PREFACTURAS, TABLE_PROJECTS, TABLE_RUBROS, TABLE_ALLOCATIONS (finz_* defaults)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from finz_allocations import allocation_amount, allocation_baseline
+from finz_cli import lazy_import, run_cli
+from finz_dynamo import dynamo_client, parallel_scan, table_name
+from finz_snapshot import SnapshotReader
+from validate_project_pk_sk_uniqueness import ValidationError, auth_headers, resolve_api_base, resolve_bearer_token
+
+requests = lazy_import("requests", capability="http")
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+MAX_ATTEMPTS = 4
+
+
+@dataclass
+class BaselineCoverage:
+    baseline_id: str
+    project_id: str
+    rubros: int = 0
+    allocations: int = 0
+    nonzero_allocations: int = 0
+
+    def needs_repair(self, force_rewrite_zeros: bool = False) -> bool:
+        if not self.rubros or not self.allocations:
+            return True
+        return force_rewrite_zeros and not self.nonzero_allocations
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _baseline_of_rubro(item: Dict[str, Any]) -> Optional[str]:
+    if item.get("baselineId") or item.get("baseline_id"):
+        return item.get("baselineId") or item.get("baseline_id")
+    # Materialised instance IDs are RUBRO#{baselineId}#{labor|nonlabor}#{stableId}
+    parts = str(item.get("sk", "")).split("#")
+    return parts[1] if len(parts) >= 4 and parts[0] == "RUBRO" else None
+
+
+def accepted_baselines(baseline_pages: Iterable[List[Dict]], project_pages: Iterable[List[Dict]]) -> Dict[str, BaselineCoverage]:
+    """Accepted baselines by ID, from baseline metadata status and accepted project metadata."""
+    metadata: Dict[str, Dict[str, Any]] = {}
+    accepted = set()
+    for page in baseline_pages:
+        for item in page:
+            pk = str(item.get("pk", ""))
+            if not pk.startswith("BASELINE#") or item.get("sk") != "METADATA":
+                continue
+            bid = item.get("baseline_id") or item.get("baselineId") or pk[len("BASELINE#"):]
+            metadata[bid] = item
+            if str(item.get("status", "")).lower() == "accepted":
+                accepted.add(bid)
+    project_of: Dict[str, str] = {}
+    for page in project_pages:
+        for item in page:
+            bid = item.get("baseline_id") or item.get("baselineId")
+            if bid and item.get("sk") == "METADATA" and str(item.get("baseline_status", "")).lower() == "accepted":
+                accepted.add(bid)
+                project_of[bid] = str(item.get("pk", ""))[len("PROJECT#"):]
+
+    coverage = {}
+    for bid in sorted(accepted):
+        meta = metadata.get(bid, {})
+        project_id = meta.get("project_id") or meta.get("projectId") or project_of.get(bid)
+        if bid in metadata and project_id:
+            coverage[bid] = BaselineCoverage(bid, str(project_id).replace("PROJECT#", "", 1))
+    return coverage
+
+
+def measure(coverage: Dict[str, BaselineCoverage], rubro_pages, allocation_pages) -> None:
+    """Count materialised rubros/allocations per accepted baseline."""
+    for page in rubro_pages:
+        for item in page:
+            entry = coverage.get(_baseline_of_rubro(item))
+            if entry:
+                entry.rubros += 1
+    for page in allocation_pages:
+        for item in page:
+            entry = coverage.get(allocation_baseline(item))
+            if entry:
+                entry.allocations += 1
+                if allocation_amount(item) > 0:
+                    entry.nonzero_allocations += 1
+
+
+class BackfillClient:
+    """Calls POST /admin/backfill with per-thread HTTP sessions, rate limiting and retries."""
+
+    def __init__(self, api_base: str, token: str, limiter: RateLimiter, timeout: float = 60.0):
+        self.url = f"{api_base}/admin/backfill"
+        self.headers = dict(auth_headers(token), **{"Content-Type": "application/json"})
+        self.limiter = limiter
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def materialize(self, entry: BaselineCoverage, force_rewrite_zeros: bool) -> Dict[str, Any]:
+        body = json.dumps(
+            {
+                "projectId": entry.project_id,
+                "baselineId": entry.baseline_id,
+                "dryRun": False,
+                "forceRewriteZeros": force_rewrite_zeros,
+            }
+        )
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            resp = self._session().post(self.url, data=body, timeout=self.timeout)
+            if resp.status_code not in RETRY_STATUS or attempt >= MAX_ATTEMPTS:
+                break
+            time.sleep(min(0.5 * (2 ** attempt), 8.0))
+        resp.raise_for_status()
+        return (resp.json() if resp.text else {}).get("result", {})
+
+
+def _row(entry: BaselineCoverage, result: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+    row = asdict(entry)
+    if result is not None:
+        rubros, allocations = result.get("rubrosResult", {}), result.get("allocationsResult", {})
+        row.update(
+            rubros_planned=rubros.get("rubrosPlanned"),
+            rubros_written=rubros.get("rubrosWritten"),
+            allocations_planned=allocations.get("allocationsPlanned"),
+            allocations_written=allocations.get("allocationsWritten"),
+            allocations_skipped=allocations.get("allocationsSkipped"),
+            warnings=rubros.get("warnings") or [],
+        )
+    if error:
+        row["error"] = error
+    return row
+
+
+def _is_prod() -> bool:
+    return (
+        os.getenv("NODE_ENV", "").lower() == "production" or os.getenv("STAGE_NAME", "").lower() == "prod"
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Find and repair accepted baselines missing rubros/allocations.")
+    parser.add_argument("--confirm", action="store_true", help="Execute writes (default: dry-run report)")
+    parser.add_argument("--force-rewrite-zeros", action="store_true",
+                        help="Also repair baselines whose allocations are all zero, overwriting zero rows")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent repair requests (default 8)")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max repair requests per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int, help="Process at most this many baselines")
+    parser.add_argument("--snapshot", type=Path, help="Discover from a local finz_snapshot instead of DynamoDB")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments per table (default 8)")
+    parser.add_argument("--report", type=Path, help="Write the JSON diff/result report here")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    confirm = args.confirm or os.getenv("CONFIRM", "").lower() == "yes"
+    if confirm and _is_prod() and os.getenv("CONFIRM_PROD", "").lower() != "yes":
+        print("❌ Refusing to run materialization backfill in production without CONFIRM_PROD=YES")
+        return 1
+
+    print("🔁 Baseline materialization backfill (allocations + rubros)")
+    print(f"   Mode: {'EXECUTE' if confirm else 'DRY-RUN'}")
+    print(f"   Force rewrite zeros: {'ENABLED' if args.force_rewrite_zeros else 'DISABLED'}")
+
+    columns = {
+        "prefacturas": ("pk", "sk", "baseline_id", "baselineId", "project_id", "projectId", "status"),
+        "projects": ("pk", "sk", "baseline_id", "baselineId", "baseline_status"),
+        "rubros": ("pk", "sk", "baselineId", "baseline_id"),
+        "allocations": ("pk", "sk", "baselineId", "baseline_id", "amount", "planned", "forecast"),
+    }
+    if args.snapshot:
+        reader = SnapshotReader(args.snapshot)
+
+        def _pages(key):
+            return reader.scan(key, columns=columns[key])
+    else:
+        client = dynamo_client(endpoint_url=args.endpoint_url)
+
+        def _pages(key):
+            names = {f"#c{i}": name for i, name in enumerate(columns[key])}
+            return parallel_scan(
+                client, table_name(key), segments=args.segments,
+                ProjectionExpression=", ".join(names), ExpressionAttributeNames=names,
+            )
+
+    started = time.perf_counter()
+    coverage = accepted_baselines(_pages("prefacturas"), _pages("projects"))
+    measure(coverage, _pages("rubros"), _pages("allocations"))
+    selected = [c for c in coverage.values() if c.needs_repair(args.force_rewrite_zeros)]
+    if args.limit:
+        selected = selected[: args.limit]
+    print(f"   Found {len(coverage)} accepted baselines, {len(selected)} need materialization "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    rows: List[Dict[str, Any]] = []
+    if not confirm or not selected:
+        rows = [_row(entry, None, None) for entry in selected]
+    else:
+        try:
+            api_base = resolve_api_base()
+            token, _ = resolve_bearer_token()
+        except ValidationError as exc:
+            print(f"Configuration error: {exc}")
+            return 1
+        backfill = BackfillClient(api_base, token, RateLimiter(args.rate))
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(backfill.materialize, entry, args.force_rewrite_zeros): entry
+                for entry in selected
+            }
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    row = _row(entry, future.result(), None)
+                except Exception as exc:  # reported per baseline; the run continues
+                    row = _row(entry, None, f"{type(exc).__name__}: {exc}")
+                rows.append(row)
+                if row.get("error"):
+                    print(f"   ❌ {entry.baseline_id} (project {entry.project_id}): {row['error']}")
+                else:
+                    print(f"   ✅ {entry.baseline_id}: rubros written {row.get('rubros_written') or 0}, "
+                          f"allocations written {row.get('allocations_written') or 0}")
+        rows.sort(key=lambda r: r["baseline_id"])
+
+    if not confirm:
+        print(f"\n{'Baseline':<40} {'Project':<28} {'Rubros':>7} {'Allocations':>12} {'Non-zero':>9}")
+        for row in rows[:50]:
+            print(f"{row['baseline_id']:<40} {row['project_id']:<28} {row['rubros']:>7} "
+                  f"{row['allocations']:>12} {row['nonzero_allocations']:>9}")
+        if len(rows) > 50:
+            print(f"... {len(rows) - 50} more baselines")
+
+    failures = [r for r in rows if r.get("error")]
+    if args.report:
+        report = {
+            "mode": "execute" if confirm else "dry-run",
+            "forceRewriteZeros": args.force_rewrite_zeros,
+            "acceptedBaselines": len(coverage),
+            "selected": len(selected),
+            "failed": len(failures),
+            "baselines": rows,
+        }
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        print(f"\nReport written to: {args.report}")
+
+    print(f"\nDone in {time.perf_counter() - started:.1f}s ({len(failures)} failures).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the documentation pipeline stages.
+
+Runs the generate_phase5_docs stages on synthetic large inputs in a temporary
+directory and records them with finz_stages.StageRecorder:
+- placeholders:        cold placeholder generation (empty render cache)
+- placeholders_cached: the same set again, served from the render cache
+- docx_build:          create_docx on a synthetic markdown document
+- pdf_convert:         DOCX -> PDF (only with --with-pdf and pandoc/docx2pdf present)
+
+Stages whose backend is not installed are skipped and reported as such.
+
+Compare against a previous report to catch regressions (exit 1):
+  python tools/bench_docs_pipeline.py --report bench.json               # record
+  python tools/bench_docs_pipeline.py --baseline bench.json             # compare
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from finz_cli import has, run_cli  # noqa: E402
+from finz_stages import StageRecorder  # noqa: E402
+
+
+def synthetic_markdown(sections: int) -> str:
+    """Markdown shaped like MD_CONTENT (headings, prose, lists, code blocks), scaled up."""
+    parts: List[str] = ["# Synthetic Benchmark Guide", ""]
+    for i in range(sections):
+        parts += [
+            f"## Section {i}",
+            "",
+            f"Paragraph {i}: budget health EN META / EN RIESGO / SOBRE PRESUPUESTO " * 4,
+            "",
+            f"### Details {i}",
+            "",
+            *(f"- Item {i}.{j}: consumption vs forecast" for j in range(5)),
+            "",
+            "```ts",
+            *(f"const value{j} = computeBudgetHealth(project{i}, {j});" for j in range(8)),
+            "```",
+            "",
+        ]
+    return "\n".join(parts)
+
+
+def run_benchmark(workdir: Path, sections: int, placeholders: int, with_pdf: bool) -> StageRecorder:
+    import generate_phase5_docs as docs
+
+    recorder = StageRecorder("bench_docs_pipeline")
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    filenames = [f"bench_{i:04d}.png" for i in range(placeholders)]
+    cache_dir = workdir / "placeholder-cache"
+
+    if has("images"):
+        cold_dir = workdir / "shots-cold"
+        with recorder.stage("placeholders", outputs=[cold_dir]) as stage, quiet:
+            docs.create_screenshot_placeholders(cold_dir, filenames, cache_dir=cache_dir)
+            stage["images"] = placeholders
+        warm_dir = workdir / "shots-warm"
+        with recorder.stage("placeholders_cached", outputs=[warm_dir]) as stage, quiet:
+            docs.create_screenshot_placeholders(warm_dir, filenames, cache_dir=cache_dir)
+            stage["images"] = placeholders
+    else:
+        print("⚠️  Skipping placeholder stages (Pillow not installed)")
+
+    if not has("docx"):
+        print("⚠️  Skipping docx_build/pdf_convert (python-docx not installed)")
+        return recorder
+
+    md_text = synthetic_markdown(sections)
+    docx_path = workdir / "bench.docx"
+    with recorder.stage("docx_build", document=docx_path.name, outputs=[docx_path]) as stage, quiet:
+        stage["input_bytes"] = len(md_text.encode("utf-8"))
+        docs.create_docx(md_text, docx_path)
+
+    if with_pdf:
+        if has("pandoc") or has("docx2pdf"):
+            pdf_path = workdir / "bench.pdf"
+            with recorder.stage("pdf_convert", document=pdf_path.name, outputs=[pdf_path]), quiet:
+                docs.convert_docx_to_pdf(docx_path, pdf_path)
+        else:
+            print("⚠️  Skipping pdf_convert (neither pandoc nor docx2pdf available)")
+    return recorder
+
+
+def find_regressions(current: Dict, baseline: Dict, tolerance: float, slack_s: float) -> List[str]:
+    """Stages whose wall time grew past baseline * (1 + tolerance) + slack."""
+    regressions = []
+    for name, base in baseline.get("totals", {}).items():
+        cur = current["totals"].get(name)
+        if cur is None:
+            continue
+        limit = base["wall_s"] * (1 + tolerance) + slack_s
+        if cur["wall_s"] > limit:
+            regressions.append(f"{name}: {cur['wall_s']:.3f}s > {limit:.3f}s (baseline {base['wall_s']:.3f}s)")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark docs pipeline stages on synthetic large documents.")
+    parser.add_argument("--sections", type=int, default=2000, help="Synthetic markdown sections (default 2000)")
+    parser.add_argument("--placeholders", type=int, default=200, help="Synthetic placeholder images (default 200)")
+    parser.add_argument("--with-pdf", action="store_true", help="Include the DOCX -> PDF conversion stage")
+    parser.add_argument("--report", type=Path, help="Write the stage report JSON here")
+    parser.add_argument("--baseline", type=Path, help="Previous stage report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (default 0.25)")
+    parser.add_argument("--slack-ms", type=float, default=50.0, help="Absolute slack per stage (default 50ms)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docs-bench-") as tmp:
+        recorder = run_benchmark(Path(tmp), args.sections, args.placeholders, args.with_pdf)
+        report = recorder.report()
+
+    recorder.print_summary()
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"⏱️  Stage report: {args.report}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(report, baseline, args.tolerance, args.slack_ms / 1000.0)
+        if regressions:
+            print("\n❌ Stage regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n✅ No stage regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
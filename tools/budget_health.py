@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Vectorized portfolio budget-health calculator for the nightly audits.
+
+Applies the Budget Health rules of the Phase 5 TODOS layout
+(generate_phase5_docs.MD_CONTENT, ForecastSummaryBar.getBudgetHealthStatus):
+- SIN PRESUPUESTO:   budget == 0
+- SOBRE PRESUPUESTO: forecast > budget OR consumption > 100%
+- EN RIESGO:         consumption > 90% (and forecast <= budget)
+- EN META:           otherwise
+where consumption = actual / budget * 100 and variance = forecast - budget.
+
+Per-project monthly budget, forecast and actual series are loaded into
+(projects x 12) NumPy matrices and every project/month status is computed in
+one vectorized pass, both for the month itself and year-to-date (cumulative).
+The TODOS portfolio row is the column sum. The result is written as a JSON
+portfolio snapshot (and optionally the raw matrices as .npz).
+
+Input is long format, one row per project and month, as CSV, JSON array or
+JSON lines with the fields: project_id, month (1-12 or YYYY-MM), budget,
+forecast, actual. Repeated rows for the same project/month are summed.
+With --snapshot DIR the series come from a local finz_snapshot instead, with
+no network I/O: the budget is the finz_allocations amount per calendar_month
+of each project's current baseline (finz_projects METADATA), forecast and
+actual are the finz_payroll_actuals entries of that kind. Months without a
+forecast entry are forecast at their budget.
+
+Usage:
+  python tools/budget_health.py series.csv --year 2026 --output portfolio-health.json
+  python tools/budget_health.py --snapshot snapshots/latest --year 2026
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as _dt
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from finz_allocations import ALLOCATION_COLUMNS, PROJECT_BASELINE_COLUMNS, current_baselines, plan_rows
+from finz_cli import lazy_import, run_cli
+from finz_payroll import PAYROLL_COLUMNS, payroll_key_of
+from finz_snapshot import SnapshotReader
+
+np = lazy_import("numpy", capability="numpy")
+
+MONTHS = 12
+AT_RISK_PCT = 90.0
+OVER_BUDGET_PCT = 100.0
+
+SIN_PRESUPUESTO, EN_META, EN_RIESGO, SOBRE_PRESUPUESTO = range(4)
+STATUS_LABELS = ("SIN PRESUPUESTO", "EN META", "EN RIESGO", "SOBRE PRESUPUESTO")
+
+
+def _parse_month(value: Any, year: Optional[int]) -> Optional[int]:
+    """Month number 1-12, or None when the row belongs to another year."""
+    text = str(value).strip()
+    if "-" in text:
+        row_year, month = text.split("-")[:2]
+        if year is not None and int(row_year) != year:
+            return None
+        return int(month)
+    return int(text)
+
+
+def _iter_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as fh:
+            yield from csv.DictReader(fh)
+    elif path.suffix.lower() in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from json.loads(path.read_text(encoding="utf-8"))
+
+
+def snapshot_rows(
+    allocation_pages: Iterable[List[Dict[str, Any]]],
+    payroll_pages: Iterable[List[Dict[str, Any]]],
+    baselines: Optional[Dict[str, str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Series rows from finz_allocations (budget) and finz_payroll_actuals (forecast, actual).
+
+    A project/month without forecast entries is forecast at its budget, as in
+    the API, so only explicit forecasts move a project to SOBRE PRESUPUESTO.
+    """
+    budget: Dict[Tuple[str, str], float] = defaultdict(float)
+    forecast: Dict[Tuple[str, str], float] = defaultdict(float)
+    actual: Dict[Tuple[str, str], float] = defaultdict(float)
+    for project_id, period, amount in plan_rows(allocation_pages, baselines):
+        budget[project_id, period] += amount
+    for page in payroll_pages:
+        for item in page:
+            project_id, period, kind = payroll_key_of(item)
+            if project_id and period and kind in ("forecast", "actual"):
+                series = forecast if kind == "forecast" else actual
+                series[project_id, period] += float(item.get("amount") or 0)
+    for key in sorted(set(budget) | set(forecast) | set(actual)):
+        yield {
+            "project_id": key[0],
+            "month": key[1],
+            "budget": budget.get(key, 0.0),
+            "forecast": forecast[key] if key in forecast else budget.get(key, 0.0),
+            "actual": actual.get(key, 0.0),
+        }
+
+
+def load_series(rows: Iterable[Dict[str, Any]], year: Optional[int] = None):
+    """Build (project_ids, budget, forecast, actual) with (projects x 12) float matrices."""
+    projects: List[str] = []
+    months: List[int] = []
+    values: List[Tuple[float, float, float]] = []
+    for row in rows:
+        month = _parse_month(row["month"], year)
+        if month is None:
+            continue
+        if not 1 <= month <= MONTHS:
+            raise ValueError(f"Invalid month {row['month']!r} for project {row.get('project_id')}")
+        projects.append(str(row["project_id"]))
+        months.append(month - 1)
+        values.append(
+            (float(row.get("budget") or 0), float(row.get("forecast") or 0), float(row.get("actual") or 0))
+        )
+
+    project_ids, project_idx = np.unique(np.asarray(projects, dtype=object), return_inverse=True)
+    series = np.zeros((3, len(project_ids), MONTHS), dtype=np.float64)
+    if values:
+        columns = np.asarray(values, dtype=np.float64).T
+        month_idx = np.asarray(months, dtype=np.intp)
+        for k in range(3):
+            np.add.at(series[k], (project_idx, month_idx), columns[k])
+    return project_ids, series[0], series[1], series[2]
+
+
+def health_status(budget, forecast, actual):
+    """Element-wise (status codes, consumption %, variance, variance %) for any array shape."""
+    has_budget = budget != 0
+    safe_budget = np.where(has_budget, budget, 1.0)
+    consumption = np.where(has_budget, actual / safe_budget * 100.0, np.nan)
+    variance = forecast - budget
+    variance_pct = np.where(has_budget, variance / safe_budget * 100.0, np.nan)
+    with np.errstate(invalid="ignore"):
+        status = np.select(
+            [~has_budget, (forecast > budget) | (consumption > OVER_BUDGET_PCT), consumption > AT_RISK_PCT],
+            [SIN_PRESUPUESTO, SOBRE_PRESUPUESTO, EN_RIESGO],
+            default=EN_META,
+        ).astype(np.int8)
+    return status, consumption, variance, variance_pct
+
+
+@dataclass
+class PortfolioHealth:
+    project_ids: Any
+    budget: Any
+    forecast: Any
+    actual: Any
+    monthly_status: Any  # (projects x 12) int8
+    ytd_status: Any  # (projects x 12) int8, cumulative through each month
+    ytd_consumption: Any
+    ytd_variance: Any
+    portfolio_monthly: Dict[str, Any]
+    portfolio_ytd: Dict[str, Any]
+
+
+def compute(project_ids, budget, forecast, actual) -> PortfolioHealth:
+    monthly_status, _, _, _ = health_status(budget, forecast, actual)
+    ytd_b, ytd_f, ytd_a = (np.cumsum(m, axis=1) for m in (budget, forecast, actual))
+    ytd_status, ytd_consumption, ytd_variance, _ = health_status(ytd_b, ytd_f, ytd_a)
+
+    # TODOS portfolio row: column sums, monthly and cumulative
+    pb, pf, pa = budget.sum(axis=0), forecast.sum(axis=0), actual.sum(axis=0)
+    p_status, p_cons, p_var, p_var_pct = health_status(pb, pf, pa)
+    cb, cf, ca = np.cumsum(pb), np.cumsum(pf), np.cumsum(pa)
+    c_status, c_cons, c_var, c_var_pct = health_status(cb, cf, ca)
+
+    return PortfolioHealth(
+        project_ids=project_ids,
+        budget=budget,
+        forecast=forecast,
+        actual=actual,
+        monthly_status=monthly_status,
+        ytd_status=ytd_status,
+        ytd_consumption=ytd_consumption,
+        ytd_variance=ytd_variance,
+        portfolio_monthly={
+            "budget": pb, "forecast": pf, "actual": pa, "status": p_status,
+            "consumption_pct": p_cons, "variance": p_var, "variance_pct": p_var_pct,
+        },
+        portfolio_ytd={
+            "budget": cb, "forecast": cf, "actual": ca, "status": c_status,
+            "consumption_pct": c_cons, "variance": c_var, "variance_pct": c_var_pct,
+        },
+    )
+
+
+def _clean(values) -> List[Optional[float]]:
+    """Round floats for JSON and map NaN to null."""
+    rounded = np.round(values.astype(np.float64), 2)
+    return [None if v != v else v for v in rounded.tolist()]
+
+
+def build_snapshot(health: PortfolioHealth, as_of_month: int, year: Optional[int]) -> Dict[str, Any]:
+    col = as_of_month - 1
+    labels = np.asarray(STATUS_LABELS, dtype=object)
+    current = health.ytd_status[:, col]
+    counts = np.bincount(current, minlength=len(STATUS_LABELS))
+
+    def _portfolio(series: Dict[str, Any]) -> List[Dict[str, Any]]:
+        columns = {k: _clean(v) for k, v in series.items() if k != "status"}
+        status = labels[series["status"]].tolist()
+        return [
+            {"month": m + 1, "status": status[m], **{k: columns[k][m] for k in columns}}
+            for m in range(MONTHS)
+        ]
+
+    consumption = _clean(health.ytd_consumption[:, col])
+    variance = _clean(health.ytd_variance[:, col])
+    monthly_labels = labels[health.monthly_status].tolist()
+    projects = [
+        {
+            "project_id": pid,
+            "status": status,
+            "consumption_pct": consumption[i],
+            "variance": variance[i],
+            "monthly_status": monthly_labels[i],
+        }
+        for i, (pid, status) in enumerate(zip(health.project_ids.tolist(), labels[current].tolist()))
+    ]
+    return {
+        "schema": "finz-budget-health/v1",
+        "generated_at": _dt.datetime.now(_dt.timezone.utc).isoformat(),
+        "year": year,
+        "as_of_month": as_of_month,
+        "project_count": len(projects),
+        "status_counts": dict(zip(STATUS_LABELS, counts.tolist())),
+        "portfolio": {
+            "status": labels[health.portfolio_ytd["status"][col]],
+            "monthly": _portfolio(health.portfolio_monthly),
+            "ytd": _portfolio(health.portfolio_ytd),
+        },
+        "projects": projects,
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compute budget health for every project/month and the TODOS view.")
+    parser.add_argument("series", type=Path, nargs="?", help="Monthly series (CSV, JSON or JSON lines)")
+    parser.add_argument("--snapshot", type=Path, help="Read the series from a local finz_snapshot instead")
+    parser.add_argument("--year", type=int, help="Keep only YYYY-MM rows of this year (snapshot default: current)")
+    parser.add_argument("--as-of-month", type=int, default=MONTHS, help="Month (1-12) for the current status")
+    parser.add_argument("--output", type=Path, default=Path("portfolio-health.json"), help="Snapshot JSON path")
+    parser.add_argument("--npz", type=Path, help="Also write the raw matrices and status codes as .npz")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if not 1 <= args.as_of_month <= MONTHS:
+        parser.error("--as-of-month must be between 1 and 12")
+    if bool(args.series) == bool(args.snapshot):
+        parser.error("provide either a series file or --snapshot")
+
+    if args.snapshot:
+        args.year = args.year or _dt.date.today().year
+        reader = SnapshotReader(args.snapshot)
+        missing = [key for key in ("projects", "allocations", "payroll_actuals") if not reader.has_table(key)]
+        if missing:
+            parser.error(f"snapshot {args.snapshot} has no {', '.join(missing)} table(s)")
+        baselines = current_baselines(reader.scan("projects", columns=PROJECT_BASELINE_COLUMNS))
+        rows = snapshot_rows(
+            reader.scan("allocations", columns=ALLOCATION_COLUMNS),
+            reader.scan("payroll_actuals", columns=PAYROLL_COLUMNS),
+            baselines,
+        )
+    else:
+        rows = _iter_rows(args.series)
+    project_ids, budget, forecast, actual = load_series(rows, args.year)
+    health = compute(project_ids, budget, forecast, actual)
+    snapshot = build_snapshot(health, args.as_of_month, args.year)
+
+    args.output.write_text(json.dumps(snapshot, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.npz:
+        np.savez_compressed(
+            args.npz,
+            project_ids=project_ids.astype(str),
+            budget=budget,
+            forecast=forecast,
+            actual=actual,
+            monthly_status=health.monthly_status,
+            ytd_status=health.ytd_status,
+        )
+
+    print(f"✓ {snapshot['project_count']} projects, portfolio status: {snapshot['portfolio']['status']}")
+    for label, count in snapshot["status_counts"].items():
+        print(f"  {label:<18} {count}")
+    print(f"Snapshot written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
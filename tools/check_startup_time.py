@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the Finanzas Python CLIs.
+
+Each CLI is started in a fresh interpreter as ``python -X importtime <cli> --help``.
+The check fails (exit 1) when:
+- the summed cumulative import time of top-level imports exceeds the budget, or
+- a heavy backend (boto3, requests, python-docx, Pillow, numpy, ...) is imported
+  just to print help, which means a lazy import regressed to an eager one.
+
+Usage:
+  python tools/check_startup_time.py                 # default budget
+  python tools/check_startup_time.py --budget-ms 80  # or STARTUP_BUDGET_MS=80
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CLIS = [
+    "tools/validate_project_pk_sk_uniqueness.py",
+    "generate_phase5_docs.py",
+    "scripts/docs/render_pdfs.py",
+    "scripts/docs/diagram_cache.py",
+    "tools/bench_docs_pipeline.py",
+    "tools/taxonomy_diff.py",
+    "tools/audit_canonical_rubros.py",
+    "tools/budget_health.py",
+    "tools/finz_snapshot.py",
+    "tools/incremental_integrity.py",
+    "tools/backfill_materialization.py",
+    "tools/audit_rollup.py",
+    "tools/payroll_reconciliation.py",
+]
+HEAVY_MODULES = ("boto3", "botocore", "requests", "docx", "PIL", "numpy", "pyarrow")
+DEFAULT_BUDGET_MS = 150.0
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, int]]:
+    """Return (total top-level cumulative ms, {module: cumulative us}) from -X importtime output."""
+    total_us = 0
+    modules: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header line
+        cumulative = int(parts[1])
+        name = parts[2].rstrip()
+        modules[name.strip()] = cumulative
+        # Nested imports are indented by two spaces per level after the leading one
+        if not name.startswith("  "):
+            total_us += cumulative
+    return total_us / 1000.0, modules
+
+
+def measure(cli: str, repeat: int) -> Tuple[float, List[str]]:
+    """Best-of-N startup import time for a CLI and the heavy modules it pulled in."""
+    best_ms = float("inf")
+    heavy: List[str] = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", str(REPO_ROOT / cli), "--help"],
+            capture_output=True,
+            text=True,
+            cwd=str(REPO_ROOT),
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{cli} --help exited with {proc.returncode}: {proc.stderr[-500:]}")
+        total_ms, modules = parse_importtime(proc.stderr)
+        best_ms = min(best_ms, total_ms)
+        heavy = sorted({m for m in modules if m.split(".")[0] in HEAVY_MODULES})
+    return best_ms, heavy
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fail when CLI cold start regresses past a budget.")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help=f"Import-time budget per CLI in milliseconds (default {DEFAULT_BUDGET_MS:g})",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per CLI; the fastest is kept")
+    parser.add_argument("clis", nargs="*", default=CLIS, help="CLI paths relative to the repo root")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for cli in args.clis:
+        total_ms, heavy = measure(cli, max(1, args.repeat))
+        status = "✅"
+        if total_ms > args.budget_ms or heavy:
+            status = "❌"
+            failures += 1
+        print(f"{status} {cli}: {total_ms:.1f} ms (budget {args.budget_ms:g} ms)")
+        if heavy:
+            print(f"   heavy modules imported for --help: {', '.join(heavy)}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
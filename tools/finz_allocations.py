@@ -0,0 +1,80 @@
+"""
+finz_allocations item parsing shared by the Python tools.
+
+Allocation items are keyed ``pk=PROJECT#{projectId}`` /
+``sk=ALLOCATION#{baselineId}#{YYYY-MM}#{canonicalId}``. A re-baselined
+project keeps the allocations of its earlier baselines, so plan totals must
+only count the baseline named by the project's METADATA (``baseline_id``).
+The amount precedence is the API's (getAllocationAmount in
+services/finanzas-api/src/lib/materializers.ts): amount, planned, forecast.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from finz_payroll import period_of
+from finz_snapshot import project_id_of
+
+AMOUNT_FIELDS = ("amount", "planned", "forecast")
+# Columns needed by allocation_baseline / current_baselines, for projections
+ALLOCATION_KEY_COLUMNS = ("pk", "sk", "baselineId", "baseline_id")
+PROJECT_BASELINE_COLUMNS = ("pk", "sk", "baseline_id", "baselineId")
+# Columns needed by plan_rows
+ALLOCATION_COLUMNS = ALLOCATION_KEY_COLUMNS + ("project_id", "projectId", "calendar_month", "calendarMonthKey",
+                                               "month", "planned", "amount", "forecast")
+
+
+def allocation_amount(item: Dict[str, Any]) -> float:
+    """The allocation's amount, with the same field precedence as getAllocationAmount."""
+    for name in AMOUNT_FIELDS:
+        if item.get(name) is not None:
+            return float(item[name])
+    return 0.0
+
+
+def allocation_baseline(item: Dict[str, Any]) -> Optional[str]:
+    """Baseline ID of an allocation, from its sort key or the baselineId attribute."""
+    parts = str(item.get("sk", "")).split("#")
+    if len(parts) >= 3 and parts[0] == "ALLOCATION":
+        return parts[1]
+    return item.get("baselineId") or item.get("baseline_id")
+
+
+def current_baselines(project_pages: Iterable[List[Dict[str, Any]]]) -> Dict[str, str]:
+    """Current baseline ID per project ID, from the finz_projects METADATA items."""
+    current: Dict[str, str] = {}
+    for page in project_pages:
+        for item in page:
+            if item.get("sk") != "METADATA":
+                continue
+            project_id = project_id_of(item)
+            baseline_id = item.get("baseline_id") or item.get("baselineId")
+            if project_id and baseline_id:
+                current[project_id] = str(baseline_id)
+    return current
+
+
+def is_current(item: Dict[str, Any], project_id: str, current: Optional[Dict[str, str]]) -> bool:
+    """False for allocations of a baseline the project has since replaced."""
+    if not current or project_id not in current:
+        return True
+    baseline_id = allocation_baseline(item)
+    return baseline_id is None or baseline_id == current[project_id]
+
+
+def plan_rows(
+    pages: Iterable[List[Dict[str, Any]]],
+    baselines: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[str, str, float]]:
+    """(project_id, period YYYY-MM, amount) of every allocation of the current baselines.
+
+    Only the amount is meaningful: the materializer copies it into
+    ``forecast`` and writes ``actual: 0``, so forecasts and actuals come from
+    finz_payroll_actuals.
+    """
+    for page in pages:
+        for item in page:
+            project_id = project_id_of(item)
+            period = period_of(item.get("calendar_month") or item.get("calendarMonthKey") or item.get("month"))
+            if project_id and period and is_current(item, project_id, baselines):
+                yield project_id, period, allocation_amount(item)
@@ -0,0 +1,74 @@
+"""
+finz_audit_log key parsing shared by the Python tools.
+
+The API handlers write audit entries as ``pk=ENTITY#PROJECT#{projectId}`` /
+``sk=TS#{timestamp}[#...]``; the data model docs describe the older
+``pk=PROJECT#{projectId}`` / ``sk=AUDIT#{timestamp}`` layout. Both are
+accepted, falling back to the ``timestamp`` / ``resource_id`` attributes.
+"""
+from __future__ import annotations
+
+import datetime as _dt
+from typing import Any, Dict, Optional, Tuple
+
+# (pk prefix, sk prefix) per layout; sk is the prefix followed by an ISO timestamp
+AUDIT_KEY_LAYOUTS = {
+    "handlers": ("ENTITY#PROJECT#", "TS#"),
+    "docs": ("PROJECT#", "AUDIT#"),
+}
+AUDIT_PK_PREFIXES = tuple(pk for pk, _ in AUDIT_KEY_LAYOUTS.values())
+AUDIT_SK_PREFIXES = tuple(sk for _, sk in AUDIT_KEY_LAYOUTS.values())
+ACTOR_ATTRIBUTES = ("user", "actor", "performed_by", "userEmail", "accepted_by")
+
+
+def parse_timestamp(value: Any) -> Optional[_dt.datetime]:
+    """Parse an ISO-8601 timestamp (``Z`` suffix allowed) as an aware UTC datetime."""
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = _dt.datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=_dt.timezone.utc)
+    return parsed.astimezone(_dt.timezone.utc)
+
+
+def format_timestamp(value: _dt.datetime) -> str:
+    """Same format as JavaScript ``Date.toISOString()`` (millisecond precision, ``Z``)."""
+    value = value.astimezone(_dt.timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def audit_key_of(item: Dict[str, Any]) -> Tuple[Optional[str], Optional[_dt.datetime]]:
+    """(project_id, timestamp) of an audit entry; either may be None."""
+    pk = str(item.get("pk") or "")
+    project_id = None
+    for prefix in AUDIT_PK_PREFIXES:
+        if pk.startswith(prefix):
+            project_id = pk[len(prefix):]
+            break
+    if project_id is None and item.get("resource_type") == "project":
+        project_id = item.get("resource_id")
+
+    sk = str(item.get("sk") or "")
+    timestamp = None
+    for prefix in AUDIT_SK_PREFIXES:
+        if sk.startswith(prefix):
+            timestamp = parse_timestamp(sk[len(prefix):].split("#", 1)[0])
+            break
+    if timestamp is None:
+        timestamp = parse_timestamp(item.get("timestamp"))
+    return project_id, timestamp
+
+
+def actor_of(item: Dict[str, Any]) -> str:
+    """Who made the change; the handlers store the caller's email in ``user``."""
+    for name in ACTOR_ATTRIBUTES:
+        value = item.get(name)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return "unknown"
@@ -0,0 +1,191 @@
+"""
+Shared entry layer for the Finanzas Python CLIs.
+
+Heavy backends (boto3, requests, python-docx, Pillow, ...) are never imported at
+module load. Scripts declare them with ``lazy_import`` and the import, together
+with a dependency probe for the capability that needs it, only happens on first
+use. That keeps ``--help``, argument errors and configuration errors fast.
+
+Usage from a script:
+
+    from finz_cli import lazy_import, run_cli
+
+    boto3 = lazy_import("boto3", capability="aws")
+
+    def main(argv=None) -> int:
+        ...
+
+    if __name__ == "__main__":
+        sys.exit(run_cli(main))
+
+CLIs that declare ``add_profile_arguments(parser)`` can be run with
+``--profile cpu|mem [--profile-dir DIR]``: the option starts a finz_profile
+session when the parser accepts it and run_cli writes the reports once
+``main`` returns. Other CLIs keep their own meaning of ``--profile``.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import shutil
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Capability:
+    """A named feature backed by Python modules and/or executables on PATH."""
+
+    modules: Tuple[str, ...] = ()
+    executables: Tuple[str, ...] = ()
+    install_hint: str = ""
+
+
+CAPABILITIES: Dict[str, Capability] = {
+    "aws": Capability(modules=("boto3", "botocore"), install_hint="pip install boto3"),
+    "http": Capability(modules=("requests",), install_hint="pip install requests"),
+    "docx": Capability(modules=("docx",), install_hint="pip install python-docx"),
+    "images": Capability(modules=("PIL",), install_hint="pip install Pillow"),
+    "docx2pdf": Capability(modules=("docx2pdf",), install_hint="pip install docx2pdf"),
+    "numpy": Capability(modules=("numpy",), install_hint="pip install numpy"),
+    "arrow": Capability(modules=("pyarrow",), install_hint="pip install pyarrow"),
+    "pandoc": Capability(
+        executables=("pandoc",),
+        install_hint="brew install pandoc / apt-get install pandoc",
+    ),
+    "pdfunite": Capability(
+        executables=("pdfunite",),
+        install_hint="brew install poppler / apt-get install poppler-utils",
+    ),
+    "plantuml": Capability(
+        executables=("plantuml",),
+        install_hint="brew install plantuml / apt-get install plantuml (or set PLANTUML_CMD)",
+    ),
+}
+
+
+class MissingDependencyError(Exception):
+    """Raised when a capability is needed but its backend is not installed."""
+
+    def __init__(self, capability: str, missing: Sequence[str]):
+        hint = CAPABILITIES[capability].install_hint if capability in CAPABILITIES else ""
+        message = f"'{capability}' requires {', '.join(missing)} which is not available"
+        if hint:
+            message += f". Install with: {hint}"
+        super().__init__(message)
+        self.capability = capability
+        self.missing = list(missing)
+
+
+@lru_cache(maxsize=None)
+def probe(capability: str) -> Tuple[str, ...]:
+    """Return the missing modules/executables for a capability (empty when usable).
+
+    Only ``find_spec`` and ``shutil.which`` are used, so probing never imports
+    the backend itself. Results are cached for the lifetime of the process.
+    """
+    spec = CAPABILITIES[capability]
+    missing: List[str] = []
+    for module in spec.modules:
+        if importlib.util.find_spec(module) is None:
+            missing.append(module)
+    for exe in spec.executables:
+        if shutil.which(exe) is None:
+            missing.append(exe)
+    return tuple(missing)
+
+
+def has(capability: str) -> bool:
+    return not probe(capability)
+
+
+def require(capability: str) -> None:
+    missing = probe(capability)
+    if missing:
+        raise MissingDependencyError(capability, missing)
+
+
+class _LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str, capability: Optional[str]):
+        self.__dict__["_name"] = name
+        self.__dict__["_capability"] = capability
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            capability = self.__dict__["_capability"]
+            if capability:
+                require(capability)
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name: str, capability: Optional[str] = None):
+    """Return a proxy for ``name`` that is imported (and probed) on first use."""
+    return _LazyModule(name, capability)
+
+
+class _ProfileAction(argparse.Action):
+    """Stores --profile and starts the profiler as soon as the CLI's own parser accepts it."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        global _profile
+        setattr(namespace, self.dest, values)
+        if _profile is None:
+            from finz_profile import ProfileSession
+
+            session = ProfileSession(values)
+            session.start()
+            # --profile-dir is read from the namespace when run_cli stops the session
+            _profile = (session, namespace)
+
+
+# (session, namespace) of a --profile run in progress; only parsers built with
+# add_profile_arguments can start one, so other CLIs never profile
+_profile: Optional[Tuple[object, argparse.Namespace]] = None
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Declare the --profile options handled by run_cli."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", choices=("cpu", "mem"), action=_ProfileAction,
+                       help="Profile this run (cProfile or tracemalloc)")
+    group.add_argument("--profile-dir", type=Path, help="Profile report directory (default FINZ_PROFILE_DIR or profiles/)")
+
+
+def _stop_profile() -> None:
+    global _profile
+    if _profile is not None:
+        (session, namespace), _profile = _profile, None
+        # Reports are written even when main fails; that is when they matter most
+        session.stop(getattr(namespace, "profile_dir", None))
+
+
+def run_cli(main: Callable[..., int], argv: Optional[Sequence[str]] = None) -> int:
+    """Run a CLI ``main`` and turn missing dependencies into a clean exit code."""
+    try:
+        try:
+            return main(argv) or 0
+        finally:
+            _stop_profile()
+    except MissingDependencyError as exc:
+        print(f"Dependency error: {exc}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
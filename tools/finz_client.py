@@ -0,0 +1,328 @@
+"""
+Shared data-access client for the Finanzas tables.
+
+One I/O path for the validation, audit and backfill tools:
+- typed key builders (``Key`` plus one builder per item or partition the
+  tools read: project and baseline metadata, baseline links, audit
+  partitions); the bulk tools that scan rubros, allocations and payroll
+  parse those keys instead (finz_allocations, payroll_reconciliation),
+- an LRU + TTL read-through cache of point reads; missing items are cached
+  as ``{}`` too, and complete items returned by ``query`` prime it,
+- in-flight coalescing: concurrent ``get`` calls for the same key share one
+  read,
+- micro-batching: point reads issued within ``batch_window`` seconds of each
+  other (from any thread) are sent as one ``batch_get_item`` of up to 100
+  keys, with retry of UnprocessedKeys,
+- hit-rate and latency counters (``stats`` / ``format_stats``).
+
+Items are plain Python values as in finz_dynamo (numbers are ``Decimal``).
+Returned items are shallow copies of the cached ones. The cache is
+process-local: use ``invalidate`` after writing, or ``ttl_seconds=0`` for
+read-after-write checks that must always go to DynamoDB.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from finz_audit import AUDIT_KEY_LAYOUTS
+from finz_dynamo import deserialize_item, serialize_item, table_name
+
+BATCH_GET_LIMIT = 100
+BATCH_GET_ATTEMPTS = 6
+LATENCY_SAMPLES = 10_000
+COUNTERS = ("gets", "hits", "misses", "coalesced", "batches", "keys_fetched", "unprocessed_retries")
+
+
+class Key(NamedTuple):
+    table: str  # table key, resolved with finz_dynamo.table_name
+    pk: str
+    sk: str
+
+
+def project_partition(project_id: str) -> str:
+    return f"PROJECT#{project_id}"
+
+
+def project_metadata_key(project_id: str) -> Key:
+    return Key("projects", project_partition(project_id), "METADATA")
+
+
+def baseline_link_key(project_id: str, baseline_id: str) -> Key:
+    return Key("prefacturas", project_partition(project_id), f"BASELINE#{baseline_id}")
+
+
+def baseline_metadata_key(baseline_id: str) -> Key:
+    return Key("prefacturas", f"BASELINE#{baseline_id}", "METADATA")
+
+
+def audit_partition(project_id: str, layout: str = "handlers") -> str:
+    return f"{AUDIT_KEY_LAYOUTS[layout][0]}{project_id}"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl_seconds`` after being stored."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries: "OrderedDict[Key, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Key) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Key, item: Dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, item)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Key] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FinanzasClient:
+    """Cached, coalescing, micro-batching point reads (and counted queries) over a low-level client."""
+
+    def __init__(
+        self,
+        client,
+        cache: Optional[TTLCache] = None,
+        batch_window: float = 0.002,
+        consistent_read: bool = False,
+    ):
+        self.client = client
+        self.cache = cache if cache is not None else TTLCache()
+        self.batch_window = batch_window
+        self.consistent_read = consistent_read
+        self.counters: Counter = Counter(dict.fromkeys(COUNTERS, 0))
+        self.latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._inflight: Dict[Key, Future] = {}
+        self._pending: Dict[Key, Future] = {}
+        self._leader = False
+
+    # -- point reads -------------------------------------------------------
+
+    def get(self, key: Key) -> Dict[str, Any]:
+        """The item at ``key``, or ``{}`` when it does not exist."""
+        futures, batches, leader = self._submit([key])
+        if leader:
+            # First key of a new batch: give concurrent callers a moment to join it
+            time.sleep(self.batch_window)
+            batches += self._take_pending()
+        self._fetch_all(batches)
+        return dict(futures[0].result())
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, Dict[str, Any]]:
+        """Items of several keys at once, fetched in as few batch_get_item calls as possible."""
+        keys = list(dict.fromkeys(keys))
+        futures, batches, _ = self._submit(keys)
+        self._fetch_all(batches + self._take_pending())
+        return {key: dict(future.result()) for key, future in zip(keys, futures)}
+
+    def invalidate(self, key: Optional[Key] = None) -> None:
+        self.cache.invalidate(key)
+
+    def _submit(self, keys: List[Key]) -> Tuple[List[Future], List[Dict[Key, Future]], bool]:
+        """Futures of ``keys``, the full batches to fetch now, and whether the caller leads the next one."""
+        futures: List[Future] = []
+        full: List[Dict[Key, Future]] = []
+        leader = False
+        with self._lock:
+            for key in keys:
+                self.counters["gets"] += 1
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.counters["hits"] += 1
+                    future: Future = Future()
+                    future.set_result(cached)
+                elif key in self._inflight:
+                    self.counters["coalesced"] += 1
+                    future = self._inflight[key]
+                else:
+                    self.counters["misses"] += 1
+                    future = Future()
+                    self._inflight[key] = future
+                    self._pending[key] = future
+                    if len(self._pending) >= BATCH_GET_LIMIT:
+                        full.append(self._pending)
+                        self._pending = {}
+                futures.append(future)
+            if self._pending and not self._leader:
+                self._leader = leader = True
+        return futures, full, leader
+
+    def _take_pending(self) -> List[Dict[Key, Future]]:
+        with self._lock:
+            self._leader = False
+            batch, self._pending = self._pending, {}
+        return [batch] if batch else []
+
+    def _fetch_all(self, batches: List[Dict[Key, Future]]) -> None:
+        """Fetch every batch; a failed batch fails its own futures only, so callers see the error in result()."""
+        for n, batch in enumerate(batches):
+            try:
+                self._fetch(batch)
+            except Exception:
+                continue  # already set on the batch's futures
+            except BaseException as exc:
+                # Interrupted: resolve the rest too, so no caller waits on them forever
+                for rest in batches[n + 1:]:
+                    self._fail(rest, exc)
+                raise
+
+    def _fail(self, batch: Dict[Key, Future], exc: BaseException) -> None:
+        with self._lock:
+            for key, future in batch.items():
+                self._inflight.pop(key, None)
+                future.set_exception(exc)
+
+    def _fetch(self, batch: Dict[Key, Future]) -> None:
+        if not batch:
+            return
+        by_table: Dict[str, List[Key]] = {}
+        for key in batch:
+            by_table.setdefault(table_name(key.table), []).append(key)
+        table_keys = {physical: keys[0].table for physical, keys in by_table.items()}
+        request = {
+            physical: {
+                "Keys": [serialize_item({"pk": key.pk, "sk": key.sk}) for key in keys],
+                "ConsistentRead": self.consistent_read,
+            }
+            for physical, keys in by_table.items()
+        }
+        found: Dict[Key, Dict[str, Any]] = {}
+        try:
+            for attempt in range(BATCH_GET_ATTEMPTS):
+                start = time.perf_counter()
+                resp = self.client.batch_get_item(RequestItems=request)
+                self._record("batch_get_item", start)
+                for physical, items in resp.get("Responses", {}).items():
+                    for raw in items:
+                        item = deserialize_item(raw)
+                        found[Key(table_keys[physical], str(item.get("pk")), str(item.get("sk")))] = item
+                request = resp.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+                with self._lock:
+                    self.counters["unprocessed_retries"] += 1
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+            else:
+                raise RuntimeError(f"batch_get_item left unprocessed keys after {BATCH_GET_ATTEMPTS} attempts")
+        except BaseException as exc:
+            self._fail(batch, exc)
+            raise
+
+        with self._lock:
+            self.counters["batches"] += 1
+            self.counters["keys_fetched"] += len(batch)
+            for key, future in batch.items():
+                item = found.get(key, {})
+                self.cache.put(key, item)
+                self._inflight.pop(key, None)
+                future.set_result(item)
+
+    # -- queries -----------------------------------------------------------
+
+    def query(
+        self,
+        table_key: str,
+        pk: str,
+        sk_prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Items of one partition (optionally ``begins_with(sk, sk_prefix)``); they also prime the cache."""
+        values = {":pk": pk}
+        condition = "#pk = :pk"
+        if sk_prefix:
+            condition += " AND begins_with(#sk, :prefix)"
+            values[":prefix"] = sk_prefix
+        kwargs: Dict[str, Any] = {
+            "TableName": table_name(table_key),
+            "KeyConditionExpression": condition,
+            "ExpressionAttributeNames": {"#pk": "pk", **({"#sk": "sk"} if sk_prefix else {})},
+            "ExpressionAttributeValues": serialize_item(values),
+            "ConsistentRead": self.consistent_read,
+        }
+        items: List[Dict[str, Any]] = []
+        while limit is None or len(items) < limit:
+            if limit is not None:
+                kwargs["Limit"] = limit - len(items)
+            start = time.perf_counter()
+            resp = self.client.query(**kwargs)
+            self._record("query", start)
+            items.extend(deserialize_item(raw) for raw in resp.get("Items", []))
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+        for item in items:
+            self.cache.put(Key(table_key, str(item.get("pk")), str(item.get("sk"))), item)
+        return [dict(item) for item in items]
+
+    # -- counters ----------------------------------------------------------
+
+    def _record(self, operation: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(operation, deque(maxlen=LATENCY_SAMPLES)).append(elapsed)
+            self.counters[f"{operation}_calls"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            samples = {op: sorted(values) for op, values in self.latencies.items()}
+        gets = counters["gets"]
+        latency = {}
+        for op, values in samples.items():
+            latency[op] = {
+                "calls": counters.get(f"{op}_calls", 0),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(values[len(values) // 2] * 1000, 2),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / gets, 4) if gets else None,
+            "cache_entries": len(self.cache),
+            "evictions": self.cache.evictions,
+            "latency": latency,
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        hit_rate = f"{stats['hit_rate']:.0%}" if stats["hit_rate"] is not None else "n/a"
+        parts = [
+            f"{stats['gets']} reads",
+            f"{hit_rate} cache hits",
+            f"{stats['coalesced']} coalesced",
+            f"{stats['keys_fetched']} keys in {stats['batches']} batches",
+        ]
+        for op, values in stats["latency"].items():
+            parts.append(f"{op} p50 {values['p50_ms']} ms / p95 {values['p95_ms']} ms")
+        return ", ".join(parts)
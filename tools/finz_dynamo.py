@@ -0,0 +1,168 @@
+"""
+Shared DynamoDB I/O helpers for the Finanzas Python tools.
+
+- ``dynamo_client``: thread-safe low-level client with the standard retry
+  policy; honours DYNAMODB_ENDPOINT / ``endpoint_url`` so every tool can run
+  against DynamoDB Local instead of AWS.
+- ``parallel_scan``: segmented Scan across worker threads, streamed page by
+  page through a bounded queue so memory stays flat on large tables.
+- ``batch_write``: ``batch_write_item`` in 25-item chunks with retry of
+  UnprocessedItems.
+- ``table_name``: same resolution as the API's ``tableName`` (TABLE_<KEY>
+  env override, TAXONOMY_TABLE for the taxonomy, finz_* fallbacks).
+
+Items are exchanged as plain Python values (boto3 TypeSerializer/Deserializer
+conventions: numbers are ``Decimal``).
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from finz_cli import lazy_import
+
+boto3 = lazy_import("boto3", capability="aws")
+botocore_config = lazy_import("botocore.config", capability="aws")
+dynamo_types = lazy_import("boto3.dynamodb.types", capability="aws")
+
+DEFAULT_REGION = "us-east-2"
+BATCH_WRITE_LIMIT = 25
+_SENTINEL = object()
+
+TABLE_FALLBACKS: Dict[str, str] = {
+    "projects": "finz_projects",
+    "rubros": "finz_rubros",
+    "rubros_taxonomia": "finz_rubros_taxonomia",
+    "allocations": "finz_allocations",
+    "payroll_actuals": "finz_payroll_actuals",
+    "adjustments": "finz_adjustments",
+    "alerts": "finz_alerts",
+    "providers": "finz_providers",
+    "audit_log": "finz_audit_log",
+    "docs": "finz_docs",
+    "prefacturas": "finz_prefacturas",
+    "changes": "finz_changes",
+}
+
+
+def table_name(key: str) -> str:
+    if key == "rubros_taxonomia" and os.getenv("TAXONOMY_TABLE"):
+        return os.environ["TAXONOMY_TABLE"]
+    return os.getenv(f"TABLE_{key.upper()}") or TABLE_FALLBACKS[key]
+
+
+def dynamo_client(region: Optional[str] = None, endpoint_url: Optional[str] = None, max_pool_connections: int = 32):
+    """Low-level DynamoDB client (safe to share across threads)."""
+    region = region or os.getenv("AWS_REGION", DEFAULT_REGION)
+    endpoint_url = endpoint_url or os.getenv("DYNAMODB_ENDPOINT") or None
+    config = botocore_config.Config(
+        retries={"max_attempts": 5, "mode": "standard"},
+        max_pool_connections=max_pool_connections,
+    )
+    return boto3.client("dynamodb", region_name=region, endpoint_url=endpoint_url, config=config)
+
+
+def deserialize_item(item: Dict[str, Dict]) -> Dict[str, Any]:
+    deserializer = dynamo_types.TypeDeserializer()
+    return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+def _to_dynamo_value(value: Any) -> Any:
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamo_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo_value(v) for v in value]
+    return value
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict]:
+    serializer = dynamo_types.TypeSerializer()
+    return {k: serializer.serialize(_to_dynamo_value(v)) for k, v in item.items()}
+
+
+def parallel_scan(
+    client,
+    table: str,
+    segments: int = 4,
+    max_queued_pages: int = 8,
+    **scan_kwargs,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield deserialized pages from a segmented Scan as workers produce them.
+
+    ``scan_kwargs`` are passed to every Scan call (ProjectionExpression,
+    FilterExpression, ...). The bounded queue applies back-pressure, so at most
+    ``max_queued_pages`` pages are held in memory at once.
+    """
+    pages: "queue.Queue" = queue.Queue(maxsize=max_queued_pages)
+    stop = threading.Event()
+
+    def _scan_segment(segment: int) -> None:
+        kwargs = dict(scan_kwargs, TableName=table)
+        if segments > 1:
+            kwargs.update(Segment=segment, TotalSegments=segments)
+        try:
+            while not stop.is_set():
+                resp = client.scan(**kwargs)
+                pages.put([deserialize_item(i) for i in resp.get("Items", [])])
+                last_key = resp.get("LastEvaluatedKey")
+                if not last_key:
+                    break
+                kwargs["ExclusiveStartKey"] = last_key
+        except BaseException as exc:  # surfaced to the consumer below
+            pages.put(exc)
+        finally:
+            pages.put(_SENTINEL)
+
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix=f"scan-{table}") as pool:
+        for segment in range(segments):
+            pool.submit(_scan_segment, segment)
+        remaining = segments
+        try:
+            while remaining:
+                page = pages.get()
+                if page is _SENTINEL:
+                    remaining -= 1
+                elif isinstance(page, BaseException):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+            # Drain so blocked producers can observe the stop flag and exit
+            while remaining:
+                if pages.get() is _SENTINEL:
+                    remaining -= 1
+
+
+def batch_write(
+    client,
+    table: str,
+    puts: Iterable[Dict[str, Any]] = (),
+    deletes: Iterable[Dict[str, Any]] = (),
+    max_retries: int = 8,
+) -> Tuple[int, int]:
+    """Apply puts and key deletes with batch_write_item; returns (put_count, delete_count)."""
+    requests_: List[Dict] = [{"PutRequest": {"Item": serialize_item(i)}} for i in puts]
+    put_count = len(requests_)
+    requests_ += [{"DeleteRequest": {"Key": serialize_item(k)}} for k in deletes]
+    delete_count = len(requests_) - put_count
+
+    for start in range(0, len(requests_), BATCH_WRITE_LIMIT):
+        pending = {table: requests_[start:start + BATCH_WRITE_LIMIT]}
+        attempt = 0
+        while pending:
+            resp = client.batch_write_item(RequestItems=pending)
+            pending = resp.get("UnprocessedItems") or {}
+            if pending:
+                attempt += 1
+                if attempt > max_retries:
+                    raise RuntimeError(f"batch_write_item left unprocessed items after {max_retries} retries")
+                time.sleep(min(0.05 * (2 ** attempt), 2.0))
+    return put_count, delete_count
@@ -0,0 +1,53 @@
+"""
+finz_payroll_actuals item parsing shared by the Python tools.
+
+Payroll keys come in three layouts (see the API's lib/dynamo.ts):
+``PROJECT#{id}#MONTH#{period}`` / ``PAYROLL#{KIND}#{id}``, the flat
+``PROJECT#{id}`` / ``PAYROLL#{period}...`` and ``PAYROLL#{period}`` partitions;
+the ``projectId``/``period``/``kind`` attributes win when present. Entries
+without a kind are actuals, as in the API.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PAYROLL_KINDS = ("plan", "forecast", "actual")
+PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+# Columns needed by payroll_key_of / payroll_rows, for projections
+PAYROLL_COLUMNS = ("pk", "sk", "projectId", "project_id", "period", "month", "kind", "amount")
+
+
+def period_of(value: Any) -> Optional[str]:
+    """The YYYY-MM period at the start of ``value``, or None."""
+    text = str(value or "")[:7]
+    return text if PERIOD_RE.match(text) else None
+
+
+def payroll_key_of(item: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], str]:
+    """(project_id, period YYYY-MM, kind) of a finz_payroll_actuals item."""
+    pk, sk = str(item.get("pk") or ""), str(item.get("sk") or "")
+    project_id, period, kind = None, None, None
+    if pk.startswith("PROJECT#"):
+        project_id, _, month = pk[len("PROJECT#"):].partition("#MONTH#")
+        period = period_of(month)
+    elif pk.startswith("PAYROLL#"):
+        period = period_of(pk[len("PAYROLL#"):])
+    if sk.startswith("PAYROLL#"):
+        head = sk[len("PAYROLL#"):].split("#", 1)[0]
+        if head.lower() in PAYROLL_KINDS:
+            kind = head.lower()
+        else:
+            period = period or period_of(head)
+    project_id = item.get("projectId") or item.get("project_id") or project_id
+    period = period_of(item.get("period") or item.get("month")) or period
+    return (str(project_id) if project_id else None), period, str(item.get("kind") or kind or "actual")
+
+
+def payroll_rows(pages: Iterable[List[Dict[str, Any]]], kind: str = "actual") -> Iterator[Tuple[str, str, float]]:
+    """(project_id, period, amount) of every payroll entry of ``kind``."""
+    for page in pages:
+        for item in page:
+            project_id, period, item_kind = payroll_key_of(item)
+            if project_id and period and item_kind == kind:
+                yield project_id, period, float(item.get("amount") or 0)
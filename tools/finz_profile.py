@@ -0,0 +1,154 @@
+"""
+CPU and memory profiling wrappers for the Finanzas Python CLIs.
+
+The ``--profile cpu|mem`` option declared by ``finz_cli.add_profile_arguments``
+starts a ProfileSession as soon as the CLI parses it and ``finz_cli.run_cli``
+stops it when ``main`` returns, so profiling is a flag added to a run, never a
+code change. Reports are written to --profile-dir (default FINZ_PROFILE_DIR or
+``profiles/``) as ``<cli>-<mode>-<UTC timestamp>-<pid>.*``:
+
+- cpu: ``.pstats`` (cProfile, for snakeviz/pstats), ``.txt`` (top functions by
+  cumulative and own time) and ``.collapsed`` (stacks sampled every
+  PROFILE_SAMPLE_INTERVAL seconds across all threads, in the folded format
+  read by flamegraph.pl and speedscope),
+- mem: ``.txt`` (peak, top allocation sites and tracebacks from tracemalloc)
+  and ``.collapsed`` (live allocation stacks weighted by bytes at exit).
+
+Time spent in child processes (pandoc, pdfunite, plantuml) is not profiled.
+"""
+from __future__ import annotations
+
+import cProfile
+import datetime as _dt
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+PROFILE_MODES = ("cpu", "mem")
+PROFILE_SAMPLE_INTERVAL = 0.005
+TRACEMALLOC_FRAMES = 32
+TOP_N = 40
+DEFAULT_PROFILE_DIR = Path(os.getenv("FINZ_PROFILE_DIR", "profiles"))
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Background thread that folds the stacks of all other threads into counts."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="finz-profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _write_collapsed(path: Path, stacks: Counter) -> None:
+    with path.open("w", encoding="utf-8") as fh:
+        for stack, count in stacks.most_common():
+            fh.write(f"{stack} {count}\n")
+
+
+def _report(mode: str, paths: List[Path]) -> None:
+    print(f"📈 {mode} profile written to: {', '.join(str(p) for p in paths)}", file=sys.stderr)
+
+
+class ProfileSession:
+    """A ``cpu`` or ``mem`` profiler that can be started and stopped at any point of a run."""
+
+    def __init__(self, mode: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r} (expected one of {PROFILE_MODES})")
+        self.mode = mode
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    def start(self) -> None:
+        if self.mode == "cpu":
+            self._profiler = cProfile.Profile()
+            self._sampler = StackSampler()
+            self._sampler.start()
+            self._profiler.enable()
+        else:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def stop(self, out_dir: Optional[Path] = None, name: Optional[str] = None) -> List[Path]:
+        """Stop profiling and write the reports; returns their paths."""
+        out_dir = Path(out_dir or DEFAULT_PROFILE_DIR)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        name = name or Path(sys.argv[0]).stem or "cli"
+        timestamp = _dt.datetime.now(_dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        stem = out_dir / f"{name}-{self.mode}-{timestamp}-{os.getpid()}"
+        paths = self._stop_cpu(stem) if self.mode == "cpu" else self._stop_mem(stem)
+        _report(self.mode, paths)
+        return paths
+
+    def _stop_cpu(self, stem: Path) -> List[Path]:
+        self._profiler.disable()
+        self._sampler.stop()
+        self._profiler.dump_stats(str(stem.with_suffix(".pstats")))
+        buffer = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=buffer).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(TOP_N)
+        stats.sort_stats("tottime").print_stats(TOP_N)
+        stem.with_suffix(".txt").write_text(buffer.getvalue(), encoding="utf-8")
+        _write_collapsed(stem.with_suffix(".collapsed"), self._sampler.stacks)
+        return [stem.with_suffix(s) for s in (".pstats", ".txt", ".collapsed")]
+
+    def _stop_mem(self, stem: Path) -> List[Path]:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _write_mem_reports(snapshot, current, peak, stem)
+        return [stem.with_suffix(s) for s in (".txt", ".collapsed")]
+
+
+def _write_mem_reports(snapshot, current: int, peak: int, stem: Path) -> None:
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    lines = [f"Current traced memory: {current / 1024:.1f} KiB", f"Peak traced memory: {peak / 1024:.1f} KiB", ""]
+    lines.append(f"Top {TOP_N} allocation sites (live at exit):")
+    for stat in snapshot.statistics("lineno")[:TOP_N]:
+        lines.append(f"  {stat.size / 1024:10.1f} KiB  {stat.count:8d} blocks  {stat.traceback[0]}")
+    lines.append("")
+    lines.append("Top 10 allocation tracebacks:")
+    for stat in snapshot.statistics("traceback")[:10]:
+        lines.append(f"  {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        lines.extend(f"    {line}" for line in stat.traceback.format(most_recent_first=True)[:16])
+    stem.with_suffix(".txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    stacks: Counter = Counter()
+    for trace in snapshot.traces:
+        frames = [f"{os.path.basename(f.filename)}:{f.lineno}" for f in reversed(trace.traceback)]
+        stacks[";".join(frames)] += trace.size
+    _write_collapsed(stem.with_suffix(".collapsed"), stacks)
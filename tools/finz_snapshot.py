@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Columnar local snapshots of the finz_* tables for offline analytics.
+
+``snapshot`` parallel-scans the Finanzas tables and writes zstd-compressed
+Parquet files partitioned by table and by a short hash of the project ID:
+
+    <out>/manifest.json
+    <out>/<table key>/prefix=<first N hex digits of sha1(project id)>/part-00000.parquet
+
+Project IDs share their leading characters (``P-``, ``PRJ-``), so the hash
+spreads projects evenly over 16**N partitions and ``project_prefixes``
+pruning actually skips files. The project ID is read from a ``PROJECT#{id}``
+pk (up to the next ``#``), then from the ``project_id`` attribute; items
+without one go to ``prefix=_none``. Use ``SnapshotReader.partition_for`` to
+find the partition of a project. Scalar attributes become typed columns
+(string, int64, float64, bool); nested or mixed-type attributes are stored as
+JSON text and listed in the file metadata so the reader restores them.
+
+SnapshotReader.scan() yields pages of plain dicts with the same shape as
+finz_dynamo.parallel_scan(), so the integrity checks, audits and budget-health
+tools accept ``--snapshot DIR`` and run with zero network I/O. Files are read
+with memory mapping.
+
+Usage:
+  python tools/finz_snapshot.py snapshot --out snapshots/2026-10-18
+  python tools/finz_snapshot.py snapshot --out snap --tables projects allocations --prefix-len 3
+  python tools/finz_snapshot.py info snapshots/2026-10-18
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import hashlib
+import json
+import sys
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from finz_cli import lazy_import, run_cli
+from finz_dynamo import TABLE_FALLBACKS, dynamo_client, parallel_scan, table_name
+
+pa = lazy_import("pyarrow", capability="arrow")
+pq = lazy_import("pyarrow.parquet", capability="arrow")
+
+MANIFEST = "manifest.json"
+SNAPSHOT_SCHEMA = "finz-snapshot/v1"
+JSON_COLUMNS_KEY = b"finz_json_columns"
+NO_PROJECT = "_none"
+
+
+def project_id_of(item: Dict[str, Any]) -> Optional[str]:
+    pk = str(item.get("pk") or "")
+    if pk.startswith("PROJECT#"):
+        # Payroll partitions append "#MONTH#{period}" to the project pk
+        return pk[len("PROJECT#"):].split("#", 1)[0]
+    value = item.get("project_id") or item.get("projectId")
+    return str(value) if value else None
+
+
+def project_partition(project_id: Optional[str], prefix_len: int) -> str:
+    if not project_id:
+        return NO_PROJECT
+    return hashlib.sha1(project_id.encode("utf-8")).hexdigest()[:prefix_len]
+
+
+def partition_of(item: Dict[str, Any], prefix_len: int) -> str:
+    return project_partition(project_id_of(item), prefix_len)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(_plain(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def _column_kind(values: List[Any]) -> str:
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return "string"
+    if kinds == {str}:
+        return "string"
+    if kinds == {bool}:
+        return "bool"
+    if kinds == {int}:
+        return "int"
+    if kinds <= {int, float}:
+        return "float"
+    return "json"
+
+
+def items_to_table(items: List[Dict[str, Any]]):
+    """Columnar Arrow table for a batch of items; returns (table, json_columns)."""
+    plain = [{k: _plain(v) for k, v in item.items()} for item in items]
+    names = sorted({k for item in plain for k in item})
+    arrays, json_columns = [], []
+    for name in names:
+        values = [item.get(name) for item in plain]
+        kind = _column_kind(values)
+        if kind == "json":
+            json_columns.append(name)
+            values = [None if v is None else json.dumps(v, ensure_ascii=False, sort_keys=True) for v in values]
+            kind = "string"
+        arrow_type = {"string": pa.string(), "bool": pa.bool_(), "int": pa.int64(), "float": pa.float64()}[kind]
+        arrays.append(pa.array(values, type=arrow_type))
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({JSON_COLUMNS_KEY: json.dumps(json_columns).encode("utf-8")})
+    return table, json_columns
+
+
+class SnapshotWriter:
+    """Buffers items per (table, partition) and flushes them as Parquet parts."""
+
+    def __init__(self, root: Path, prefix_len: int = 2, rows_per_file: int = 50_000, max_buffered_rows: int = 250_000):
+        self.root = root
+        self.prefix_len = prefix_len
+        self.rows_per_file = rows_per_file
+        self.max_buffered_rows = max_buffered_rows
+        self._buffers: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        self._buffered = 0
+        self._parts: Dict[tuple, int] = defaultdict(int)
+        self.rows: Dict[str, int] = defaultdict(int)
+        self.files: Dict[str, List[str]] = defaultdict(list)
+
+    def add(self, table_key: str, items: Iterable[Dict[str, Any]]) -> None:
+        for item in items:
+            key = (table_key, partition_of(item, self.prefix_len))
+            buf = self._buffers[key]
+            buf.append(item)
+            self._buffered += 1
+            self.rows[table_key] += 1
+            if len(buf) >= self.rows_per_file:
+                self._flush(key)
+        if self._buffered >= self.max_buffered_rows:
+            # Bound memory: flush the largest partitions first
+            for key in sorted(self._buffers, key=lambda k: -len(self._buffers[k])):
+                self._flush(key)
+                if self._buffered < self.max_buffered_rows // 2:
+                    break
+
+    def _flush(self, key: tuple) -> None:
+        items = self._buffers.pop(key, [])
+        if not items:
+            return
+        self._buffered -= len(items)
+        table_key, partition = key
+        part = self._parts[key]
+        self._parts[key] += 1
+        path = self.root / table_key / f"prefix={partition}" / f"part-{part:05d}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table, _ = items_to_table(items)
+        pq.write_table(table, path, compression="zstd")
+        self.files[table_key].append(str(path.relative_to(self.root)))
+
+    def close(self, tables: Dict[str, str]) -> Dict[str, Any]:
+        for key in list(self._buffers):
+            self._flush(key)
+        manifest = {
+            "schema": SNAPSHOT_SCHEMA,
+            "created_at": _dt.datetime.now(_dt.timezone.utc).isoformat(),
+            "prefix_len": self.prefix_len,
+            "tables": {
+                key: {"table": tables[key], "rows": self.rows.get(key, 0), "files": sorted(self.files.get(key, []))}
+                for key in tables
+            },
+        }
+        (self.root / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        return manifest
+
+
+class SnapshotReader:
+    """Reads a snapshot written by SnapshotWriter; a drop-in for parallel_scan."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        manifest_path = self.root / MANIFEST
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"No snapshot manifest at {manifest_path}")
+        self.manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    def partition_for(self, project_id: Optional[str]) -> str:
+        """``prefix=`` partition holding a project's items, for ``scan(project_prefixes=...)``."""
+        return project_partition(project_id, self.manifest["prefix_len"])
+
+    def _table_entry(self, table: str) -> Dict[str, Any]:
+        tables = self.manifest["tables"]
+        if table in tables:
+            return tables[table]
+        for entry in tables.values():
+            if entry["table"] == table:
+                return entry
+        raise KeyError(f"Table {table!r} is not in snapshot {self.root}")
+
+    def has_table(self, table: str) -> bool:
+        try:
+            self._table_entry(table)
+        except KeyError:
+            return False
+        return True
+
+    def partitions(self, table: str) -> Set[str]:
+        """``prefix=`` partitions present for a table."""
+        return {Path(rel).parent.name.split("=", 1)[1] for rel in self._table_entry(table)["files"]}
+
+    def scan(
+        self,
+        table: str,
+        columns: Optional[Sequence[str]] = None,
+        project_prefixes: Optional[Iterable[str]] = None,
+        page_size: int = 1000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of items for a table key (e.g. ``allocations``) or physical table name.
+
+        ``project_prefixes`` restricts the read to matching ``prefix=`` partitions.
+        Missing attributes are omitted from the dicts, like DynamoDB items.
+        """
+        entry = self._table_entry(table)
+        prefixes = set(project_prefixes) if project_prefixes is not None else None
+        for rel in entry["files"]:
+            path = self.root / rel
+            if prefixes is not None and path.parent.name.split("=", 1)[1] not in prefixes:
+                continue
+            schema_names = set(pq.read_schema(path).names)
+            wanted = [c for c in columns if c in schema_names] if columns is not None else None
+            table_data = pq.read_table(path, columns=wanted, memory_map=True)
+            meta = table_data.schema.metadata or {}
+            json_columns = set(json.loads(meta.get(JSON_COLUMNS_KEY, b"[]")))
+            for batch in table_data.to_batches(max_chunksize=page_size):
+                page = []
+                for row in batch.to_pylist():
+                    item = {}
+                    for k, v in row.items():
+                        if v is None:
+                            continue
+                        item[k] = json.loads(v) if k in json_columns else v
+                    page.append(item)
+                yield page
+
+
+def take_snapshot(
+    out: Path,
+    table_keys: Sequence[str],
+    segments: int = 8,
+    prefix_len: int = 2,
+    endpoint_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    client = dynamo_client(endpoint_url=endpoint_url)
+    writer = SnapshotWriter(out, prefix_len=prefix_len)
+    tables = {key: table_name(key) for key in table_keys}
+    for key, name in tables.items():
+        print(f"📥 Scanning {name} ({segments} segments)...")
+        for page in parallel_scan(client, name, segments=segments):
+            writer.add(key, page)
+        print(f"   {writer.rows.get(key, 0)} items")
+    return writer.close(tables)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Columnar local snapshots of the Finanzas tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Parallel-scan tables into a Parquet snapshot")
+    snap.add_argument("--out", type=Path, required=True, help="Snapshot directory")
+    snap.add_argument(
+        "--tables",
+        nargs="+",
+        default=sorted(TABLE_FALLBACKS),
+        choices=sorted(TABLE_FALLBACKS),
+        metavar="KEY",
+        help="Table keys to export (default: all finz_* tables)",
+    )
+    snap.add_argument("--segments", type=int, default=8, help="Parallel scan segments per table (default 8)")
+    snap.add_argument("--prefix-len", type=int, default=2, help="Hex digits of the project-ID hash per partition (default 2: 256 partitions)")
+    snap.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+
+    info = sub.add_parser("info", help="Print a snapshot manifest summary")
+    info.add_argument("path", type=Path)
+
+    args = parser.parse_args(argv)
+    if args.command == "info":
+        manifest = SnapshotReader(args.path).manifest
+        print(f"Snapshot {args.path} ({manifest['created_at']}, prefix_len={manifest['prefix_len']})")
+        for key, entry in manifest["tables"].items():
+            print(f"  {key:<18} {entry['table']:<24} {entry['rows']:>10} rows  {len(entry['files'])} files")
+        return 0
+
+    manifest = take_snapshot(args.out, args.tables, args.segments, args.prefix_len, args.endpoint_url)
+    total = sum(t["rows"] for t in manifest["tables"].values())
+    print(f"✅ Snapshot written to {args.out} ({total} items)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
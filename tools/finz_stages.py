@@ -0,0 +1,176 @@
+"""
+Per-stage instrumentation for the Finanzas documentation pipelines.
+
+A StageRecorder measures each stage (optionally per document) and writes a
+JSON report:
+- wall time (perf_counter) and CPU time of this process and of finished child
+  processes (pandoc, pdfunite, ...),
+- peak RSS of this process during the stage, sampled from /proc/self/statm
+  every RSS_SAMPLE_INTERVAL seconds (KiB; None where /proc is unavailable),
+- the process-lifetime peak RSS of this process and of its largest child so
+  far (``process_peak_*``, cumulative ``ru_maxrss``: every stage after the
+  largest one repeats it; None where ``resource`` is unavailable, e.g. Windows),
+- sizes of the stage outputs (files, or directories summed recursively).
+
+Usage:
+
+    recorder = StageRecorder("render_pdfs")
+    with recorder.stage("pandoc", document="overview.md", outputs=[pdf_path]):
+        run(...)
+    recorder.write_report(Path("stage-report.json"))
+"""
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+REPORT_SCHEMA = "finz-stage-report/v2"
+RSS_SAMPLE_INTERVAL = 0.01
+_STATM = Path("/proc/self/statm")
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+
+def _rusage():
+    if resource is None:
+        return None, None
+    return resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+def _current_rss_kb() -> Optional[int]:
+    try:
+        return int(_STATM.read_text().split()[1]) * _PAGE_KB
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class _RssSampler:
+    """Background thread tracking the highest RSS of this process while a stage runs."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_kb = _current_rss_kb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="finz-stage-rss", daemon=True)
+
+    def _sample(self) -> None:
+        rss = _current_rss_kb()
+        if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+            self.peak_kb = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "_RssSampler":
+        if self.peak_kb is not None:
+            self._thread.start()
+        return self
+
+    def stop(self) -> Optional[int]:
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._sample()
+        return self.peak_kb
+
+
+def _output_size(path: Path) -> Optional[int]:
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return None
+
+
+class StageRecorder:
+    """Collects stage measurements for one pipeline run."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started_at = _dt.datetime.now(_dt.timezone.utc).isoformat()
+        self.stages: List[Dict] = []
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, document: Optional[str] = None, outputs: Iterable[Path] = ()) -> Iterator[Dict]:
+        """Measure the enclosed block; the yielded dict can carry extra fields."""
+        entry: Dict = {"stage": name, "document": document}
+        self_before, children_before = _rusage()
+        sampler = _RssSampler().start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "ok"
+        try:
+            yield entry
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            entry["status"] = status
+            entry["wall_s"] = round(time.perf_counter() - wall_start, 6)
+            entry["cpu_s"] = round(time.process_time() - cpu_start, 6)
+            entry["peak_rss_kb"] = sampler.stop()
+            self_after, children_after = _rusage()
+            if children_after is not None:
+                entry["child_cpu_s"] = round(
+                    (children_after.ru_utime + children_after.ru_stime)
+                    - (children_before.ru_utime + children_before.ru_stime),
+                    6,
+                )
+                # ru_maxrss is KiB on Linux and bytes on macOS
+                scale = 1024 if sys.platform == "darwin" else 1
+                entry["process_peak_rss_kb"] = self_after.ru_maxrss // scale
+                entry["process_peak_child_rss_kb"] = children_after.ru_maxrss // scale
+            else:
+                entry["child_cpu_s"] = None
+                entry["process_peak_rss_kb"] = None
+                entry["process_peak_child_rss_kb"] = None
+            entry["outputs"] = {str(p): _output_size(Path(p)) for p in outputs}
+            self.stages.append(entry)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Wall/CPU seconds summed per stage name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for entry in self.stages:
+            agg = totals.setdefault(entry["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            agg["count"] += 1
+            agg["wall_s"] = round(agg["wall_s"] + entry["wall_s"], 6)
+            agg["cpu_s"] = round(agg["cpu_s"] + entry["cpu_s"] + (entry.get("child_cpu_s") or 0.0), 6)
+        return totals
+
+    def report(self) -> Dict:
+        return {
+            "schema": REPORT_SCHEMA,
+            "pipeline": self.pipeline,
+            "started_at": self.started_at,
+            "total_wall_s": round(time.perf_counter() - self._t0, 6),
+            "totals": self.totals(),
+            "stages": self.stages,
+        }
+
+    def write_report(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+        return path
+
+    def print_summary(self) -> None:
+        print(f"\n⏱️  Stage timings ({self.pipeline})")
+        peaks: Dict[str, int] = {}
+        for entry in self.stages:
+            if entry.get("peak_rss_kb") is not None:
+                peaks[entry["stage"]] = max(peaks.get(entry["stage"], 0), entry["peak_rss_kb"])
+        for name, agg in self.totals().items():
+            rss = f"  peak rss {peaks[name] / 1024:7.1f} MiB" if name in peaks else ""
+            print(f"  {name:<20} x{agg['count']:<3} wall {agg['wall_s']:8.3f}s  cpu {agg['cpu_s']:8.3f}s{rss}")
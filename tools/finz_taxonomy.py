@@ -0,0 +1,73 @@
+"""
+Frozen canonical-rubro lookup shared by the Python audit tools.
+
+Canonical IDs come from data/rubros.taxonomy.json (``linea_codigo``). Legacy
+aliases are read from LEGACY_RUBRO_ID_MAP in the API's canonical-taxonomy.ts,
+the single source of truth for the TypeScript services, so both stacks
+resolve the same legacy codes. Keys are normalised the same way as the TS
+``normalizeKey`` (trim + upper-case).
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TAXONOMY_PATH = REPO_ROOT / "data" / "rubros.taxonomy.json"
+DEFAULT_ALIASES_PATH = REPO_ROOT / "services" / "finanzas-api" / "src" / "lib" / "canonical-taxonomy.ts"
+
+CANONICAL = "canonical"
+LEGACY = "legacy"
+UNKNOWN = "unknown"
+
+_ALIAS_BLOCK_RE = re.compile(r"LEGACY_RUBRO_ID_MAP[^=]*=\s*\{(.*?)\n\};", re.S)
+_ALIAS_ENTRY_RE = re.compile(r"""['"]([^'"]+)['"]\s*:\s*['"]([^'"]+)['"]""")
+
+
+def normalize_key(value: Optional[str]) -> str:
+    return str(value or "").strip().upper()
+
+
+def parse_legacy_aliases(source: str) -> dict:
+    """Extract the LEGACY_RUBRO_ID_MAP entries from canonical-taxonomy.ts."""
+    block = _ALIAS_BLOCK_RE.search(source)
+    if not block:
+        raise ValueError("LEGACY_RUBRO_ID_MAP not found in alias source")
+    return dict(_ALIAS_ENTRY_RE.findall(block.group(1)))
+
+
+@dataclass(frozen=True)
+class TaxonomyLookup:
+    canonical: frozenset
+    aliases: Mapping[str, str]  # normalised legacy/variant code -> canonical ID
+
+    def classify(self, value: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Return (status, canonical_id) with status canonical, legacy or unknown."""
+        if value in self.canonical:
+            return CANONICAL, value
+        resolved = self.aliases.get(normalize_key(value))
+        if resolved:
+            return LEGACY, resolved
+        return UNKNOWN, None
+
+
+def load_taxonomy(
+    taxonomy_path: Path = DEFAULT_TAXONOMY_PATH,
+    aliases_path: Optional[Path] = DEFAULT_ALIASES_PATH,
+) -> TaxonomyLookup:
+    data = json.loads(taxonomy_path.read_text(encoding="utf-8"))
+    canonical = frozenset(
+        str(item["linea_codigo"]).strip() for item in data.get("items", []) if item.get("linea_codigo")
+    )
+    aliases = {}
+    if aliases_path is not None and aliases_path.exists():
+        for legacy, target in parse_legacy_aliases(aliases_path.read_text(encoding="utf-8")).items():
+            aliases[normalize_key(legacy)] = target
+    # Case/whitespace variants of canonical IDs resolve to themselves
+    for code in canonical:
+        aliases.setdefault(normalize_key(code), code)
+    return TaxonomyLookup(canonical=canonical, aliases=MappingProxyType(aliases))
@@ -0,0 +1,174 @@
+"""
+SQLite-backed work queue for sharding the Python tools across processes.
+
+A coordinator enqueues JSON task payloads; any number of worker processes,
+on this machine or on others sharing the file, claim them one at a time
+under a lease, and store a JSON result. Claims run in ``BEGIN IMMEDIATE``
+transactions, so a task is never handed to two workers; a claimed task whose
+lease expired (crashed worker) is handed out again until ``max_attempts`` is
+reached. The database runs in WAL mode so readers never block the claimers.
+
+Sharing the file across machines needs a filesystem with working POSIX
+locks (not every NFS setup qualifies); otherwise run one queue per host.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PENDING, CLAIMED, DONE, FAILED = "pending", "claimed", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@dataclass
+class Task:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class WorkQueue:
+    def __init__(self, path: Path, lease_seconds: float = 300.0):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def reset(self) -> None:
+        """Drop every task and meta key, so a reused queue file starts a fresh run.
+
+        Task IDs keep increasing across resets (AUTOINCREMENT), so a worker
+        still finishing a task of the previous run updates no row of this one.
+        """
+        with self._tx() as conn:
+            conn.execute("DELETE FROM tasks")
+            conn.execute("DELETE FROM meta")
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def enqueue(self, kind: str, payloads: Iterable[Dict[str, Any]], max_attempts: int = 3) -> int:
+        rows = [(kind, json.dumps(p), max_attempts) for p in payloads]
+        with self._tx() as conn:
+            conn.executemany("INSERT INTO tasks (kind, payload, max_attempts) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def claim(self, worker: str) -> Optional[Task]:
+        now = time.time()
+        with self._tx() as conn:
+            # Expired leases on exhausted tasks are failures, not retries
+            conn.execute(
+                "UPDATE tasks SET status = ?, error = 'lease expired' "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, CLAIMED, now),
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM tasks "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (PENDING, CLAIMED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, attempts = attempts + 1, lease_expires = ? WHERE id = ?",
+                (CLAIMED, worker, now + self.lease_seconds, row[0]),
+            )
+        return Task(id=row[0], kind=row[1], payload=json.loads(row[2]), attempts=row[3] + 1)
+
+    def complete(self, task: Task, result: Any) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, lease_expires = NULL WHERE id = ?",
+                (DONE, json.dumps(result, default=str), task.id),
+            )
+
+    def fail(self, task: Task, error: str) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL WHERE id = ?",
+                (FAILED, PENDING, error, task.id),
+            )
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, int]:
+        sql, params = "SELECT status, COUNT(*) FROM tasks", ()
+        if kind:
+            sql, params = sql + " WHERE kind = ?", (kind,)
+        return dict(self._conn.execute(sql + " GROUP BY status", params).fetchall())
+
+    def outstanding(self, kind: Optional[str] = None) -> int:
+        counts = self.counts(kind)
+        return counts.get(PENDING, 0) + counts.get(CLAIMED, 0)
+
+    def results(self, kind: str) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """(payload, result) of every finished task of a kind, in enqueue order."""
+        for payload, result in self._conn.execute(
+            "SELECT payload, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id", (kind, DONE)
+        ):
+            yield json.loads(payload), json.loads(result)
+
+    def failures(self, kind: Optional[str] = None) -> List[Tuple[Dict[str, Any], str]]:
+        sql, params = "SELECT payload, error FROM tasks WHERE status = ?", (FAILED,)
+        if kind:
+            sql, params = sql + " AND kind = ?", (FAILED, kind)
+        return [(json.loads(p), e) for p, e in self._conn.execute(sql + " ORDER BY id", params)]
+
+    def wait(self, kind: Optional[str] = None, poll_seconds: float = 1.0, progress=None) -> None:
+        """Block until no task of ``kind`` is pending or claimed."""
+        while True:
+            remaining = self.outstanding(kind)
+            if progress:
+                progress(self.counts(kind))
+            if not remaining:
+                return
+            time.sleep(poll_seconds)
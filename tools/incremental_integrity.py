@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Incremental PK/SK integrity checks for the nightly runs.
+
+Instead of re-validating every project, each run:
+- reads the per-table high-water mark stored by the last successful run
+  (--state, JSON),
+- collects the items of finz_projects and finz_prefacturas modified after the
+  mark (MODIFIED_ATTRIBUTES) and the finz_audit_log entries written after it
+  (``TS#``/``AUDIT#`` sort keys, see finz_audit),
+- re-validates only the affected ``PROJECT#`` partitions with the same checks
+  as validate_project_pk_sk_uniqueness (project metadata, baseline links and
+  baseline metadata must agree on the project) and prints the same report.
+
+Marks advance to the newest change timestamp seen, and only when the run
+finds no issues, so failing partitions are re-checked the next night. Each
+lookup window starts --overlap-seconds before the mark to tolerate late or
+eventually-consistent writes. Without a mark (first run, or --full) every
+partition is validated.
+
+Change discovery uses key-projected, filtered parallel scans (there is no
+timestamp index on these tables), so only the changed keys cross the network
+and validation work is proportional to the day's changes. With --snapshot DIR
+both discovery and validation read a local finz_snapshot instead.
+
+Usage:
+  python tools/incremental_integrity.py --report integrity.json --fail-on-issues
+  python tools/incremental_integrity.py --since 2026-10-01T00:00:00Z --no-advance
+  python tools/incremental_integrity.py --snapshot snapshots/latest
+
+Environment:
+- FINZ_INTEGRITY_STATE (default ~/.cache/finanzas-integrity/state.json)
+- TABLE_PROJECTS, TABLE_PREFACTURAS, TABLE_AUDIT_LOG (finz_* defaults)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from finz_audit import audit_key_of, format_timestamp, parse_timestamp
+from finz_cli import run_cli
+from finz_client import FinanzasClient, baseline_metadata_key, project_metadata_key, project_partition
+from finz_dynamo import dynamo_client, parallel_scan, serialize_item, table_name
+from finz_snapshot import SnapshotReader, project_id_of
+from validate_project_pk_sk_uniqueness import print_report, project_result
+
+WATCHED_TABLES = ("projects", "prefacturas", "audit_log")
+MODIFIED_ATTRIBUTES = ("updated_at", "updatedAt", "created_at", "createdAt", "acceptedAt", "baseline_accepted_at")
+AUDIT_ATTRIBUTES = ("timestamp", "resource_type", "resource_id")
+STATE_SCHEMA = "finz-integrity-state/v1"
+DEFAULT_STATE_PATH = Path(
+    os.getenv("FINZ_INTEGRITY_STATE", str(Path.home() / ".cache" / "finanzas-integrity" / "state.json"))
+)
+
+
+class WatermarkState:
+    """Per-table high-water marks persisted as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.tables = data.get("tables", {})
+
+    def mark(self, table_key: str) -> Optional[_dt.datetime]:
+        return parse_timestamp(self.tables.get(table_key, {}).get("high_water_mark"))
+
+    def advance(self, table_key: str, physical: str, mark: Optional[_dt.datetime], changes: int) -> None:
+        entry = self.tables.setdefault(table_key, {})
+        if mark is not None:
+            entry["high_water_mark"] = format_timestamp(mark)
+        entry.update(
+            table=physical,
+            last_run_at=format_timestamp(_dt.datetime.now(_dt.timezone.utc)),
+            last_run_changes=changes,
+        )
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"schema": STATE_SCHEMA, "tables": self.tables}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def modified_at(item: Dict[str, Any]) -> Optional[_dt.datetime]:
+    stamps = [parse_timestamp(item.get(name)) for name in MODIFIED_ATTRIBUTES]
+    stamps = [s for s in stamps if s is not None]
+    return max(stamps) if stamps else None
+
+
+def change_of(table_key: str, item: Dict[str, Any]):
+    """(affected project ID, change timestamp) of an item."""
+    if table_key == "audit_log":
+        return audit_key_of(item)
+    return project_id_of(item), modified_at(item)
+
+
+def _projected_attributes(table_key: str) -> List[str]:
+    extra = AUDIT_ATTRIBUTES if table_key == "audit_log" else MODIFIED_ATTRIBUTES
+    return ["pk", "sk", "project_id", *extra]
+
+
+def change_scan_kwargs(table_key: str, since: Optional[_dt.datetime]) -> Dict[str, Any]:
+    """Projection and server-side filter for a change-discovery Scan."""
+    names = {f"#a{i}": name for i, name in enumerate(_projected_attributes(table_key))}
+    kwargs: Dict[str, Any] = {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+    if since is None:
+        return kwargs
+    alias = {name: key for key, name in names.items()}
+    mark = format_timestamp(since)
+    if table_key == "audit_log":
+        clauses = [
+            f"(begins_with({alias['sk']}, :tsp) AND {alias['sk']} > :tsm)",
+            f"(begins_with({alias['sk']}, :ap) AND {alias['sk']} > :am)",
+            f"{alias['timestamp']} > :m",
+        ]
+        values = {":tsp": "TS#", ":tsm": f"TS#{mark}", ":ap": "AUDIT#", ":am": f"AUDIT#{mark}", ":m": mark}
+    else:
+        clauses = [f"{alias[name]} > :m" for name in MODIFIED_ATTRIBUTES]
+        values = {":m": mark}
+    kwargs["FilterExpression"] = " OR ".join(clauses)
+    kwargs["ExpressionAttributeValues"] = serialize_item(values)
+    return kwargs
+
+
+@dataclass
+class Changes:
+    projects: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))  # project -> tables
+    counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    marks: Dict[str, Optional[_dt.datetime]] = field(default_factory=dict)
+
+    def add(self, table_key: str, pages: Iterable[List[Dict[str, Any]]], since: Optional[_dt.datetime]) -> None:
+        newest = self.marks.get(table_key)
+        for page in pages:
+            for item in page:
+                project_id, stamp = change_of(table_key, item)
+                # Items without a timestamp are only picked up by full runs
+                if since is not None and (stamp is None or stamp <= since):
+                    continue
+                self.counts[table_key] += 1
+                if project_id:
+                    self.projects[project_id].add(table_key)
+                if stamp is not None and (newest is None or stamp > newest):
+                    newest = stamp
+        self.marks[table_key] = newest
+
+
+@dataclass
+class ProjectRecords:
+    project_item: Dict[str, Any]
+    links: List[Dict[str, Any]]  # PROJECT#{id} / BASELINE#{bid} items in prefacturas
+    baselines: Dict[str, Dict[str, Any]]  # bid -> BASELINE#{bid} / METADATA
+
+    @property
+    def empty(self) -> bool:
+        return not self.project_item and not self.links
+
+
+def _baseline_id_of_link(link: Dict[str, Any]) -> str:
+    return str(link.get("sk", ""))[len("BASELINE#"):]
+
+
+class DynamoPartitions:
+    """Loads a project's partition through finz_client: batched point reads and one Query."""
+
+    def __init__(self, finz: FinanzasClient):
+        self.finz = finz
+
+    def load(self, project_id: str) -> ProjectRecords:
+        # Concurrent loads share the client, so these reads are micro-batched across projects
+        project_item = self.finz.get(project_metadata_key(project_id))
+        links = self.finz.query("prefacturas", project_partition(project_id), sk_prefix="BASELINE#")
+        baseline_ids = {_baseline_id_of_link(link) for link in links}
+        if project_item.get("baseline_id"):
+            baseline_ids.add(project_item["baseline_id"])
+        keys = {bid: baseline_metadata_key(bid) for bid in sorted(b for b in baseline_ids if b)}
+        metas = self.finz.get_many(keys.values())
+        baselines = {bid: metas[key] for bid, key in keys.items() if metas[key]}
+        return ProjectRecords(project_item, links, baselines)
+
+
+class SnapshotPartitions:
+    """Indexes the affected partitions of a finz_snapshot in memory."""
+
+    def __init__(self, reader: SnapshotReader, project_ids: Iterable[str]):
+        wanted = set(project_ids)
+        prefixes = {reader.partition_for(pid) for pid in wanted}
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.links: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.baselines: Dict[str, Dict[str, Any]] = {}
+        for page in reader.scan("projects", project_prefixes=prefixes):
+            for item in page:
+                if item.get("sk") == "METADATA" and project_id_of(item) in wanted:
+                    self.projects[project_id_of(item)] = item
+        for page in reader.scan("prefacturas", project_prefixes=prefixes):
+            self._index(page)
+
+        # BASELINE# metadata is partitioned by its own project_id attribute (or
+        # none), which need not be an affected project: scan those partitions too
+        links = [link for pid in wanted for link in self.links.get(pid, [])]
+        referenced = {_baseline_id_of_link(link) for link in links}
+        referenced |= {item.get("baseline_id") for item in self.projects.values()}
+        missing = {bid for bid in referenced if bid and bid not in self.baselines}
+        if missing:
+            owners = {link.get("project_id") for link in links}
+            extra = {reader.partition_for(None)} | {reader.partition_for(pid) for pid in owners if pid}
+            for page in reader.scan("prefacturas", project_prefixes=extra - prefixes):
+                self._index(page, baseline_ids=missing)
+            missing -= set(self.baselines)
+        if missing:
+            # Metadata naming some other project (a mismatch to report) or absent
+            rest = reader.partitions("prefacturas") - prefixes - extra
+            for page in reader.scan("prefacturas", project_prefixes=rest):
+                self._index(page, baseline_ids=missing)
+
+    def _index(self, page: List[Dict[str, Any]], baseline_ids: Optional[Set[str]] = None) -> None:
+        for item in page:
+            pk, sk = str(item.get("pk", "")), str(item.get("sk", ""))
+            if pk.startswith("PROJECT#") and sk.startswith("BASELINE#"):
+                if baseline_ids is None:
+                    self.links[pk[len("PROJECT#"):]].append(item)
+            elif pk.startswith("BASELINE#") and sk == "METADATA":
+                bid = pk[len("BASELINE#"):]
+                if baseline_ids is None or bid in baseline_ids:
+                    self.baselines[bid] = item
+
+    def load(self, project_id: str) -> ProjectRecords:
+        project_item = self.projects.get(project_id, {})
+        links = self.links.get(project_id, [])
+        baseline_ids = {_baseline_id_of_link(link) for link in links} | {project_item.get("baseline_id")}
+        baselines = {bid: self.baselines[bid] for bid in baseline_ids if bid in self.baselines}
+        return ProjectRecords(project_item, links, baselines)
+
+
+def validate_project(project_id: str, records: ProjectRecords) -> Dict[str, Any]:
+    """print_report entry for one partition; the current baseline gets the standard checks."""
+    links = {_baseline_id_of_link(link): link for link in records.links}
+    baseline_id = records.project_item.get("baseline_id") or next(iter(sorted(links)), None)
+    warnings = []
+    stored_id = records.project_item.get("project_id")
+    if stored_id and stored_id != project_id:
+        warnings.append(f"Project metadata project_id {stored_id} mismatches pk PROJECT#{project_id}")
+    for bid, link in sorted(links.items()):
+        if bid == baseline_id:
+            continue
+        if link.get("project_id") not in (None, project_id):
+            warnings.append(f"Baseline link {bid} references project {link.get('project_id')}")
+        meta = records.baselines.get(bid)
+        if meta and meta.get("project_id") != project_id:
+            warnings.append(f"Baseline {bid} metadata project_id {meta.get('project_id')} mismatches {project_id}")
+    return project_result(
+        project_id,
+        baseline_id,
+        records.project_item,
+        links.get(baseline_id, {}),
+        records.baselines.get(baseline_id, {}),
+        warnings=warnings,
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Re-validate only the project partitions changed since the last run.")
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE_PATH, help="High-water mark state file")
+    parser.add_argument("--tables", nargs="+", default=list(WATCHED_TABLES), choices=WATCHED_TABLES,
+                        help="Tables to watch for changes (default: all)")
+    parser.add_argument("--since", help="Override the stored marks with this ISO timestamp")
+    parser.add_argument("--full", action="store_true", help="Ignore the marks and validate every partition")
+    parser.add_argument("--overlap-seconds", type=int, default=300, help="Re-read this much before each mark")
+    parser.add_argument("--no-advance", action="store_true", help="Do not update the stored marks")
+    parser.add_argument("--snapshot", type=Path, help="Read from a local finz_snapshot instead of DynamoDB")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments per table (default 8)")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent partition validations (default 16)")
+    parser.add_argument("--report", type=Path, help="Write the JSON report here")
+    parser.add_argument("--fail-on-issues", action="store_true", help="Exit 1 when any partition has issues")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    since_override = parse_timestamp(args.since) if args.since else None
+    if args.since and since_override is None:
+        parser.error(f"--since is not an ISO-8601 timestamp: {args.since}")
+
+    state = WatermarkState(args.state)
+    overlap = _dt.timedelta(seconds=args.overlap_seconds)
+    reader = SnapshotReader(args.snapshot) if args.snapshot else None
+    if reader:
+        # projects and prefacturas are always read back for validation
+        absent = [key for key in WATCHED_TABLES if key in {*args.tables, "projects", "prefacturas"}
+                  and not reader.has_table(key)]
+        if absent:
+            parser.error(
+                f"snapshot {args.snapshot} has no {', '.join(absent)} table; take it with "
+                f"--tables {' '.join(WATCHED_TABLES)} or leave the missing tables out of --tables"
+            )
+    client = None if reader else dynamo_client(endpoint_url=args.endpoint_url)
+
+    changes = Changes()
+    windows: Dict[str, Optional[_dt.datetime]] = {}
+    for key in args.tables:
+        mark = None if args.full else (since_override or state.mark(key))
+        since = mark - overlap if mark and not since_override else mark
+        windows[key] = since
+        changes.marks[key] = mark
+        window = f"after {format_timestamp(since)}" if since else "full pass"
+        print(f"🔍 {table_name(key)}: {window}")
+        if reader:
+            pages = reader.scan(key, columns=_projected_attributes(key))
+        else:
+            pages = parallel_scan(client, table_name(key), segments=args.segments, **change_scan_kwargs(key, since))
+        changes.add(key, pages, since)
+        print(f"   {changes.counts[key]} changed items")
+
+    affected = sorted(changes.projects)
+    print(f"\n{len(affected)} affected PROJECT# partitions")
+    if reader:
+        partitions = SnapshotPartitions(reader, affected)
+    else:
+        partitions = DynamoPartitions(FinanzasClient(client))
+    with ThreadPoolExecutor(max_workers=1 if reader else args.workers) as pool:
+        records = dict(zip(affected, pool.map(partitions.load, affected)))
+
+    if not reader:
+        print(f"   📈 DynamoDB reads: {partitions.finz.format_stats()}")
+    removed = [pid for pid in affected if records[pid].empty]
+    results = [validate_project(pid, records[pid]) for pid in affected if not records[pid].empty]
+    if removed:
+        print(f"   {len(removed)} partitions no longer exist (deleted projects), skipped")
+    print_report(results, scope=f"{len(results)} changed projects")
+
+    issues = [r for r in results if r["warnings"] or r["collisions"]]
+    if args.report:
+        report = {
+            "status": "fail" if issues else "pass",
+            "windows": {k: format_timestamp(v) if v else None for k, v in windows.items()},
+            "changes": dict(changes.counts),
+            "affectedProjects": len(affected),
+            "removedProjects": removed,
+            "results": results,
+        }
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        print(f"\nReport written to: {args.report}")
+
+    if issues:
+        print(f"⚠️ {len(issues)} partitions with issues; high-water marks not advanced")
+        return 1 if args.fail_on_issues else 0
+    if not args.no_advance:
+        for key in args.tables:
+            state.advance(key, table_name(key), changes.marks.get(key), changes.counts[key])
+        state.save()
+        print(f"✓ High-water marks saved to {args.state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Vectorized month-close reconciliation of payroll actuals against allocations.
+
+Instead of per-project, per-period lookups through the API, one batch run:
+- bulk-loads finz_allocations (allocation amount per ``calendar_month`` of
+  each project's current baseline) and finz_payroll_actuals (``kind=actual``
+  entries; legacy ``PAYROLL#{id}`` entries count as actual) with parallel
+  scans, or from a local finz_snapshot (--snapshot),
+- aligns both into dense (projects x periods) NumPy matrices over every month
+  from --start to --end, so months without data are explicit zeros,
+- computes variance (actual - planned), variance %, cumulative drift and the
+  threshold breaches of the whole portfolio in one vectorized pass,
+- writes the exceptions only (JSON, optionally CSV).
+
+Exception types:
+- UNPLANNED_ACTUAL: actual > 0 in a month with no planned amount
+- MISSING_ACTUAL:   planned > 0 and no payroll actual for the month
+- VARIANCE:         |variance %| > --variance-pct for the month
+- DRIFT:            |cumulative drift %| > --drift-pct at --end (reported once
+                    per project, with the first month the drift breached)
+Breaches smaller than --min-amount in absolute value are ignored.
+
+Payroll keys come in three layouts, parsed by finz_payroll.
+
+Usage:
+  python tools/payroll_reconciliation.py --end 2026-09 --output payroll-exceptions.json
+  python tools/payroll_reconciliation.py --snapshot snapshots/latest --start 2026-01 --end 2026-09 --csv exceptions.csv
+
+Environment:
+- TABLE_PROJECTS, TABLE_ALLOCATIONS, TABLE_PAYROLL_ACTUALS (finz_* defaults)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as _dt
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from finz_allocations import ALLOCATION_COLUMNS, PROJECT_BASELINE_COLUMNS, current_baselines, plan_rows
+from finz_cli import lazy_import, run_cli
+from finz_dynamo import dynamo_client, parallel_scan, table_name
+from finz_payroll import PAYROLL_COLUMNS, PERIOD_RE, payroll_rows
+from finz_snapshot import SnapshotReader
+
+np = lazy_import("numpy", capability="numpy")
+
+EXCEPTION_FIELDS = ("type", "project_id", "period", "planned", "actual", "variance", "variance_pct",
+                    "cumulative_planned", "cumulative_actual", "drift", "drift_pct", "first_breach_period")
+
+
+def month_range(start: str, end: str) -> List[str]:
+    year, month = int(start[:4]), int(start[5:7])
+    periods = []
+    while f"{year:04d}-{month:02d}" <= end:
+        periods.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def load_matrices(planned: Iterable[Tuple[str, str, float]], actual: Iterable[Tuple[str, str, float]],
+                  periods: Sequence[str]):
+    """(project_ids, planned, actual) with dense (projects x periods) float matrices on a shared project axis."""
+    period_idx = {p: i for i, p in enumerate(periods)}
+    projects: List[str] = []
+    cols: List[int] = []
+    values: List[float] = []
+    sources: List[int] = []
+    for source, rows in enumerate((planned, actual)):
+        for project_id, period, amount in rows:
+            col = period_idx.get(period)
+            if col is None:
+                continue
+            projects.append(project_id)
+            cols.append(col)
+            values.append(amount)
+            sources.append(source)
+
+    project_ids, project_idx = np.unique(np.asarray(projects, dtype=object), return_inverse=True)
+    matrices = np.zeros((2, len(project_ids), len(periods)), dtype=np.float64)
+    if values:
+        np.add.at(
+            matrices,
+            (np.asarray(sources, dtype=np.intp), project_idx, np.asarray(cols, dtype=np.intp)),
+            np.asarray(values, dtype=np.float64),
+        )
+    return project_ids, matrices[0], matrices[1]
+
+
+@dataclass
+class Reconciliation:
+    project_ids: Any
+    periods: List[str]
+    planned: Any
+    actual: Any
+    variance: Any
+    variance_pct: Any
+    cumulative_planned: Any
+    cumulative_actual: Any
+    drift: Any
+    drift_pct: Any
+    masks: Dict[str, Any]  # exception type -> (projects x periods) bool
+    first_drift_breach: Any  # (projects,) period index, -1 when never breached
+
+
+def _pct(numerator, denominator):
+    has_base = denominator != 0
+    return np.where(has_base, numerator / np.where(has_base, denominator, 1.0) * 100.0, np.nan)
+
+
+def reconcile(project_ids, periods, planned, actual, variance_pct_limit: float, drift_pct_limit: float,
+              min_amount: float) -> Reconciliation:
+    variance = actual - planned
+    variance_pct = _pct(variance, planned)
+    cum_planned, cum_actual = np.cumsum(planned, axis=1), np.cumsum(actual, axis=1)
+    drift = cum_actual - cum_planned
+    drift_pct = _pct(drift, cum_planned)
+
+    material = np.abs(variance) >= min_amount
+    with np.errstate(invalid="ignore"):
+        unplanned = (planned == 0) & (actual > 0) & material
+        missing = (planned > 0) & (actual == 0) & material
+        over_limit = (np.abs(variance_pct) > variance_pct_limit) & material & ~unplanned & ~missing
+        drift_breach = (np.abs(drift_pct) > drift_pct_limit) & (np.abs(drift) >= min_amount)
+    # Drift is reported once per project, at the closing period, if it still breaches there
+    first = np.where(drift_breach.any(axis=1), np.argmax(drift_breach, axis=1), -1)
+    drift_mask = np.zeros_like(drift_breach)
+    drift_mask[:, -1] = drift_breach[:, -1]
+
+    return Reconciliation(
+        project_ids=project_ids,
+        periods=list(periods),
+        planned=planned,
+        actual=actual,
+        variance=variance,
+        variance_pct=variance_pct,
+        cumulative_planned=cum_planned,
+        cumulative_actual=cum_actual,
+        drift=drift,
+        drift_pct=drift_pct,
+        masks={"UNPLANNED_ACTUAL": unplanned, "MISSING_ACTUAL": missing, "VARIANCE": over_limit, "DRIFT": drift_mask},
+        first_drift_breach=first,
+    )
+
+
+def _round(value: float) -> Optional[float]:
+    return None if value != value else round(value, 2)
+
+
+def exceptions(result: Reconciliation) -> List[Dict[str, Any]]:
+    """Exception rows, ordered by project, period and type; only flagged cells are materialized."""
+    rows = []
+    for kind, mask in result.masks.items():
+        for p, t in zip(*np.nonzero(mask)):
+            first = int(result.first_drift_breach[p])
+            rows.append({
+                "type": kind,
+                "project_id": str(result.project_ids[p]),
+                "period": result.periods[t],
+                "planned": _round(float(result.planned[p, t])),
+                "actual": _round(float(result.actual[p, t])),
+                "variance": _round(float(result.variance[p, t])),
+                "variance_pct": _round(float(result.variance_pct[p, t])),
+                "cumulative_planned": _round(float(result.cumulative_planned[p, t])),
+                "cumulative_actual": _round(float(result.cumulative_actual[p, t])),
+                "drift": _round(float(result.drift[p, t])),
+                "drift_pct": _round(float(result.drift_pct[p, t])),
+                "first_breach_period": result.periods[first] if kind == "DRIFT" and first >= 0 else None,
+            })
+    rows.sort(key=lambda r: (r["project_id"], r["period"], r["type"]))
+    return rows
+
+
+def _projection(columns: Sequence[str]) -> Dict[str, Any]:
+    names = {f"#a{i}": name for i, name in enumerate(columns)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+
+def _default_end() -> str:
+    first_of_month = _dt.date.today().replace(day=1)
+    return (first_of_month - _dt.timedelta(days=1)).strftime("%Y-%m")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Reconcile payroll actuals against allocations for month close.")
+    parser.add_argument("--start", help="First period YYYY-MM (default: January of --end's year)")
+    parser.add_argument("--end", default=_default_end(), help="Closing period YYYY-MM (default: last month)")
+    parser.add_argument("--variance-pct", type=float, default=10.0, help="Monthly variance threshold in %% (default 10)")
+    parser.add_argument("--drift-pct", type=float, default=5.0, help="Cumulative drift threshold in %% (default 5)")
+    parser.add_argument("--min-amount", type=float, default=0.0, help="Ignore breaches below this absolute amount")
+    parser.add_argument("--snapshot", type=Path, help="Read a local finz_snapshot instead of DynamoDB")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments per table (default 8)")
+    parser.add_argument("--output", type=Path, default=Path("payroll-exceptions.json"), help="Exceptions JSON path")
+    parser.add_argument("--csv", type=Path, help="Also write the exceptions as CSV")
+    parser.add_argument("--fail-on-exceptions", action="store_true", help="Exit 1 when any exception is found")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    args.start = args.start or f"{args.end[:4]}-01"
+    for name in ("start", "end"):
+        if not PERIOD_RE.match(getattr(args, name)):
+            parser.error(f"--{name} must be YYYY-MM")
+    if args.start > args.end:
+        parser.error(f"--start {args.start} is after --end {args.end}")
+    periods = month_range(args.start, args.end)
+
+    if args.snapshot:
+        reader = SnapshotReader(args.snapshot)
+        if not reader.has_table("projects"):
+            parser.error(f"snapshot {args.snapshot} has no projects table (needed for the current baselines)")
+        project_pages = reader.scan("projects", columns=PROJECT_BASELINE_COLUMNS)
+        allocation_pages = reader.scan("allocations", columns=ALLOCATION_COLUMNS)
+        payroll_pages = reader.scan("payroll_actuals", columns=PAYROLL_COLUMNS)
+    else:
+        client = dynamo_client(endpoint_url=args.endpoint_url)
+        project_pages = parallel_scan(
+            client, table_name("projects"), segments=args.segments, **_projection(PROJECT_BASELINE_COLUMNS)
+        )
+        allocation_pages = parallel_scan(
+            client, table_name("allocations"), segments=args.segments, **_projection(ALLOCATION_COLUMNS)
+        )
+        payroll_pages = parallel_scan(
+            client, table_name("payroll_actuals"), segments=args.segments, **_projection(PAYROLL_COLUMNS)
+        )
+    print(f"🔍 Loading {table_name('allocations')} and {table_name('payroll_actuals')} for {args.start} → {args.end}")
+    baselines = current_baselines(project_pages)
+    project_ids, planned, actual = load_matrices(
+        plan_rows(allocation_pages, baselines), payroll_rows(payroll_pages), periods
+    )
+
+    result = reconcile(project_ids, periods, planned, actual, args.variance_pct, args.drift_pct, args.min_amount)
+    rows = exceptions(result)
+    counts = {kind: int(mask.sum()) for kind, mask in result.masks.items()}
+    report = {
+        "schema": "finz-payroll-reconciliation/v1",
+        "generated_at": _dt.datetime.now(_dt.timezone.utc).isoformat(),
+        "start": args.start,
+        "end": args.end,
+        "thresholds": {"variance_pct": args.variance_pct, "drift_pct": args.drift_pct, "min_amount": args.min_amount},
+        "project_count": len(project_ids),
+        "totals": {"planned": _round(float(planned.sum())), "actual": _round(float(actual.sum()))},
+        "exception_counts": counts,
+        "exceptions": rows,
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.csv:
+        with args.csv.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=EXCEPTION_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    status = "⚠️" if rows else "✓"
+    print(f"{status} {len(project_ids)} projects × {len(periods)} periods, {len(rows)} exceptions")
+    for kind, count in counts.items():
+        print(f"  {kind:<18} {count}")
+    print(f"Exceptions written to: {args.output}")
+    return 1 if rows and args.fail_on_exceptions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Indexed diff/sync between data/rubros.taxonomy.json and finz_rubros_taxonomia.
+
+The canonical items are indexed by (pk, sk) with a digest of their attributes.
+The live table is streamed through a parallel scan and each item's digest is
+compared against the index, producing a minimal changeset:
+- upserts: canonical items that are missing live or whose attributes differ,
+- deletes: live ``LINEA#`` items that no longer exist in the canonical file
+  (only with --prune; other key namespaces in the table are never touched).
+
+Nothing is written unless --apply is given; the changeset is then applied with
+batch_write_item, so a sync costs only the delta instead of a full rewrite.
+
+Usage:
+  python tools/taxonomy_diff.py                               # dry-run diff
+  python tools/taxonomy_diff.py --apply --prune               # sync
+  python tools/taxonomy_diff.py --endpoint-url http://localhost:8000   # DynamoDB Local
+  python tools/taxonomy_diff.py --snapshot snapshots/latest            # offline diff
+
+Environment:
+- TAXONOMY_TABLE or TABLE_RUBROS_TAXONOMIA (default finz_rubros_taxonomia)
+- AWS_REGION (default us-east-2), DYNAMODB_ENDPOINT (optional)
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from finz_cli import run_cli
+from finz_dynamo import batch_write, dynamo_client, parallel_scan, table_name
+from finz_snapshot import SnapshotReader
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TAXONOMY_PATH = REPO_ROOT / "data" / "rubros.taxonomy.json"
+MANAGED_PK_PREFIX = "LINEA#"
+# Bookkeeping attributes that differ between writers and must not cause churn
+IGNORED_ATTRIBUTES = frozenset({"createdAt", "updatedAt", "created_at", "updated_at"})
+
+ItemKey = Tuple[str, str]
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Unsupported value {value!r}")
+
+
+def item_digest(item: Dict[str, Any]) -> str:
+    """Stable digest of an item's attributes, excluding bookkeeping fields."""
+    payload = {k: v for k, v in item.items() if k not in IGNORED_ATTRIBUTES}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def load_canonical_index(path: Path) -> Dict[ItemKey, Tuple[str, Dict[str, Any]]]:
+    """Hash index of canonical items: (pk, sk) -> (digest, item)."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise ValueError(f"Invalid taxonomy format in {path}: expected {{ items: [...] }}")
+    index: Dict[ItemKey, Tuple[str, Dict[str, Any]]] = {}
+    for item in items:
+        key = (item.get("pk"), item.get("sk"))
+        if not key[0] or not key[1]:
+            raise ValueError(f"Taxonomy item without pk/sk: {item!r}")
+        if key in index:
+            raise ValueError(f"Duplicate taxonomy key {key}")
+        index[key] = (item_digest(item), item)
+    return index
+
+
+@dataclass
+class Changeset:
+    upserts: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[Dict[str, str]] = field(default_factory=list)
+    mismatches: List[Dict[str, Any]] = field(default_factory=list)
+    valid_count: int = 0
+    live_count: int = 0
+
+    def to_report(self) -> Dict[str, Any]:
+        return {
+            "status": "in_sync" if not (self.upserts or self.deletes) else "drift",
+            "validCount": self.valid_count,
+            "totalItems": self.live_count,
+            "upserts": len(self.upserts),
+            "deletes": len(self.deletes),
+            "mismatches": self.mismatches,
+        }
+
+
+def diff(index: Dict[ItemKey, Tuple[str, Dict[str, Any]]], live_pages: Iterable[List[Dict[str, Any]]], prune: bool) -> Changeset:
+    """Stream live pages against the canonical index and build the minimal changeset."""
+    changes = Changeset()
+    seen: set = set()
+    for page in live_pages:
+        for live in page:
+            changes.live_count += 1
+            key = (live.get("pk"), live.get("sk"))
+            canonical = index.get(key)
+            if canonical is None:
+                if str(key[0] or "").startswith(MANAGED_PK_PREFIX):
+                    changes.mismatches.append({"pk": key[0], "sk": key[1], "reason": "not_in_taxonomy"})
+                    if prune:
+                        changes.deletes.append({"pk": key[0], "sk": key[1]})
+                continue
+            seen.add(key)
+            digest, item = canonical
+            if item_digest(live) == digest:
+                changes.valid_count += 1
+            else:
+                changed = sorted(
+                    k for k in (set(item) | set(live)) - IGNORED_ATTRIBUTES
+                    if item.get(k) != live.get(k)
+                )
+                changes.mismatches.append({"pk": key[0], "sk": key[1], "reason": "attributes", "fields": changed})
+                changes.upserts.append(item)
+
+    for key, (_, item) in index.items():
+        if key not in seen:
+            changes.mismatches.append({"pk": key[0], "sk": key[1], "reason": "missing"})
+            changes.upserts.append(item)
+    return changes
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Diff/sync the canonical rubros taxonomy against DynamoDB.")
+    parser.add_argument("--taxonomy", type=Path, default=DEFAULT_TAXONOMY_PATH, help="Canonical taxonomy JSON")
+    parser.add_argument("--table", default=table_name("rubros_taxonomia"), help="Taxonomy table")
+    parser.add_argument("--endpoint-url", help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--snapshot", type=Path, help="Diff against a local finz_snapshot (dry-run only)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments (default 4)")
+    parser.add_argument("--prune", action="store_true", help="Delete live LINEA# items missing from the taxonomy")
+    parser.add_argument("--apply", action="store_true", help="Apply the changeset (default: dry-run)")
+    parser.add_argument("--changeset", type=Path, help="Write the full changeset JSON here")
+    parser.add_argument("--report", type=Path, help="Write a taxonomy-validation-report style summary here")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.snapshot and args.apply:
+        parser.error("--apply needs the live table; a snapshot diff is dry-run only")
+
+    index = load_canonical_index(args.taxonomy)
+    print(f"✓ Indexed {len(index)} canonical items from {args.taxonomy}")
+
+    if args.snapshot:
+        pages = SnapshotReader(args.snapshot).scan(args.table)
+        source = f"snapshot {args.snapshot}"
+    else:
+        client = dynamo_client(endpoint_url=args.endpoint_url)
+        pages = parallel_scan(client, args.table, segments=args.segments)
+        source = f"{args.segments} segments"
+    changes = diff(index, pages, prune=args.prune)
+
+    print(f"✓ Scanned {changes.live_count} live items from {args.table} ({source})")
+    print(f"  in sync: {changes.valid_count}  upserts: {len(changes.upserts)}  deletes: {len(changes.deletes)}")
+    for mismatch in changes.mismatches[:20]:
+        fields = f" {mismatch['fields']}" if mismatch.get("fields") else ""
+        print(f"  ❌ {mismatch['pk']} / {mismatch['sk']}: {mismatch['reason']}{fields}")
+    if len(changes.mismatches) > 20:
+        print(f"  ... {len(changes.mismatches) - 20} more")
+
+    if args.changeset:
+        args.changeset.write_text(
+            json.dumps({"upserts": changes.upserts, "deletes": changes.deletes}, indent=2, ensure_ascii=False),
+            encoding="utf-8",
+        )
+    if args.report:
+        args.report.write_text(json.dumps(changes.to_report(), indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if not (changes.upserts or changes.deletes):
+        print("✅ Taxonomy table is in sync")
+        return 0
+    if not args.apply:
+        print("ℹ️  Dry-run: re-run with --apply to write the changeset")
+        return 0
+
+    written, deleted = batch_write(client, args.table, puts=changes.upserts, deletes=changes.deletes)
+    print(f"✅ Applied changeset: {written} upserted, {deleted} deleted")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli(main))
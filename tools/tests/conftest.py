@@ -0,0 +1,127 @@
+"""
+Shared fixtures for the tools/ tests.
+
+The tools import each other as siblings (``from finz_dynamo import ...``), so
+tools/ is put on sys.path. ``FakeDynamo`` is an in-memory stand-in for the
+low-level DynamoDB client with just the calls the tools make; items are
+stored as plain Python values and go through the real finz_dynamo
+(de)serializers on the way in and out.
+
+Run with: python -m pytest tools/tests
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from finz_dynamo import TABLE_FALLBACKS, deserialize_item, serialize_item  # noqa: E402
+from finz_snapshot import SnapshotWriter  # noqa: E402
+
+
+class FakeDynamo:
+    """In-memory low-level DynamoDB client: batch_get_item, query, scan and batch_write_item."""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        self.calls: Dict[str, List[Dict[str, Any]]] = {}
+        # Hooks for failure injection: called with the request kwargs before it is served
+        self.before: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.unprocessed_once: set = set()  # keys (pk, sk) left unprocessed on their first batch_get_item
+        self._lock = threading.Lock()
+        for name, items in (tables or {}).items():
+            self.put(name, *items)
+
+    def put(self, table: str, *items: Dict[str, Any]) -> None:
+        rows = self.tables.setdefault(table, {})
+        for item in items:
+            rows[(item["pk"], item["sk"])] = dict(item)
+
+    def _called(self, operation: str, kwargs: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.setdefault(operation, []).append(kwargs)
+        if operation in self.before:
+            self.before[operation](kwargs)
+
+    def batch_get_item(self, RequestItems):
+        self._called("batch_get_item", RequestItems)
+        responses: Dict[str, List] = {}
+        unprocessed: Dict[str, Dict[str, Any]] = {}
+        for table, request in RequestItems.items():
+            assert len(request["Keys"]) <= 100, "batch_get_item accepts at most 100 keys"
+            for raw in request["Keys"]:
+                key = deserialize_item(raw)
+                key = (key["pk"], key["sk"])
+                with self._lock:
+                    retry = key in self.unprocessed_once
+                    self.unprocessed_once.discard(key)
+                if retry:
+                    unprocessed.setdefault(table, {"Keys": []})["Keys"].append(raw)
+                elif key in self.tables.get(table, {}):
+                    responses.setdefault(table, []).append(serialize_item(self.tables[table][key]))
+        return {"Responses": responses, "UnprocessedKeys": unprocessed}
+
+    def query(self, **kwargs):
+        self._called("query", kwargs)
+        values = deserialize_item(kwargs["ExpressionAttributeValues"])
+        condition = kwargs["KeyConditionExpression"]
+        items = sorted(
+            (item for item in self.tables.get(kwargs["TableName"], {}).values() if item["pk"] == values[":pk"]),
+            key=lambda item: item["sk"],
+        )
+        if "begins_with" in condition:
+            items = [item for item in items if item["sk"].startswith(values[":prefix"])]
+        if "BETWEEN" in condition:
+            items = [item for item in items if values[":lo"] <= item["sk"] <= values[":hi"]]
+        start = int(kwargs.get("ExclusiveStartKey", {}).get("offset", {}).get("N", 0))
+        limit = kwargs.get("Limit") or len(items)
+        page = items[start:start + limit]
+        resp: Dict[str, Any] = {"Items": [serialize_item(item) for item in page]}
+        if start + limit < len(items):
+            resp["LastEvaluatedKey"] = {"offset": {"N": str(start + limit)}}
+        return resp
+
+    def scan(self, **kwargs):
+        self._called("scan", kwargs)
+        items = sorted(self.tables.get(kwargs["TableName"], {}).values(), key=lambda item: (item["pk"], item["sk"]))
+        segment, total = kwargs.get("Segment", 0), kwargs.get("TotalSegments", 1)
+        return {"Items": [serialize_item(item) for i, item in enumerate(items) if i % total == segment]}
+
+    def batch_write_item(self, RequestItems):
+        self._called("batch_write_item", RequestItems)
+        for table, requests in RequestItems.items():
+            assert len(requests) <= 25, "batch_write_item accepts at most 25 requests"
+            for request in requests:
+                if "PutRequest" in request:
+                    self.put(table, deserialize_item(request["PutRequest"]["Item"]))
+                else:
+                    key = deserialize_item(request["DeleteRequest"]["Key"])
+                    self.tables.get(table, {}).pop((key["pk"], key["sk"]), None)
+        return {"UnprocessedItems": {}}
+
+
+@pytest.fixture
+def fake_dynamo():
+    pytest.importorskip("boto3")
+    return FakeDynamo()
+
+
+@pytest.fixture
+def write_snapshot(tmp_path):
+    """Write ``{table key: [items]}`` as a finz_snapshot under tmp_path and return its root."""
+    pytest.importorskip("pyarrow")
+
+    def _write(tables: Dict[str, List[Dict[str, Any]]], prefix_len: int = 2) -> Path:
+        root = tmp_path / "snapshot"
+        writer = SnapshotWriter(root, prefix_len=prefix_len)
+        for key, items in tables.items():
+            writer.add(key, items)
+        writer.close({key: TABLE_FALLBACKS[key] for key in tables})
+        return root
+
+    return _write
@@ -0,0 +1,49 @@
+from audit_canonical_rubros import OTHER_BUCKET, UsageAggregator, rubro_of
+from finz_taxonomy import CANONICAL, LEGACY, UNKNOWN, TaxonomyLookup
+
+
+def _lookup():
+    return TaxonomyLookup(canonical=frozenset({"MOD-ING", "MOD-LEAD"}), aliases={"RB0001": "MOD-ING"})
+
+
+def test_rubro_precedence_matches_the_jq_filter():
+    item = {"rubroId": "A", "rubro_canonical": "B", "linea_codigo": "C", "rubro": "D"}
+    assert rubro_of(item) == "A"
+    assert rubro_of({"rubro_canonical": "B", "linea_codigo": "C", "rubro": "D"}) == "B"
+    assert rubro_of({"rubroId": None, "linea_codigo": "C", "rubro": "D"}) == "C"
+    # Only strings count (jq reads the .S member); an empty string stops the search as in jq
+    assert rubro_of({"rubroId": 7, "rubro": "D"}) == "D"
+    assert rubro_of({"rubroId": "", "rubro": "D"}) == ""
+    assert rubro_of({"pk": "PROJECT#P-1"}) is None
+
+
+def test_distinct_values_per_project_are_capped():
+    aggregator = UsageAggregator(_lookup(), max_values_per_project=2)
+    aggregator.add("allocations", [
+        {"pk": "PROJECT#P-1", "sk": "A#1", "rubroId": "MOD-ING"},
+        {"pk": "PROJECT#P-1", "sk": "A#2", "rubroId": "rb0001"},
+        {"pk": "PROJECT#P-1", "sk": "A#3", "rubroId": "X-1"},
+        {"pk": "PROJECT#P-1", "sk": "A#4", "rubroId": "X-2"},
+        {"pk": "PROJECT#P-1", "sk": "A#5", "rubroId": "X-3"},
+        {"pk": "PROJECT#P-1", "sk": "A#6", "rubroId": "X-1"},
+        {"pk": "PROJECT#P-2", "sk": "A#7", "rubroId": "X-2"},
+        {"pk": "PROJECT#P-2", "sk": "A#8"},
+    ])
+    report = aggregator.report()
+
+    assert report["status"] == "fail"
+    assert report["scanned"] == {"allocations": 8}
+    assert report["itemsWithRubro"] == {"allocations": 7}
+    assert report["totals"] == {CANONICAL: 1, LEGACY: 1, UNKNOWN: 5}
+    values = {(v["status"], v["value"]): (v["count"], v["canonical"]) for v in report["projects"][0]["values"]}
+    # X-2 and X-3 arrive after P-1 already tracks two codes; they share the bucket, X-1 keeps counting
+    assert values == {
+        (LEGACY, "rb0001"): (1, "MOD-ING"),
+        (UNKNOWN, "X-1"): (2, None),
+        (UNKNOWN, OTHER_BUCKET): (2, None),
+    }
+    assert report["projects"][1]["values"] == [
+        {"table": "allocations", "status": UNKNOWN, "value": "X-2", "canonical": None, "count": 1}
+    ]
+    assert report["samples"] == {"rb0001": ["PROJECT#P-1 / A#2"], "X-1": ["PROJECT#P-1 / A#3", "PROJECT#P-1 / A#6"],
+                                 "X-2": ["PROJECT#P-2 / A#7"]}
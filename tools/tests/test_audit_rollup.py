@@ -0,0 +1,48 @@
+import datetime as _dt
+import json
+
+import audit_rollup
+from audit_rollup import contiguous_runs, is_closed
+
+
+def test_contiguous_runs():
+    assert contiguous_runs([]) == []
+    days = ["2026-03-02", "2026-02-28", "2026-03-01", "2026-03-04", "2025-12-31", "2026-01-01"]
+    assert contiguous_runs(days) == [
+        ("2025-12-31", "2026-01-01"),
+        ("2026-02-28", "2026-03-02"),
+        ("2026-03-04", "2026-03-04"),
+    ]
+
+
+def test_a_day_closes_after_the_grace_period():
+    grace = _dt.timedelta(hours=2)
+    midnight = _dt.datetime(2026, 3, 2, tzinfo=_dt.timezone.utc)
+    assert not is_closed("2026-03-01", midnight + _dt.timedelta(hours=1, minutes=59), grace)
+    assert is_closed("2026-03-01", midnight + grace, grace)
+    assert not is_closed("2026-03-02", midnight + grace, grace)
+
+
+def test_closed_windows_are_served_from_the_cache(fake_dynamo, monkeypatch, tmp_path):
+    today = _dt.datetime.now(_dt.timezone.utc).date()
+    days = [today - _dt.timedelta(days=n) for n in (2, 1, 0)]
+    fake_dynamo.put("finz_audit_log", *(
+        {"pk": "ENTITY#PROJECT#P-1", "sk": f"TS#{day}T10:00:00.000Z#{n}", "timestamp": f"{day}T10:00:00.000Z",
+         "action": "update", "user": "ana@example.com"}
+        for day in days for n in range(2)
+    ))
+    monkeypatch.setattr(audit_rollup, "dynamo_client", lambda endpoint_url=None: fake_dynamo)
+    argv = ["--project", "P-1", "--layout", "handlers", "--start", days[0].isoformat(), "--grace-hours", "0",
+            "--cache", str(tmp_path / "rollup.sqlite"), "--report", str(tmp_path / "rollup.json")]
+
+    assert audit_rollup.main(argv) == 0
+    assert [q["ExpressionAttributeValues"][":lo"]["S"] for q in fake_dynamo.calls["query"]] == [f"TS#{days[0]}"]
+    first = json.loads((tmp_path / "rollup.json").read_text())
+
+    # The closed days come from the cache; only today is queried again
+    assert audit_rollup.main(argv) == 0
+    assert [q["ExpressionAttributeValues"][":lo"]["S"] for q in fake_dynamo.calls["query"][1:]] == [f"TS#{today}"]
+    second = json.loads((tmp_path / "rollup.json").read_text())
+    assert second["stats"]["cached windows"] == 2
+    assert second["byDay"] == first["byDay"] == {day.isoformat(): 2 for day in days}
+    assert second["byActor"] == {"ana@example.com": 6}
@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+import backfill_materialization as backfill
+from backfill_materialization import BaselineCoverage, RateLimiter, accepted_baselines, measure
+from finz_dynamo import parallel_scan
+
+
+@pytest.fixture
+def tables(fake_dynamo):
+    fake_dynamo.put(
+        "finz_prefacturas",
+        {"pk": "BASELINE#B1", "sk": "METADATA", "status": "accepted", "project_id": "P-1"},
+        {"pk": "BASELINE#B2", "sk": "METADATA", "status": "draft", "projectId": "PROJECT#P-2"},
+        {"pk": "BASELINE#B3", "sk": "METADATA", "status": "draft", "project_id": "P-3"},
+        {"pk": "BASELINE#B1", "sk": "DOC#1", "status": "accepted"},
+    )
+    fake_dynamo.put(
+        "finz_projects",
+        {"pk": "PROJECT#P-2", "sk": "METADATA", "baseline_id": "B2", "baseline_status": "Accepted"},
+        {"pk": "PROJECT#P-4", "sk": "METADATA", "baseline_id": "B4", "baseline_status": "accepted"},  # no metadata
+    )
+    fake_dynamo.put(
+        "finz_rubros",
+        {"pk": "PROJECT#P-1", "sk": "RUBRO#B1#labor#MOD-ING"},
+        {"pk": "PROJECT#P-2", "sk": "RUBRO#MOD-ING", "baselineId": "B9"},
+    )
+    fake_dynamo.put(
+        "finz_allocations",
+        {"pk": "PROJECT#P-1", "sk": "ALLOCATION#B1#2026-01#MOD-ING", "amount": 0},
+        {"pk": "PROJECT#P-1", "sk": "ALLOCATION#B1#2026-02#MOD-ING", "amount": 0, "planned": 50},
+        {"pk": "PROJECT#P-2", "sk": "ALLOCATION#B2#2026-01#MOD-ING", "planned": 10},
+    )
+    return fake_dynamo
+
+
+def _scan(client, table):
+    return parallel_scan(client, table, segments=2)
+
+
+def test_accepted_baselines_from_baseline_and_project_metadata(tables):
+    coverage = accepted_baselines(_scan(tables, "finz_prefacturas"), _scan(tables, "finz_projects"))
+
+    # B3 is not accepted; B4 is, but has no baseline metadata to materialise from
+    assert coverage == {"B1": BaselineCoverage("B1", "P-1"), "B2": BaselineCoverage("B2", "P-2")}
+
+
+def test_measure_counts_what_is_materialised(tables):
+    coverage = accepted_baselines(_scan(tables, "finz_prefacturas"), _scan(tables, "finz_projects"))
+    measure(coverage, _scan(tables, "finz_rubros"), _scan(tables, "finz_allocations"))
+
+    assert coverage["B1"] == BaselineCoverage("B1", "P-1", rubros=1, allocations=2, nonzero_allocations=0)
+    assert coverage["B2"] == BaselineCoverage("B2", "P-2", rubros=0, allocations=1, nonzero_allocations=1)
+
+
+def test_needs_repair():
+    assert BaselineCoverage("B1", "P-1", rubros=0, allocations=3, nonzero_allocations=3).needs_repair()
+    assert BaselineCoverage("B1", "P-1", rubros=3, allocations=0).needs_repair()
+    complete = BaselineCoverage("B1", "P-1", rubros=3, allocations=3, nonzero_allocations=3)
+    assert not complete.needs_repair(force_rewrite_zeros=True)
+    all_zero = BaselineCoverage("B1", "P-1", rubros=3, allocations=3, nonzero_allocations=0)
+    assert not all_zero.needs_repair()
+    assert all_zero.needs_repair(force_rewrite_zeros=True)
+
+
+def test_rate_limiter_allows_a_burst_then_throttles():
+    limiter = RateLimiter(rate=20, burst=2)
+    started = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+    assert time.monotonic() - started < 0.04
+    limiter.acquire()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.09  # two more tokens at 20/s
+
+    unlimited = RateLimiter(rate=0)
+    started = time.monotonic()
+    for _ in range(1000):
+        unlimited.acquire()
+    assert time.monotonic() - started < 0.5
+
+
+def test_dry_run_makes_no_api_call(tables, monkeypatch, tmp_path):
+    def _no_api(*args, **kwargs):
+        raise AssertionError("dry-run must not call the API")
+
+    monkeypatch.setattr(backfill, "dynamo_client", lambda endpoint_url=None: tables)
+    monkeypatch.setattr(backfill, "resolve_api_base", _no_api)
+    monkeypatch.setattr(backfill, "BackfillClient", _no_api)
+    report = tmp_path / "report.json"
+
+    assert backfill.main(["--segments", "2", "--force-rewrite-zeros", "--report", str(report)]) == 0
+    result = json.loads(report.read_text())
+    assert result["mode"] == "dry-run"
+    assert [row["baseline_id"] for row in result["baselines"]] == ["B1", "B2"]
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from budget_health import (  # noqa: E402
+    EN_META,
+    EN_RIESGO,
+    SIN_PRESUPUESTO,
+    SOBRE_PRESUPUESTO,
+    build_snapshot,
+    compute,
+    health_status,
+    load_series,
+    main,
+)
+
+
+def test_status_thresholds():
+    budget = np.array([100.0, 100.0, 100.0, 100.0, 100.0, 0.0])
+    forecast = np.array([100.0, 100.0, 100.0, 100.0, 100.01, 50.0])
+    actual = np.array([90.0, 90.01, 100.0, 100.01, 0.0, 50.0])
+
+    status, consumption, variance, _ = health_status(budget, forecast, actual)
+
+    # 90% is still on target, 100% is still only at risk; a forecast over budget is over budget
+    assert status.tolist() == [EN_META, EN_RIESGO, EN_RIESGO, SOBRE_PRESUPUESTO, SOBRE_PRESUPUESTO, SIN_PRESUPUESTO]
+    assert np.isnan(consumption[-1])
+    assert variance[4] == pytest.approx(0.01)
+
+
+def test_year_to_date_and_full_year_status():
+    rows = [
+        {"project_id": "P-1", "month": "2026-01", "budget": 100, "forecast": 100, "actual": 50},
+        {"project_id": "P-1", "month": "2026-02", "budget": 100, "forecast": 100, "actual": 130},
+        {"project_id": "P-1", "month": "2026-03", "budget": 100, "forecast": 100, "actual": 0},
+        {"project_id": "P-1", "month": "2025-12", "budget": 0, "forecast": 0, "actual": 999},  # other year
+    ]
+    health = compute(*load_series(rows, 2026))
+
+    assert health.monthly_status[0, :3].tolist() == [EN_META, SOBRE_PRESUPUESTO, EN_META]
+    # Cumulative: 180 of 200 is exactly 90% through February, 180 of 300 through March
+    assert health.ytd_status[0, :3].tolist() == [EN_META, EN_META, EN_META]
+    february = build_snapshot(health, as_of_month=2, year=2026)
+    assert february["projects"][0]["consumption_pct"] == 90.0
+    full_year = build_snapshot(health, as_of_month=12, year=2026)
+    assert full_year["projects"][0]["consumption_pct"] == 60.0
+    assert full_year["portfolio"]["monthly"][3]["status"] == "SIN PRESUPUESTO"
+
+
+def test_projects_without_budget():
+    rows = [
+        {"project_id": "P-1", "month": 1, "budget": 0, "forecast": 0, "actual": 0},
+        {"project_id": "P-2", "month": 1, "budget": 0, "forecast": 10, "actual": 10},
+        {"project_id": "P-3", "month": 1, "budget": 100, "forecast": 100, "actual": 95},
+    ]
+    snapshot = build_snapshot(compute(*load_series(rows)), as_of_month=1, year=None)
+
+    assert [row["status"] for row in snapshot["projects"]] == ["SIN PRESUPUESTO", "SIN PRESUPUESTO", "EN RIESGO"]
+    assert [row["consumption_pct"] for row in snapshot["projects"]] == [None, None, 95.0]
+    assert snapshot["status_counts"] == {"SIN PRESUPUESTO": 2, "EN META": 0, "EN RIESGO": 1, "SOBRE PRESUPUESTO": 0}
+    # The portfolio row sums the projects: 105 of 100 budgeted, with a forecast over budget
+    assert snapshot["portfolio"]["status"] == "SOBRE PRESUPUESTO"
+
+
+def _allocation(project_id, baseline_id, period, amount):
+    """An allocation as materializers.ts writes it: the amount copied to planned and forecast, actual 0."""
+    return {
+        "pk": f"PROJECT#{project_id}",
+        "sk": f"ALLOCATION#{baseline_id}#{period}#MOD-ING",
+        "baseline_id": baseline_id,
+        "calendar_month": period,
+        "amount": amount,
+        "planned": amount,
+        "forecast": amount,
+        "actual": 0,
+    }
+
+
+def _payroll(project_id, period, kind, amount):
+    return {
+        "pk": f"PROJECT#{project_id}#MONTH#{period}",
+        "sk": f"PAYROLL#{kind.upper()}#e1",
+        "projectId": project_id,
+        "period": period,
+        "kind": kind,
+        "amount": amount,
+    }
+
+
+@pytest.fixture
+def api_snapshot(write_snapshot):
+    return write_snapshot({
+        "projects": [
+            {"pk": "PROJECT#P-1", "sk": "METADATA", "baseline_id": "B2"},
+            {"pk": "PROJECT#P-2", "sk": "METADATA", "baseline_id": "B1"},
+        ],
+        "allocations": [
+            _allocation("P-1", "B1", "2026-01", 500),  # replaced baseline
+            _allocation("P-1", "B2", "2026-01", 100),
+            _allocation("P-1", "B2", "2026-02", 100),
+            _allocation("P-2", "B1", "2026-01", 100),
+        ],
+        "payroll_actuals": [
+            _payroll("P-1", "2026-01", "actual", 95),
+            _payroll("P-1", "2026-02", "actual", 50),
+            _payroll("P-2", "2026-01", "forecast", 120),
+            _payroll("P-2", "2026-01", "actual", 10),
+        ],
+    })
+
+
+def test_snapshot_in_the_api_layout(api_snapshot, tmp_path):
+    output = tmp_path / "health.json"
+
+    assert main(["--snapshot", str(api_snapshot), "--year", "2026", "--as-of-month", "2",
+                 "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    projects = {row["project_id"]: row for row in report["projects"]}
+
+    # P-1: actuals come from payroll (95% in January), the forecast defaults to the budget
+    assert projects["P-1"]["monthly_status"][:3] == ["EN RIESGO", "EN META", "SIN PRESUPUESTO"]
+    assert projects["P-1"]["status"] == "EN META"
+    assert projects["P-1"]["consumption_pct"] == 72.5
+    assert projects["P-1"]["variance"] == 0.0
+    # P-2: the payroll forecast is over the allocated budget
+    assert projects["P-2"]["status"] == "SOBRE PRESUPUESTO"
+    assert projects["P-2"]["variance"] == 20.0
+    assert report["portfolio"]["ytd"][1]["budget"] == 300.0
+    assert report["portfolio"]["ytd"][1]["actual"] == 155.0
+
+
+def test_snapshot_needs_the_payroll_table(write_snapshot, tmp_path):
+    root = write_snapshot({
+        "projects": [{"pk": "PROJECT#P-1", "sk": "METADATA", "baseline_id": "B1"}],
+        "allocations": [_allocation("P-1", "B1", "2026-01", 100)],
+    })
+
+    with pytest.raises(SystemExit):
+        main(["--snapshot", str(root), "--year", "2026", "--output", str(tmp_path / "health.json")])
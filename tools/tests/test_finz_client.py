@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+
+from finz_client import (
+    FinanzasClient,
+    Key,
+    TTLCache,
+    baseline_link_key,
+    project_metadata_key,
+    project_partition,
+)
+
+
+def _project(n):
+    return {"pk": f"PROJECT#P-{n}", "sk": "METADATA", "name": f"Project {n}"}
+
+
+@pytest.fixture
+def projects(fake_dynamo):
+    fake_dynamo.put("finz_projects", *(_project(n) for n in range(300)))
+    return fake_dynamo
+
+
+def _in_thread(fn, timeout=5.0):
+    """Run fn in a thread and fail (instead of hanging the suite) if it does not return."""
+    outcome = {}
+
+    def _run():
+        try:
+            outcome["value"] = fn()
+        except BaseException as exc:  # re-raised in the test thread
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "read did not complete"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def test_cache_evicts_least_recently_used_and_expires():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    a, b, c = (Key("projects", pk, "METADATA") for pk in "abc")
+    cache.put(a, {"v": 1})
+    cache.put(b, {"v": 2})
+    cache.get(a)  # a is now the most recent
+    cache.put(c, {"v": 3})
+    assert (cache.get(a), cache.get(b), cache.get(c)) == ({"v": 1}, None, {"v": 3})
+    assert cache.evictions == 1
+
+    short = TTLCache(ttl_seconds=0.05)
+    short.put(a, {"v": 1})
+    time.sleep(0.1)
+    assert short.get(a) is None
+    disabled = TTLCache(ttl_seconds=0)
+    disabled.put(a, {"v": 1})
+    assert len(disabled) == 0
+
+
+def test_reads_are_cached_including_missing_items(projects):
+    finz = FinanzasClient(projects, batch_window=0)
+    assert finz.get(project_metadata_key("P-1"))["name"] == "Project 1"
+    assert finz.get(project_metadata_key("P-missing")) == {}
+
+    copy = finz.get(project_metadata_key("P-1"))
+    copy["name"] = "changed by the caller"
+    assert finz.get(project_metadata_key("P-1"))["name"] == "Project 1"
+    assert finz.get(project_metadata_key("P-missing")) == {}
+    assert len(projects.calls["batch_get_item"]) == 2
+    assert finz.stats()["hit_rate"] == 0.6  # 3 of 5 reads
+
+    finz.invalidate(project_metadata_key("P-1"))
+    finz.get(project_metadata_key("P-1"))
+    assert len(projects.calls["batch_get_item"]) == 3
+
+
+def test_get_many_splits_into_batches_of_100(projects):
+    finz = FinanzasClient(projects)
+    keys = [project_metadata_key(f"P-{n}") for n in range(250)]
+    items = finz.get_many(keys + keys[:10])  # duplicates are read once
+
+    assert [items[key]["name"] for key in keys] == [f"Project {n}" for n in range(250)]
+    assert [len(call["finz_projects"]["Keys"]) for call in projects.calls["batch_get_item"]] == [100, 100, 50]
+
+
+def test_concurrent_reads_are_coalesced_and_batched(projects):
+    finz = FinanzasClient(projects, batch_window=0.05)
+    same = project_metadata_key("P-7")
+    barrier = threading.Barrier(16)
+    results = []
+
+    def _read(n):
+        barrier.wait()
+        key = same if n < 8 else project_metadata_key(f"P-{n}")
+        results.append(finz.get(key)["pk"])
+
+    threads = [threading.Thread(target=_read, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == sorted(["PROJECT#P-7"] * 8 + [f"PROJECT#P-{n}" for n in range(8, 16)])
+    assert finz.stats()["coalesced"] == 7
+    assert finz.stats()["keys_fetched"] == 9
+    assert len(projects.calls["batch_get_item"]) <= 2  # one window, unless a thread was descheduled past it
+
+
+def test_unprocessed_keys_are_retried(projects):
+    finz = FinanzasClient(projects)
+    projects.unprocessed_once.add(("PROJECT#P-3", "METADATA"))
+    items = finz.get_many([project_metadata_key("P-3"), project_metadata_key("P-4")])
+
+    assert items[project_metadata_key("P-3")]["name"] == "Project 3"
+    assert finz.stats()["unprocessed_retries"] == 1
+
+
+def test_a_failed_batch_does_not_strand_the_others(projects):
+    finz = FinanzasClient(projects)
+    calls = []
+
+    def _throttle_second_call(request):
+        calls.append(request)
+        if len(calls) == 2:
+            raise RuntimeError("ProvisionedThroughputExceededException")
+
+    projects.before["batch_get_item"] = _throttle_second_call
+    keys = [project_metadata_key(f"P-{n}") for n in range(250)]
+
+    with pytest.raises(RuntimeError, match="ProvisionedThroughput"):
+        _in_thread(lambda: finz.get_many(keys))
+    assert len(calls) == 3  # the third chunk was still fetched
+    assert finz._inflight == {}
+
+    # Keys of the failed chunk are read again; the others come from the cache
+    assert _in_thread(lambda: finz.get(keys[150]))["name"] == "Project 150"
+    assert _in_thread(lambda: finz.get(keys[249]))["name"] == "Project 249"
+    assert len(calls) == 4
+
+
+def test_query_pages_and_primes_the_cache(fake_dynamo):
+    fake_dynamo.put("finz_prefacturas", *({"pk": project_partition("P-1"), "sk": f"BASELINE#B{n}"} for n in range(5)))
+    fake_dynamo.put("finz_prefacturas", {"pk": project_partition("P-1"), "sk": "DOC#1"})
+    finz = FinanzasClient(fake_dynamo)
+
+    links = finz.query("prefacturas", project_partition("P-1"), sk_prefix="BASELINE#")
+    assert [link["sk"] for link in links] == [f"BASELINE#B{n}" for n in range(5)]
+    assert len(finz.query("prefacturas", project_partition("P-1"), limit=2)) == 2
+
+    assert finz.get(baseline_link_key("P-1", "B3"))["sk"] == "BASELINE#B3"
+    assert "batch_get_item" not in fake_dynamo.calls
+    assert "query p50" in finz.format_stats()
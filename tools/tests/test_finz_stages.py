@@ -0,0 +1,56 @@
+import sys
+import time
+
+import pytest
+
+from finz_stages import StageRecorder, _current_rss_kb
+
+
+def test_totals_aggregate_each_stage(tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    (output / "a.pdf").write_bytes(b"x" * 10)
+    (output / "b.pdf").write_bytes(b"x" * 5)
+    recorder = StageRecorder("docs")
+
+    for document in ("a.md", "b.md"):
+        with recorder.stage("pandoc", document=document, outputs=[output / "a.pdf"]) as entry:
+            entry["pages"] = 3
+            time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with recorder.stage("merge", outputs=[output, tmp_path / "missing.pdf"]):
+            raise RuntimeError("pdfunite failed")
+
+    totals = recorder.totals()
+    assert list(totals) == ["pandoc", "merge"]
+    assert totals["pandoc"]["count"] == 2
+    assert totals["pandoc"]["wall_s"] == pytest.approx(sum(e["wall_s"] for e in recorder.stages[:2]))
+    assert totals["pandoc"]["wall_s"] >= 0.02
+    assert [(e["document"], e["status"], e["pages"]) for e in recorder.stages[:2]] == [
+        ("a.md", "ok", 3),
+        ("b.md", "ok", 3),
+    ]
+    merge = recorder.stages[2]
+    assert merge["status"] == "error"
+    assert merge["outputs"] == {str(output): 15, str(tmp_path / "missing.pdf"): None}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="peak RSS is sampled from /proc")
+def test_peak_rss_is_per_stage():
+    recorder = StageRecorder("docs")
+    with recorder.stage("small"):
+        pass
+    before = _current_rss_kb()
+    with recorder.stage("large"):
+        block = b"x" * (64 * 1024 * 1024)
+        time.sleep(0.05)
+        del block
+    with recorder.stage("small"):
+        pass
+
+    small, large, small_again = (entry["peak_rss_kb"] for entry in recorder.stages)
+    assert large - before >= 48 * 1024
+    # Unlike the process-lifetime ru_maxrss, a later stage does not repeat the large stage's peak
+    assert small_again < large - 32 * 1024
+    assert recorder.stages[2]["process_peak_rss_kb"] - before >= 48 * 1024
+    assert small <= large
@@ -0,0 +1,165 @@
+import threading
+import time
+
+from finz_workqueue import CLAIMED, DONE, FAILED, PENDING, WorkQueue
+
+
+def test_claims_are_handed_out_once_across_threads(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("scan", ({"segment": n} for n in range(200)))
+    claimed, lock = [], threading.Lock()
+
+    def _worker(name):
+        local = WorkQueue(tmp_path / "queue.sqlite")
+        while True:
+            task = local.claim(name)
+            if task is None:
+                return
+            local.complete(task, {"segment": task.payload["segment"]})
+            with lock:
+                claimed.append(task.payload["segment"])
+
+    threads = [threading.Thread(target=_worker, args=(f"w{n}",)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(200))
+    assert queue.counts("scan") == {DONE: 200}
+    assert [result["segment"] for _, result in queue.results("scan")] == list(range(200))
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite", lease_seconds=0.05)
+    queue.enqueue("create", [{"idx": 1}], max_attempts=2)
+
+    first = queue.claim("crashed")
+    assert queue.claim("other") is None  # leased
+    time.sleep(0.1)
+    second = queue.claim("other")
+    assert (second.id, second.attempts) == (first.id, 2)
+
+    time.sleep(0.1)
+    assert queue.claim("third") is None
+    assert queue.counts() == {FAILED: 1}
+    assert queue.failures("create") == [({"idx": 1}, "lease expired")]
+
+
+def test_failed_task_is_retried_then_recorded(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("create", [{"idx": 1}], max_attempts=2)
+
+    queue.fail(queue.claim("w"), "HTTPError: 503")
+    assert queue.counts() == {PENDING: 1}
+    queue.fail(queue.claim("w"), "HTTPError: 503")
+    assert queue.counts() == {FAILED: 1}
+    assert queue.outstanding() == 0
+    assert queue.failures() == [({"idx": 1}, "HTTPError: 503")]
+
+
+def test_reset_starts_a_fresh_run_on_a_reused_file(tmp_path):
+    path = tmp_path / "queue.sqlite"
+    queue = WorkQueue(path)
+    queue.enqueue("create", [{"idx": 1}, {"idx": 2}])
+    stale = queue.claim("w")
+    queue.complete(queue.claim("w"), {"project_id": "P-old"})
+    queue.set_meta("closed", True)
+
+    queue.reset()
+    assert queue.counts() == {}
+    assert queue.get_meta("closed") is None
+    queue.enqueue("create", [{"idx": 1}])
+    fresh = queue.claim("w")
+    assert fresh.id > stale.id
+
+    queue.complete(stale, {"project_id": "P-straggler"})  # a worker of the previous run finishing late
+    assert queue.counts() == {CLAIMED: 1}
+    assert list(queue.results("create")) == []
+
+
+def test_wait_returns_once_the_kind_is_drained(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("scan", [{"segment": 0}])
+    queue.enqueue("create", [{"idx": 1}])
+    queue.complete(queue.claim("w"), [])  # the scan task (lowest id)
+
+    seen = []
+    queue.wait("scan", poll_seconds=0.01, progress=seen.append)
+    assert seen == [{DONE: 1}]
+    assert queue.outstanding("create") == 1
+
+
+def _patch_worker(monkeypatch, validator, queue_class):
+    monkeypatch.setattr(validator, "WorkQueue", queue_class)
+    monkeypatch.setattr(validator, "resolve_api_base", lambda: "http://localhost")
+    monkeypatch.setattr(validator, "resolve_bearer_token", lambda: ("token", "test"))
+    monkeypatch.setattr(validator, "dynamo_client", lambda: None)
+
+
+def test_worker_thread_survives_claim_errors(tmp_path, monkeypatch, capsys):
+    import sqlite3
+
+    import validate_project_pk_sk_uniqueness as validator
+
+    class FlakyQueue(WorkQueue):
+        failures_left = 2
+
+        def claim(self, worker):
+            if FlakyQueue.failures_left:
+                FlakyQueue.failures_left -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return super().claim(worker)
+
+    path = tmp_path / "queue.sqlite"
+    WorkQueue(path).set_meta("closed", True)
+    _patch_worker(monkeypatch, validator, FlakyQueue)
+
+    assert validator.run_worker(path, threads=1, poll_seconds=0.01) == 0
+    assert FlakyQueue.failures_left == 0
+    assert capsys.readouterr().err.count("claim failed (OperationalError: database is locked)") == 2
+
+
+def test_worker_thread_gives_up_after_repeated_queue_errors(tmp_path, monkeypatch, capsys):
+    import sqlite3
+
+    import validate_project_pk_sk_uniqueness as validator
+
+    class BrokenQueue(WorkQueue):
+        def get_meta(self, key, default=None):
+            raise sqlite3.OperationalError("database is locked")
+
+    path = tmp_path / "queue.sqlite"
+    _patch_worker(monkeypatch, validator, BrokenQueue)
+    monkeypatch.setattr(validator, "MAX_QUEUE_ERRORS", 2)
+
+    assert validator.run_worker(path, threads=1, poll_seconds=0.01) == 1
+    err = capsys.readouterr().err
+    assert err.count("claim failed (OperationalError") == 2
+    assert "claim failed 3 times in a row" in err
+
+
+def test_worker_retries_recording_a_result(tmp_path, monkeypatch):
+    import sqlite3
+
+    import validate_project_pk_sk_uniqueness as validator
+
+    class FlakyQueue(WorkQueue):
+        failures_left = 1
+
+        def complete(self, task, result):
+            if FlakyQueue.failures_left:
+                FlakyQueue.failures_left -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return super().complete(task, result)
+
+    path = tmp_path / "queue.sqlite"
+    queue = WorkQueue(path)
+    queue.enqueue("scan", [{"table": "projects", "segment": 0, "total": 1}])
+    queue.set_meta("closed", True)
+    _patch_worker(monkeypatch, validator, FlakyQueue)
+    monkeypatch.setattr(validator, "scan_fingerprints", lambda *args: [["PROJECT#P-1", "METADATA"]])
+
+    assert validator.run_worker(path, threads=1, poll_seconds=0.01) == 0
+    assert queue.counts("scan") == {DONE: 1}
+    assert [result for _, result in queue.results("scan")] == [[["PROJECT#P-1", "METADATA"]]]
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import generate_phase5_docs as docs  # noqa: E402
+
+
+def test_placeholder_cache_key_covers_text_size_and_style(monkeypatch):
+    key = docs._placeholder_cache_key("Placeholder: a.png", 1200, 800)
+    assert key == docs._placeholder_cache_key("Placeholder: a.png", 1200, 800)
+    assert key != docs._placeholder_cache_key("Placeholder: b.png", 1200, 800)
+    assert key != docs._placeholder_cache_key("Placeholder: a.png", 800, 1200)
+    monkeypatch.setattr(docs, "PLACEHOLDER_BG_COLOR", (0, 0, 0))
+    assert key != docs._placeholder_cache_key("Placeholder: a.png", 1200, 800)
+
+
+def test_cached_placeholders_are_copied_not_linked(tmp_path):
+    pytest.importorskip("PIL")
+    cache_dir, first, second = tmp_path / "cache", tmp_path / "first", tmp_path / "second"
+
+    docs.create_screenshot_placeholders(first, ["a.png"], cache_dir=cache_dir)
+    (cached,) = cache_dir.rglob("*.png")
+    key = docs._placeholder_cache_key("Placeholder: a.png", docs.PLACEHOLDER_IMG_WIDTH, docs.PLACEHOLDER_IMG_HEIGHT)
+    assert cached == cache_dir / key[:2] / f"{key}.png"
+
+    # A hit is served from the cache: a stale cache entry is copied as is
+    cached.write_bytes(b"cached")
+    docs.create_screenshot_placeholders(second, ["a.png"], cache_dir=cache_dir)
+    output = second / "a.png"
+    assert output.read_bytes() == b"cached"
+    assert output.stat().st_ino != cached.stat().st_ino
+    assert output.stat().st_nlink == cached.stat().st_nlink == 1
+
+    output.write_bytes(b"edited")
+    assert cached.read_bytes() == b"cached"
@@ -0,0 +1,141 @@
+import datetime as _dt
+import json
+
+import pytest
+
+from finz_client import FinanzasClient
+from finz_dynamo import deserialize_item
+from finz_snapshot import SnapshotReader
+from incremental_integrity import (
+    Changes,
+    DynamoPartitions,
+    SnapshotPartitions,
+    WatermarkState,
+    change_scan_kwargs,
+    main,
+    validate_project,
+)
+
+MARK = _dt.datetime(2026, 10, 1, tzinfo=_dt.timezone.utc)
+
+
+def _project(pid, bid, **attrs):
+    return {"pk": f"PROJECT#{pid}", "sk": "METADATA", "project_id": pid, "baseline_id": bid, **attrs}
+
+
+def _link(pid, bid):
+    return {"pk": f"PROJECT#{pid}", "sk": f"BASELINE#{bid}", "project_id": pid}
+
+
+def _baseline(bid, pid=None):
+    item = {"pk": f"BASELINE#{bid}", "sk": "METADATA"}
+    return {**item, "project_id": pid} if pid else item
+
+
+def test_watermarks_round_trip(tmp_path):
+    path = tmp_path / "state" / "state.json"
+    state = WatermarkState(path)
+    assert state.mark("projects") is None
+
+    state.advance("projects", "finz_projects", MARK, changes=3)
+    state.advance("audit_log", "finz_audit_log", None, changes=0)  # no changes: no mark yet
+    state.save()
+
+    reloaded = WatermarkState(path)
+    assert reloaded.mark("projects") == MARK
+    assert reloaded.mark("audit_log") is None
+    assert reloaded.tables["projects"]["last_run_changes"] == 3
+
+
+def test_change_scan_filters_server_side_after_the_mark():
+    assert "FilterExpression" not in change_scan_kwargs("projects", None)
+
+    kwargs = change_scan_kwargs("projects", MARK)
+    names = kwargs["ExpressionAttributeNames"]
+    assert {"pk", "sk", "updated_at", "updatedAt"} <= set(names.values())
+    assert kwargs["FilterExpression"].count(":m") == kwargs["FilterExpression"].count(" OR ") + 1
+    assert deserialize_item(kwargs["ExpressionAttributeValues"]) == {":m": "2026-10-01T00:00:00.000Z"}
+
+    audit = deserialize_item(change_scan_kwargs("audit_log", MARK)["ExpressionAttributeValues"])
+    assert audit[":tsm"] == "TS#2026-10-01T00:00:00.000Z"
+    assert audit[":am"] == "AUDIT#2026-10-01T00:00:00.000Z"
+
+
+def test_changes_keep_items_after_the_mark_and_track_the_newest():
+    changes = Changes()
+    changes.add("projects", [[
+        _project("P-1", "B1", updated_at="2026-10-02T08:00:00Z"),
+        _project("P-2", "B2", updated_at="2026-09-30T08:00:00Z"),  # before the mark
+        _project("P-3", "B3"),  # no timestamp: full runs only
+    ]], since=MARK)
+    changes.add("audit_log", [[
+        {"pk": "ENTITY#PROJECT#P-4", "sk": "TS#2026-10-03T00:00:00Z#abc"},
+        {"pk": "PROJECT#P-1", "sk": "AUDIT#2026-10-01T12:00:00Z"},
+    ]], since=MARK)
+
+    assert dict(changes.counts) == {"projects": 1, "audit_log": 2}
+    assert {pid: sorted(tables) for pid, tables in changes.projects.items()} == {
+        "P-1": ["audit_log", "projects"],
+        "P-4": ["audit_log"],
+    }
+    assert changes.marks["projects"] == _dt.datetime(2026, 10, 2, 8, tzinfo=_dt.timezone.utc)
+    assert changes.marks["audit_log"] == _dt.datetime(2026, 10, 3, tzinfo=_dt.timezone.utc)
+
+    full = Changes()
+    full.add("projects", [[_project("P-3", "B3")]], since=None)
+    assert set(full.projects) == {"P-3"}
+
+
+def test_snapshot_partitions_find_baselines_stored_elsewhere(write_snapshot):
+    root = write_snapshot({
+        "projects": [_project("P-1", "B1"), _project("P-2", "B9")],
+        "prefacturas": [
+            _link("P-1", "B1"),
+            _link("P-1", "B0"),
+            _baseline("B1"),  # no project_id: stored under prefix=_none
+            _baseline("B0", pid="P-7"),  # names another project: its partition
+            _link("P-2", "B9"),
+            _baseline("B9", pid="P-2"),
+        ],
+    })
+    partitions = SnapshotPartitions(SnapshotReader(root), ["P-1"])
+    records = partitions.load("P-1")
+
+    assert sorted(records.baselines) == ["B0", "B1"]
+    warnings = validate_project("P-1", records)["warnings"]
+    assert "Baseline B0 metadata project_id P-7 mismatches P-1" in warnings
+
+
+def test_dynamo_partitions_batch_the_baseline_reads(fake_dynamo):
+    fake_dynamo.put("finz_projects", _project("P-1", "B1"))
+    fake_dynamo.put("finz_prefacturas", _link("P-1", "B1"), _link("P-1", "B0"), _baseline("B1", "P-1"))
+
+    finz = FinanzasClient(fake_dynamo, batch_window=0)
+    records = DynamoPartitions(finz).load("P-1")
+
+    assert [link["sk"] for link in records.links] == ["BASELINE#B0", "BASELINE#B1"]
+    assert list(records.baselines) == ["B1"]  # B0 has no metadata
+    assert validate_project("P-1", records)["baseline_id"] == "B1"
+    assert len(fake_dynamo.calls["batch_get_item"]) == 2  # project metadata, then both baselines at once
+
+
+def test_clean_snapshot_run_advances_the_marks(write_snapshot, tmp_path):
+    root = write_snapshot({
+        "projects": [_project("P-1", "B1", updated_at="2026-10-02T00:00:00Z")],
+        "prefacturas": [_link("P-1", "B1"), _baseline("B1", "P-1")],
+        "audit_log": [{"pk": "ENTITY#PROJECT#P-1", "sk": "TS#2026-10-02T01:00:00Z"}],
+    })
+    state = tmp_path / "state.json"
+    report = tmp_path / "report.json"
+
+    assert main(["--snapshot", str(root), "--state", str(state), "--report", str(report)]) == 0
+    assert json.loads(report.read_text())["status"] == "pass"
+    assert WatermarkState(state).mark("audit_log") == _dt.datetime(2026, 10, 2, 1, tzinfo=_dt.timezone.utc)
+
+
+def test_snapshot_without_a_watched_table_is_a_usage_error(write_snapshot, tmp_path, capsys):
+    root = write_snapshot({"projects": [_project("P-1", "B1")], "prefacturas": [_link("P-1", "B1")]})
+    with pytest.raises(SystemExit) as exc:
+        main(["--snapshot", str(root), "--state", str(tmp_path / "state.json")])
+    assert exc.value.code == 2
+    assert "has no audit_log table" in capsys.readouterr().err
@@ -0,0 +1,128 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from payroll_reconciliation import (  # noqa: E402
+    exceptions,
+    load_matrices,
+    main,
+    month_range,
+    reconcile,
+)
+from finz_allocations import plan_rows  # noqa: E402
+from finz_payroll import payroll_key_of, payroll_rows  # noqa: E402
+
+PERIODS = ["2026-01", "2026-02", "2026-03"]
+
+
+def _series(project_id, amounts):
+    return [(project_id, period, amount) for period, amount in zip(PERIODS, amounts) if amount]
+
+
+@pytest.fixture
+def portfolio():
+    planned = _series("P-A", [100, 100, 100]) + _series("P-B", [100, 100, 100]) + _series("P-C", [0, 100, 0])
+    actual = _series("P-A", [100, 100, 100]) + _series("P-B", [130, 100, 100]) + _series("P-C", [50, 0, 0])
+    return load_matrices(planned, actual, PERIODS)
+
+
+def test_payroll_keys_in_every_layout():
+    assert payroll_key_of({"pk": "PROJECT#P-1#MONTH#2026-02", "sk": "PAYROLL#PLAN#e1"}) == ("P-1", "2026-02", "plan")
+    assert payroll_key_of({"pk": "PROJECT#P-1", "sk": "PAYROLL#2026-02#e1"}) == ("P-1", "2026-02", "actual")
+    assert payroll_key_of({"pk": "PAYROLL#2026-02", "sk": "e1", "projectId": "P-1"}) == ("P-1", "2026-02", "actual")
+    # Attributes win over the key
+    assert payroll_key_of(
+        {"pk": "PROJECT#P-1#MONTH#2026-02", "sk": "PAYROLL#ACTUAL#e1", "period": "2026-03-15", "kind": "forecast"}
+    ) == ("P-1", "2026-03", "forecast")
+
+
+def test_only_actual_entries_are_payroll_actuals():
+    pages = [[
+        {"pk": "PROJECT#P-1#MONTH#2026-01", "sk": "PAYROLL#PLAN#e1", "amount": 10},
+        {"pk": "PROJECT#P-1#MONTH#2026-01", "sk": "PAYROLL#ACTUAL#e2", "amount": 12},
+        {"pk": "PROJECT#P-1", "sk": "PAYROLL#2026-01#e3", "amount": 3},  # legacy: actual
+    ]]
+    assert list(payroll_rows(pages)) == [("P-1", "2026-01", 12.0), ("P-1", "2026-01", 3.0)]
+
+
+def test_month_range_crosses_years():
+    assert month_range("2025-11", "2026-02") == ["2025-11", "2025-12", "2026-01", "2026-02"]
+    assert month_range("2026-03", "2026-03") == ["2026-03"]
+
+
+def test_matrices_share_the_project_axis_and_sum_duplicates():
+    project_ids, planned, actual = load_matrices(
+        [("P-2", "2026-01", 10.0), ("P-2", "2026-01", 5.0), ("P-2", "2025-12", 99.0)],  # last one out of range
+        [("P-1", "2026-03", 7.0)],
+        PERIODS,
+    )
+    assert project_ids.tolist() == ["P-1", "P-2"]
+    np.testing.assert_array_equal(planned, [[0, 0, 0], [15, 0, 0]])
+    np.testing.assert_array_equal(actual, [[0, 0, 7], [0, 0, 0]])
+
+
+def test_reconcile_flags_each_exception_type(portfolio):
+    result = reconcile(*portfolio[:1], PERIODS, *portfolio[1:], variance_pct_limit=10, drift_pct_limit=5,
+                       min_amount=0)
+    flagged = {kind: sorted((str(result.project_ids[p]), PERIODS[t]) for p, t in zip(*np.nonzero(mask)))
+               for kind, mask in result.masks.items()}
+    assert flagged == {
+        "UNPLANNED_ACTUAL": [("P-C", "2026-01")],
+        "MISSING_ACTUAL": [("P-C", "2026-02")],
+        "VARIANCE": [("P-B", "2026-01")],
+        "DRIFT": [("P-B", "2026-03"), ("P-C", "2026-03")],
+    }
+    assert result.first_drift_breach.tolist() == [-1, 0, 1]
+
+    rows = exceptions(result)
+    assert [(r["project_id"], r["period"], r["type"]) for r in rows] == [
+        ("P-B", "2026-01", "VARIANCE"),
+        ("P-B", "2026-03", "DRIFT"),
+        ("P-C", "2026-01", "UNPLANNED_ACTUAL"),
+        ("P-C", "2026-02", "MISSING_ACTUAL"),
+        ("P-C", "2026-03", "DRIFT"),
+    ]
+    drift_b = rows[1]
+    assert (drift_b["drift"], drift_b["drift_pct"], drift_b["first_breach_period"]) == (30.0, 10.0, "2026-01")
+    assert rows[2]["variance_pct"] is None  # no plan to compare against
+
+
+def test_min_amount_suppresses_small_breaches(portfolio):
+    result = reconcile(*portfolio[:1], PERIODS, *portfolio[1:], variance_pct_limit=10, drift_pct_limit=5,
+                       min_amount=40)
+    assert sorted({r["project_id"] for r in exceptions(result)}) == ["P-C"]
+
+
+def test_plan_counts_the_current_baseline_amount_only():
+    pages = [[
+        {"pk": "PROJECT#P-1", "sk": "ALLOCATION#B1#2026-01#MOD", "calendar_month": "2026-01", "amount": Decimal(90)},
+        {"pk": "PROJECT#P-1", "sk": "ALLOCATION#B2#2026-01#MOD", "calendar_month": "2026-01",
+         "amount": Decimal(120), "planned": Decimal(1)},
+        {"pk": "PROJECT#P-2", "sk": "ALLOCATION#B7#2026-01#MOD", "calendar_month": "2026-01", "planned": Decimal(50)},
+    ]]
+    assert list(plan_rows(pages, {"P-1": "B2"})) == [("P-1", "2026-01", 120.0), ("P-2", "2026-01", 50.0)]
+
+
+def test_snapshot_run_writes_the_exceptions(write_snapshot, tmp_path):
+    root = write_snapshot({
+        "projects": [{"pk": "PROJECT#P-1", "sk": "METADATA", "baseline_id": "B1"}],
+        "allocations": [
+            {"pk": "PROJECT#P-1", "sk": f"ALLOCATION#B1#{period}#MOD", "calendar_month": period, "amount": 100}
+            for period in PERIODS
+        ],
+        "payroll_actuals": [
+            {"pk": f"PROJECT#P-1#MONTH#{period}", "sk": "PAYROLL#ACTUAL#e1", "amount": amount}
+            for period, amount in zip(PERIODS, (100, 100, 160))
+        ],
+    })
+    output = tmp_path / "exceptions.json"
+    argv = ["--snapshot", str(root), "--start", "2026-01", "--end", "2026-03", "--output", str(output)]
+
+    assert main(argv) == 0
+    report = json.loads(output.read_text())
+    assert report["totals"] == {"planned": 300.0, "actual": 360.0}
+    assert report["exception_counts"] == {"UNPLANNED_ACTUAL": 0, "MISSING_ACTUAL": 0, "VARIANCE": 1, "DRIFT": 1}
+    assert main(argv + ["--fail-on-exceptions"]) == 1
@@ -0,0 +1,88 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from finz_dynamo import batch_write
+from taxonomy_diff import diff, item_digest, load_canonical_index, main
+
+
+def _linea(code, **attrs):
+    return {"pk": f"LINEA#{code}", "sk": "METADATA", "linea_codigo": code, **attrs}
+
+
+@pytest.fixture
+def taxonomy(tmp_path):
+    def _write(items):
+        path = tmp_path / "rubros.taxonomy.json"
+        path.write_text(json.dumps({"items": items}), encoding="utf-8")
+        return path
+
+    return _write
+
+
+def test_digest_ignores_bookkeeping_and_key_order():
+    item = {"pk": "LINEA#MOD-ING", "sk": "METADATA", "costo": Decimal("10")}
+    same = {"costo": Decimal("10"), "sk": "METADATA", "pk": "LINEA#MOD-ING", "updatedAt": "2026-10-01T00:00:00Z"}
+    assert item_digest(item) == item_digest(same)
+    assert item_digest(item) != item_digest({**item, "costo": Decimal("11")})
+
+
+def test_index_rejects_duplicates_and_keyless_items(taxonomy):
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_canonical_index(taxonomy([_linea("A"), _linea("A")]))
+    with pytest.raises(ValueError, match="without pk/sk"):
+        load_canonical_index(taxonomy([{"pk": "LINEA#A"}]))
+
+
+def test_diff_builds_minimal_changeset(taxonomy):
+    index = load_canonical_index(taxonomy([_linea("A", nombre="Ing"), _linea("B", nombre="Ops"), _linea("C")]))
+    live = [
+        [_linea("A", nombre="Ing", updatedAt="2026-10-01T00:00:00Z")],  # in sync
+        [_linea("B", nombre="Ops (old)"), _linea("Z")],  # changed, stale LINEA#
+        [{"pk": "META#VERSION", "sk": "CURRENT"}],  # other namespace: never touched
+    ]
+    changes = diff(index, live, prune=False)
+
+    assert changes.valid_count == 1
+    assert changes.live_count == 4
+    assert [item["pk"] for item in changes.upserts] == ["LINEA#B", "LINEA#C"]
+    assert changes.deletes == []
+    reasons = {m["pk"]: m for m in changes.mismatches}
+    assert reasons["LINEA#B"]["fields"] == ["nombre"]
+    assert reasons["LINEA#C"]["reason"] == "missing"
+    assert reasons["LINEA#Z"]["reason"] == "not_in_taxonomy"
+    assert "META#VERSION" not in reasons
+    assert changes.to_report()["status"] == "drift"
+
+    pruned = diff(index, live, prune=True)
+    assert pruned.deletes == [{"pk": "LINEA#Z", "sk": "METADATA"}]
+
+
+def test_in_sync_table_has_empty_changeset(taxonomy):
+    items = [_linea(code) for code in "ABC"]
+    changes = diff(load_canonical_index(taxonomy(items)), [items], prune=True)
+    assert (changes.upserts, changes.deletes) == ([], [])
+    assert changes.to_report()["status"] == "in_sync"
+
+
+def test_changeset_applies_in_chunks(fake_dynamo, taxonomy):
+    canonical = [_linea(f"L{i:03d}") for i in range(60)]
+    fake_dynamo.put("finz_rubros_taxonomia", _linea("OLD"), *canonical[:10])
+    live = [[dict(item) for item in fake_dynamo.tables["finz_rubros_taxonomia"].values()]]
+    changes = diff(load_canonical_index(taxonomy(canonical)), live, prune=True)
+
+    assert batch_write(fake_dynamo, "finz_rubros_taxonomia", changes.upserts, changes.deletes) == (50, 1)
+    assert len(fake_dynamo.calls["batch_write_item"]) == 3  # 51 requests in chunks of 25
+    assert sorted(pk for pk, _ in fake_dynamo.tables["finz_rubros_taxonomia"]) == [i["pk"] for i in canonical]
+
+
+def test_snapshot_diff_is_dry_run_only(taxonomy, write_snapshot, capsys):
+    path = taxonomy([_linea("A"), _linea("B")])
+    snapshot = write_snapshot({"rubros_taxonomia": [_linea("A")]})
+    report = path.parent / "report.json"
+
+    assert main(["--taxonomy", str(path), "--snapshot", str(snapshot), "--report", str(report)]) == 0
+    assert json.loads(report.read_text())["upserts"] == 1
+    with pytest.raises(SystemExit):
+        main(["--taxonomy", str(path), "--snapshot", str(snapshot), "--apply"])
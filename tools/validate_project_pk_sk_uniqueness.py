@@ -8,6 +8,17 @@ The script:
 - Hands off and accepts baselines to mirror the PMO estimator flow when required.
 - Queries DynamoDB directly to verify PK/SK uniqueness and baseline linkage.
 
+Distributed mode (--workers / --queue) shards the work through a SQLite work
+queue (finz_workqueue) so large runs are not bound by one process:
+- the coordinator enqueues one ``create`` task per project, then one ``scan``
+  task per table segment of finz_projects/finz_prefacturas,
+- workers (local processes spawned with --workers, or
+  ``--worker --queue PATH`` on other hosts sharing the file) create and
+  verify projects and return collision fingerprints from their segments,
+- the coordinator merges results and fingerprints into the single report.
+Workers read the API base and token from their own environment; no secrets
+are written to the queue.
+
 Environment inputs (all optional with sensible fallbacks):
 - API base URL: FINZ_API_BASE, VITE_API_BASE_URL, DEV_API_URL, API_BASE_URL
 - Bearer token: FINZ_JWT, FINZ_ID_TOKEN, ID_TOKEN, COGNITO_ID_TOKEN,
@@ -16,21 +27,40 @@ Environment inputs (all optional with sensible fallbacks):
 - Dynamo tables: TABLE_PROJECTS (default finz_projects),
   TABLE_PREFACTURAS (default finz_prefacturas)
 - AWS region: AWS_REGION (default us-east-2)
+
+boto3/requests are loaded lazily (see finz_cli) so ``--help`` and
+configuration errors return without importing the AWS/HTTP stacks.
 """
 from __future__ import annotations
 
+import argparse
 import datetime as _dt
 import json
 import os
+import socket
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import uuid
-from collections import Counter
-from typing import Dict, List, Tuple
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from finz_cli import add_profile_arguments, lazy_import, run_cli
+from finz_client import (
+    FinanzasClient,
+    Key,
+    baseline_link_key,
+    baseline_metadata_key,
+    project_metadata_key,
+    project_partition,
+)
+from finz_dynamo import dynamo_client, table_name
+from finz_workqueue import DONE, FAILED, WorkQueue
 
-import boto3
-import requests
-from boto3.dynamodb.conditions import Key
-from botocore.config import Config
+requests = lazy_import("requests", capability="http")
 
 
 API_BASE_ENV_KEYS = (
@@ -48,13 +78,17 @@ TOKEN_ENV_KEYS = (
     "ACCESS_TOKEN",
     "AUTH_TOKEN",
 )
+# Consecutive failed queue calls before a worker thread gives up
+MAX_QUEUE_ERRORS = 8
+# Grace period for the local workers to exit once the queue is closed
+WORKER_EXIT_SECONDS = 60.0
 
 
 class ValidationError(Exception):
     """Raised when validation detects data integrity issues."""
 
 
-def _resolve_api_base() -> str:
+def resolve_api_base() -> str:
     for key in API_BASE_ENV_KEYS:
         value = os.getenv(key, "").strip()
         if value:
@@ -64,7 +98,7 @@ def _resolve_api_base() -> str:
     )
 
 
-def _resolve_bearer_token() -> Tuple[str, str]:
+def resolve_bearer_token() -> Tuple[str, str]:
     for key in TOKEN_ENV_KEYS:
         value = os.getenv(key, "").strip()
         if value:
@@ -74,7 +108,7 @@ def _resolve_bearer_token() -> Tuple[str, str]:
     )
 
 
-def _auth_headers(token: str) -> Dict[str, str]:
+def auth_headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
@@ -100,7 +134,7 @@ def create_project(api_base: str, token: str, idx: int) -> Tuple[str, Dict]:
         "description": "Automated PK/SK uniqueness validation",
     }
 
-    resp = _session().post(f"{api_base}/projects", headers=_auth_headers(token), data=json.dumps(payload), timeout=30)
+    resp = _session().post(f"{api_base}/projects", headers=auth_headers(token), data=json.dumps(payload), timeout=30)
     resp.raise_for_status()
     data = resp.json() if resp.text else {}
     project_id = data.get("projectId") or data.get("project_id") or data.get("id")
@@ -128,7 +162,7 @@ def create_baseline(api_base: str, token: str, project_id: str, idx: int) -> Dic
         "signed_at": now,
     }
 
-    resp = _session().post(f"{api_base}/baseline", headers=_auth_headers(token), data=json.dumps(payload), timeout=30)
+    resp = _session().post(f"{api_base}/baseline", headers=auth_headers(token), data=json.dumps(payload), timeout=30)
     resp.raise_for_status()
     return resp.json() if resp.text else {}
 
@@ -144,7 +178,7 @@ def handoff_baseline(api_base: str, token: str, project_id: str, baseline_id: st
     }
     resp = _session().post(
         f"{api_base}/projects/{project_id}/handoff",
-        headers=_auth_headers(token),
+        headers=auth_headers(token),
         data=json.dumps(payload),
         timeout=30,
     )
@@ -156,7 +190,7 @@ def accept_baseline(api_base: str, token: str, project_id: str, baseline_id: str
     payload = {"baseline_id": baseline_id, "accepted_by": os.getenv("COGNITO_TEST_USER", "qa-validator@example.com")}
     resp = _session().patch(
         f"{api_base}/projects/{project_id}/accept-baseline",
-        headers=_auth_headers(token),
+        headers=auth_headers(token),
         data=json.dumps(payload),
         timeout=30,
     )
@@ -164,40 +198,69 @@ def accept_baseline(api_base: str, token: str, project_id: str, baseline_id: str
     return resp.json() if resp.text else {}
 
 
-def _dynamo_tables():
-    region = os.getenv("AWS_REGION", "us-east-2")
-    projects_table = os.getenv("TABLE_PROJECTS", "finz_projects")
-    prefacturas_table = os.getenv("TABLE_PREFACTURAS", "finz_prefacturas")
-    dynamo = boto3.resource("dynamodb", region_name=region, config=Config(retries={"max_attempts": 5, "mode": "standard"}))
-    return dynamo.Table(projects_table), dynamo.Table(prefacturas_table)
-
-
-def _fetch_project_metadata(table, project_id: str) -> Dict:
-    pk = f"PROJECT#{project_id}"
-    response = table.get_item(Key={"pk": pk, "sk": "METADATA"})
-    return response.get("Item", {})
-
+def project_record_keys(project_id: str, baseline_id: str) -> Tuple[Key, Key, Key]:
+    """Keys of the project metadata, its baseline link and the baseline metadata."""
+    return (
+        project_metadata_key(project_id),
+        baseline_link_key(project_id, baseline_id),
+        baseline_metadata_key(baseline_id),
+    )
 
-def _fetch_baseline_records(table, project_id: str, baseline_id: str) -> Tuple[Dict, Dict]:
-    project_pk = f"PROJECT#{project_id}"
-    baseline_sk = f"BASELINE#{baseline_id}"
 
-    project_link = table.get_item(Key={"pk": project_pk, "sk": baseline_sk}).get("Item", {})
-    metadata = table.get_item(Key={"pk": f"BASELINE#{baseline_id}", "sk": "METADATA"}).get("Item", {})
+def fetch_project_records(finz: FinanzasClient, project_id: str, baseline_id: str) -> Tuple[Dict, Dict, Dict]:
+    keys = project_record_keys(project_id, baseline_id)
+    items = finz.get_many(keys)
+    project_item, project_link, metadata = (items[key] for key in keys)
 
     if not project_link:
         # Query as fallback to surface the closest match for diagnostics
-        query_resp = table.query(
-            KeyConditionExpression=Key("pk").eq(project_pk),
-            Limit=20,
-        )
-        alt = query_resp.get("Items", [])
+        alt = finz.query("prefacturas", project_partition(project_id), limit=20)
         if alt:
             project_link = alt[0]
-    return project_link, metadata
+    return project_item, project_link, metadata
+
+
+def project_warnings(project_id: str, project_item: Dict, baseline_link: Dict, baseline_meta: Dict) -> List[str]:
+    """Integrity warnings for one project's metadata and baseline records."""
+    warnings = []
+    if not project_item:
+        warnings.append("Project metadata not found")
+    if project_item and project_item.get("sk") != "METADATA":
+        warnings.append(f"Unexpected project sk: {project_item.get('sk')}")
+    if baseline_link and baseline_link.get("project_id") != project_id:
+        warnings.append(
+            f"Baseline link references project {baseline_link.get('project_id')} instead of {project_id}"
+        )
+    if baseline_meta and baseline_meta.get("project_id") != project_id:
+        warnings.append(
+            f"Baseline metadata project_id {baseline_meta.get('project_id')} mismatches {project_id}"
+        )
+    return warnings
+
+
+def project_result(
+    project_id: str,
+    baseline_id: Optional[str],
+    project_item: Dict,
+    baseline_link: Dict,
+    baseline_meta: Dict,
+    collisions: Sequence = (),
+    warnings: Sequence[str] = (),
+) -> Dict:
+    """Report entry for print_report; ``warnings`` are added to the standard checks."""
+    return {
+        "project_id": project_id,
+        "baseline_id": baseline_id,
+        "project_pk": project_item.get("pk"),
+        "project_sk": project_item.get("sk"),
+        "baseline_pk": baseline_meta.get("pk") or baseline_link.get("pk"),
+        "baseline_sk": baseline_meta.get("sk") or baseline_link.get("sk"),
+        "collisions": list(collisions),
+        "warnings": project_warnings(project_id, project_item, baseline_link, baseline_meta) + list(warnings),
+    }
 
 
-def _print_report(results: List[Dict]):
+def print_report(results: List[Dict], scope: str = "created projects"):
     print("\n=== PK/SK Uniqueness Report ===")
     for entry in results:
         print(
@@ -219,22 +282,262 @@ def _print_report(results: List[Dict]):
         print(f"\n🚨 Duplicate project PKs detected: {dup_pks}")
     if dup_pairs:
         print(f"\n🚨 Duplicate project PK/SK pairs detected: {dup_pairs}")
-    if not dup_pks and not dup_pairs:
-        print("\n✅ No PK/SK collisions detected among created projects.")
+    colliding = [r["project_id"] for r in results if r.get("collisions")]
+    if colliding:
+        print(f"\n🚨 Cross-partition collisions detected for projects: {colliding}")
+    if not dup_pks and not dup_pairs and not colliding:
+        print(f"\n✅ No PK/SK collisions detected among {scope}.")
+
+
+def create_and_verify(
+    api_base: str, token: str, token_source: str, idx: int, finz: Optional[FinanzasClient] = None
+) -> Dict:
+    """Create one project with an accepted baseline and return its report entry."""
+    project_id, _ = create_project(api_base, token, idx)
+    baseline = create_baseline(api_base, token, project_id, idx)
+    baseline_id = baseline.get("baselineId") or baseline.get("baseline_id")
+    if not baseline_id:
+        raise ValidationError(f"Baseline creation missing baselineId for project {project_id}")
+    handoff_baseline(api_base, token, project_id, baseline_id)
+    accept_baseline(api_base, token, project_id, baseline_id)
+
+    finz = finz or FinanzasClient(dynamo_client())
+    project_item, baseline_link, baseline_meta = fetch_project_records(finz, project_id, baseline_id)
+    result = project_result(project_id, baseline_id, project_item, baseline_link, baseline_meta)
+    result["token_source"] = token_source
+    return result
+
+
+def scan_fingerprints(client, table_key: str, segment: int, total_segments: int, project_ids, baseline_ids) -> List:
+    """(pk, sk, project_id) of the items in one scan segment that touch the created projects."""
+    kwargs = {
+        "TableName": table_name(table_key),
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": "#pk, #sk, #pid",
+        "ExpressionAttributeNames": {"#pk": "pk", "#sk": "sk", "#pid": "project_id"},
+    }
+    watched_pks = {project_partition(pid) for pid in project_ids}
+    watched_pks |= {baseline_metadata_key(bid).pk for bid in baseline_ids}
+    fingerprints = []
+    while True:
+        resp = client.scan(**kwargs)
+        for item in resp.get("Items", []):
+            pk = item["pk"].get("S", "")
+            sk = item["sk"].get("S", "")
+            pid = item.get("project_id", {}).get("S")
+            linked_baseline = sk.startswith("BASELINE#") and sk[len("BASELINE#"):] in baseline_ids
+            if pk in watched_pks or pid in project_ids or linked_baseline:
+                fingerprints.append((table_key, pk, sk, pid))
+        if not resp.get("LastEvaluatedKey"):
+            return fingerprints
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def merge_collisions(results: List[Dict], fingerprints) -> None:
+    """Attach cross-partition collisions found by the segment scans to each result."""
+    pks_by_project = defaultdict(set)  # project_id attribute -> METADATA pks carrying it
+    links_by_baseline = defaultdict(set)  # baseline -> projects linking it
+    for table_key, pk, sk, pid in fingerprints:
+        if table_key == "projects" and sk == "METADATA" and pid:
+            pks_by_project[pid].add(pk)
+        elif table_key == "prefacturas" and pk.startswith("PROJECT#") and sk.startswith("BASELINE#"):
+            links_by_baseline[sk[len("BASELINE#"):]].add(pk[len("PROJECT#"):])
+    for entry in results:
+        own_pk = project_partition(entry["project_id"])
+        collisions = list(entry.get("collisions", []))
+        collisions += [f"project_id also stored under {pk}" for pk in sorted(pks_by_project[entry["project_id"]] - {own_pk})]
+        others = links_by_baseline.get(entry["baseline_id"], set()) - {entry["project_id"]}
+        collisions += [f"baseline {entry['baseline_id']} also linked from PROJECT#{pid}" for pid in sorted(others)]
+        entry["collisions"] = collisions
+
+
+def run_worker(queue_path: Path, threads: int, poll_seconds: float = 0.5) -> int:
+    api_base = resolve_api_base()
+    token, token_source = resolve_bearer_token()
+    queue = WorkQueue(queue_path)
+    client = dynamo_client()
+    finz = FinanzasClient(client)  # shared, so the threads' reads are coalesced and batched together
+    created: Dict[str, set] = {}
+    lock = threading.Lock()
+    processed = Counter()
+
+    def _created():
+        with lock:
+            if not created:
+                meta = queue.get_meta("created", {})
+                created["projects"] = set(meta.get("projects", []))
+                created["baselines"] = set(meta.get("baselines", []))
+            return created["projects"], created["baselines"]
+
+    def _loop(n: int) -> None:
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{n}"
+        errors = 0
+
+        def _backoff(action: str, exc: Exception) -> bool:
+            """Sleep before retrying a failed queue call; False once the thread should give up."""
+            nonlocal errors
+            errors += 1
+            if errors > MAX_QUEUE_ERRORS:
+                print(f"❌ {worker_id}: {action} failed {errors} times in a row ({type(exc).__name__}: {exc}), "
+                      "giving up", file=sys.stderr, flush=True)
+                with lock:
+                    processed["abandoned"] += 1
+                return False
+            backoff = min(poll_seconds * 2 ** errors, 30.0)
+            print(f"⚠️ {worker_id}: {action} failed ({type(exc).__name__}: {exc}), retrying in {backoff:.1f}s",
+                  file=sys.stderr, flush=True)
+            time.sleep(backoff)
+            return True
+
+        while True:
+            # Queue calls can fail with e.g. "database is locked" past the busy timeout: back off and retry
+            try:
+                task = queue.claim(worker_id)
+                closed = task is None and queue.get_meta("closed", False)
+            except Exception as exc:
+                if not _backoff("claim", exc):
+                    return
+                continue
+            errors = 0
+            if task is None:
+                if closed:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            try:
+                if task.kind == "create":
+                    result = create_and_verify(api_base, token, token_source, task.payload["idx"], finz)
+                else:
+                    project_ids, baseline_ids = _created()
+                    result = scan_fingerprints(
+                        client, task.payload["table"], task.payload["segment"], task.payload["total"],
+                        project_ids, baseline_ids,
+                    )
+                action, record = "complete", lambda: queue.complete(task, result)
+            except Exception as exc:  # recorded in the queue and reported by the coordinator
+                error = f"{type(exc).__name__}: {exc}"
+                action, record = "fail", lambda: queue.fail(task, error)
+            while True:
+                try:
+                    record()
+                    break
+                except Exception as exc:
+                    if not _backoff(action, exc):
+                        return  # the lease expires and another worker retries the task
+            errors = 0
+            if action == "complete":
+                with lock:
+                    processed[task.kind] += 1
+
+    pool = [threading.Thread(target=_loop, args=(n,), daemon=True) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    print(f"Worker {socket.gethostname()}:{os.getpid()} done: {dict(processed)}")
+    print(f"📈 DynamoDB reads: {finz.format_stats()}")
+    return 1 if processed["abandoned"] else 0
+
+
+def run_coordinator(args, queue_path: Path) -> int:
+    queue = WorkQueue(queue_path)
+    # A reused --queue file must not leak the previous run's tasks, results or "closed" flag
+    queue.reset()
+    queue.set_meta("closed", False)
+    spawned = [
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", "--queue", str(queue_path),
+             "--threads", str(args.threads)]
+        )
+        for _ in range(args.workers)
+    ]
 
+    def _progress(kind):
+        def _print(counts):
+            print(f"  {kind}: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+                  f"{sum(counts.values()) - counts.get(DONE, 0) - counts.get(FAILED, 0)} remaining", flush=True)
+        return _print
 
-def main() -> int:
     try:
-        api_base = _resolve_api_base()
-        token, token_source = _resolve_bearer_token()
+        print(f"📦 Queue {queue_path}: {args.projects} projects, {args.workers} local workers")
+        queue.enqueue("create", ({"idx": idx} for idx in range(1, args.projects + 1)), max_attempts=1)
+        queue.wait("create", poll_seconds=args.poll_seconds, progress=_progress("create"))
+        results = [result for _, result in queue.results("create")]
+        queue.set_meta(
+            "created",
+            {"projects": [r["project_id"] for r in results], "baselines": [r["baseline_id"] for r in results]},
+        )
+
+        queue.enqueue(
+            "scan",
+            ({"table": key, "segment": seg, "total": args.segments}
+             for key in ("projects", "prefacturas") for seg in range(args.segments)),
+        )
+        queue.wait("scan", poll_seconds=args.poll_seconds, progress=_progress("scan"))
+        fingerprints = [tuple(fp) for _, segment in queue.results("scan") for fp in segment]
+    finally:
+        queue.set_meta("closed", True)
+        for proc in spawned:
+            try:
+                proc.wait(timeout=WORKER_EXIT_SECONDS)
+            except subprocess.TimeoutExpired:
+                print(f"⚠️ worker {proc.pid} did not exit after {WORKER_EXIT_SECONDS:.0f}s, killing it",
+                      file=sys.stderr)
+                proc.kill()
+                proc.wait()
+
+    merge_collisions(results, fingerprints)
+    print_report(results, scope=f"{len(results)} created projects")
+    failures = queue.failures()
+    for payload, error in failures[:20]:
+        print(f"❌ {payload}: {error}")
+    if failures:
+        print(f"❌ {len(failures)} tasks failed")
+        return 1
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Validate project/baseline PK/SK uniqueness across the Finanzas API and DynamoDB.",
+        epilog="Configuration is read from the environment; see the module docstring for variables.",
+    )
+    parser.add_argument("--projects", type=int, default=3, help="Projects to create (default 3)")
+    parser.add_argument("--workers", type=int, default=0, help="Local worker processes for distributed mode")
+    parser.add_argument("--queue", type=Path, help="SQLite work queue shared with workers (enables distributed mode)")
+    parser.add_argument("--worker", action="store_true", help="Run as a worker against --queue")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent tasks per worker process (default 4)")
+    parser.add_argument("--segments", type=int, default=8, help="Scan segments per table in distributed mode")
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help=argparse.SUPPRESS)
+    add_profile_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.worker and not args.queue:
+        parser.error("--worker requires --queue")
+    try:
+        api_base = resolve_api_base()
+        token, token_source = resolve_bearer_token()
     except ValidationError as exc:
         print(f"Configuration error: {exc}")
         return 1
 
-    projects_table, prefacturas_table = _dynamo_tables()
+    if args.worker:
+        return run_worker(args.queue, args.threads)
+    if args.queue or args.workers:
+        if args.queue:
+            return run_coordinator(args, args.queue)
+        with tempfile.TemporaryDirectory(prefix="pk-sk-queue-") as tmp:
+            return run_coordinator(args, Path(tmp) / "queue.sqlite")
+
+    finz = FinanzasClient(dynamo_client())
     created: List[Dict] = []
 
-    for idx in range(1, 4):
+    for idx in range(1, args.projects + 1):
         project_id, project_payload = create_project(api_base, token, idx)
         baseline = create_baseline(api_base, token, project_id, idx)
         baseline_id = baseline.get("baselineId") or baseline.get("baseline_id")
@@ -254,43 +557,29 @@ def main() -> int:
             }
         )
 
+    # One round of batched reads for every created project; the per-project lookups below hit the cache
+    finz.get_many(key for record in created for key in project_record_keys(record["project_id"], record["baseline_id"]))
     results: List[Dict] = []
     for record in created:
-        project_item = _fetch_project_metadata(projects_table, record["project_id"])
-        baseline_link, baseline_meta = _fetch_baseline_records(
-            prefacturas_table, record["project_id"], record["baseline_id"]
+        project_item, baseline_link, baseline_meta = fetch_project_records(
+            finz, record["project_id"], record["baseline_id"]
         )
 
-        warnings = []
-        if not project_item:
-            warnings.append("Project metadata not found")
-        if project_item and project_item.get("sk") != "METADATA":
-            warnings.append(f"Unexpected project sk: {project_item.get('sk')}")
-        if baseline_link and baseline_link.get("project_id") != record["project_id"]:
-            warnings.append(
-                f"Baseline link references project {baseline_link.get('project_id')} instead of {record['project_id']}"
-            )
-        if baseline_meta and baseline_meta.get("project_id") != record["project_id"]:
-            warnings.append(
-                f"Baseline metadata project_id {baseline_meta.get('project_id')} mismatches {record['project_id']}"
-            )
-
         results.append(
-            {
-                "project_id": record["project_id"],
-                "baseline_id": record["baseline_id"],
-                "project_pk": project_item.get("pk"),
-                "project_sk": project_item.get("sk"),
-                "baseline_pk": baseline_meta.get("pk") or baseline_link.get("pk"),
-                "baseline_sk": baseline_meta.get("sk") or baseline_link.get("sk"),
-                "collisions": record.get("collisions", []),
-                "warnings": warnings,
-            }
+            project_result(
+                record["project_id"],
+                record["baseline_id"],
+                project_item,
+                baseline_link,
+                baseline_meta,
+                collisions=record.get("collisions", []),
+            )
         )
 
-    _print_report(results)
+    print_report(results)
+    print(f"\n📈 DynamoDB reads: {finz.format_stats()}")
     return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(run_cli(main))